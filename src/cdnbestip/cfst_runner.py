@@ -0,0 +1,255 @@
+"""Streaming runner for the cfst binary with live progress events."""
+
+import codecs
+import os
+import re
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Lines cfst prints when a test phase starts
+_PHASE_MARKERS = {"开始延迟测速": "latency", "开始下载测速": "download"}
+
+# Progress bar frame, e.g. "1200 / 5000 [-----↗_____] 可用: 340"
+_COUNTER_PATTERN = re.compile(r"^\s*(\d+)\s*/\s*(\d+)\s*\[")
+_AVAILABLE_PATTERN = re.compile(r"可用:\s*(\d+)")
+_ANSI_PATTERN = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+
+# Output lines kept for error messages (progress frames are not kept)
+_OUTPUT_TAIL_LINES = 50
+
+_READ_SIZE = 4096
+
+
+@dataclass
+class CfstProgress:
+    """
+    Progress of a cfst run.
+
+    In the latency phase done counts tested addresses and qualified the ones
+    that answered. In the download phase cfst only counts addresses that met
+    the speed threshold, so done and qualified are the same there.
+    """
+
+    phase: str  # "latency" or "download"
+    done: int
+    total: int
+    qualified: int
+    eta: float | None = None  # Seconds left in this phase (latency phase only)
+
+
+@dataclass
+class CfstRun:
+    """Outcome of a finished cfst run."""
+
+    returncode: int
+    output: str  # Last non-progress output lines
+
+
+class CfstProgressParser:
+    """
+    Turns cfst console output into progress events.
+
+    cfst redraws its progress bars with carriage returns, so output is split
+    on both carriage returns and newlines. Output can be fed in arbitrary
+    chunks; incomplete lines are kept until the rest arrives.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize parser.
+
+        Args:
+            clock: Monotonic clock used for ETA estimates
+        """
+        self.clock = clock
+        self.phase: str | None = None
+        self.tail: deque[str] = deque(maxlen=_OUTPUT_TAIL_LINES)
+        self._pending = ""
+        self._phase_started = 0.0
+        self._last: CfstProgress | None = None
+
+    def feed(self, text: str) -> list[CfstProgress]:
+        """
+        Parse a chunk of output.
+
+        Args:
+            text: Output decoded as text
+
+        Returns:
+            Progress events for the progress frames completed by this chunk
+        """
+        segments = re.split(r"[\r\n]", self._pending + text)
+        self._pending = segments.pop()
+        events = []
+        for segment in segments:
+            event = self._parse_segment(segment)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def finish(self) -> list[CfstProgress]:
+        """Parse whatever is left once the output ends."""
+        pending, self._pending = self._pending, ""
+        event = self._parse_segment(pending)
+        return [event] if event is not None else []
+
+    def _parse_segment(self, segment: str) -> CfstProgress | None:
+        """Parse one line or progress frame."""
+        line = _ANSI_PATTERN.sub("", segment).strip()
+        if not line:
+            return None
+
+        match = _COUNTER_PATTERN.match(line)
+        if match is None or self.phase is None:
+            for marker, phase in _PHASE_MARKERS.items():
+                if marker in line:
+                    self.phase = phase
+                    self._phase_started = self.clock()
+            self.tail.append(line)
+            return None
+
+        done, total = int(match.group(1)), int(match.group(2))
+        if self.phase == "latency":
+            available = _AVAILABLE_PATTERN.search(line)
+            qualified = int(available.group(1)) if available else 0
+        else:
+            qualified = done
+
+        eta = None
+        if self.phase == "latency" and 0 < done <= total:
+            elapsed = self.clock() - self._phase_started
+            eta = elapsed / done * (total - done)
+
+        event = CfstProgress(self.phase, done, total, qualified, eta)
+        last = self._last
+        if last is not None and (last.phase, last.done, last.qualified) == (
+            event.phase,
+            event.done,
+            event.qualified,
+        ):
+            return None
+        self._last = event
+        return event
+
+
+def _wait_for_lock(lock: threading.Lock, cancelled: threading.Event) -> bool:
+    """Acquire a lock unless cancelled first; returns whether it was acquired."""
+    while not lock.acquire(timeout=0.5):
+        if cancelled.is_set():
+            return False
+    return True
+
+
+def _pause_for_lock(
+    process: subprocess.Popen, lock: threading.Lock, cancelled: threading.Event
+) -> bool:
+    """Pause the child until the lock is acquired; returns whether it was acquired."""
+    if lock.acquire(blocking=False):
+        return True
+
+    logger.debug(f"cfst {process.pid} waiting for another download phase to finish")
+    can_pause = hasattr(signal, "SIGSTOP")
+    if can_pause:
+        process.send_signal(signal.SIGSTOP)
+    try:
+        return _wait_for_lock(lock, cancelled)
+    finally:
+        if can_pause and process.poll() is None:
+            process.send_signal(signal.SIGCONT)
+
+
+def run_cfst(
+    cmd_args: list[str],
+    timeout: float,
+    on_progress: Callable[[CfstProgress], None] | None = None,
+    download_lock: threading.Lock | None = None,
+) -> CfstRun:
+    """
+    Run cfst, reporting progress while it runs.
+
+    Output is read as it is produced instead of being buffered until exit,
+    and only the last lines are kept for error reporting.
+
+    With a download lock, cfst is paused when its download phase starts until
+    the lock is free, so concurrent runs do not share bandwidth while download
+    testing. The lock is held until cfst exits. Pausing needs SIGSTOP; where it
+    is missing, only the waiting is serialized.
+
+    Args:
+        cmd_args: Command line, binary first
+        timeout: Seconds before the child is killed
+        on_progress: Called with each progress event
+        download_lock: Lock shared by runs whose download phases must not overlap
+
+    Returns:
+        Exit status and the tail of the output
+
+    Raises:
+        subprocess.TimeoutExpired: If cfst did not finish in time
+        FileNotFoundError: If the binary does not exist
+    """
+    process = subprocess.Popen(
+        cmd_args,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    timed_out = threading.Event()
+
+    def kill_on_timeout() -> None:
+        timed_out.set()
+        process.kill()
+
+    timer = threading.Timer(timeout, kill_on_timeout)
+    timer.daemon = True
+    timer.start()
+
+    parser = CfstProgressParser()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    holds_lock = False
+    try:
+        # cfst waits for Enter before exiting on some platforms
+        try:
+            process.stdin.write(b"\n")
+            process.stdin.close()
+        except OSError:
+            pass
+
+        fd = process.stdout.fileno()
+        while True:
+            chunk = os.read(fd, _READ_SIZE)
+            events = parser.feed(decoder.decode(chunk, final=not chunk))
+            if not chunk:
+                events += parser.finish()
+            needs_lock = download_lock is not None and not holds_lock and chunk
+            if needs_lock and parser.phase == "download":
+                holds_lock = _pause_for_lock(process, download_lock, timed_out)
+            if on_progress is not None:
+                for event in events:
+                    on_progress(event)
+            if not chunk:
+                break
+        returncode = process.wait()
+    finally:
+        timer.cancel()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        if holds_lock:
+            download_lock.release()
+
+    output = "\n".join(parser.tail)
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd_args, timeout, output=output)
+    logger.debug(f"cfst output tail:\n{output}")
+    return CfstRun(returncode=returncode, output=output)
@@ -4,8 +4,14 @@ import argparse
 import os
 import sys
 
+from .cfst_runner import CfstProgress
 from .config import Config, load_config
 from .dns import DNSManager
+from .download import (
+    DEFAULT_DOWNLOAD_CONCURRENCY,
+    DEFAULT_DOWNLOAD_SECONDS,
+    DEFAULT_MIN_DOWNLOAD_SECONDS,
+)
 from .exceptions import (
     AuthenticationError,
     BinaryError,
@@ -19,6 +25,8 @@ from .exceptions import (
     ValidationError,
 )
 from .ip_sources import IPSourceManager
+from .item_filter import ItemFilter
+from .local_source import is_local_source
 from .logging_config import (
     PerformanceTimer,
     configure_logging,
@@ -26,7 +34,11 @@ from .logging_config import (
     log_performance,
 )
 from .models import SpeedTestResult
+from .probe import DEFAULT_PROBE_CONCURRENCY, DEFAULT_PROBE_COUNT, ENGINES
 from .results import ResultsHandler
+from .sampling import DEFAULT_BLOCK_PREFIX_V6, DEFAULT_MAX_BLOCKS_V6
+from .sharding import merge_result_files, parse_shard, shard_file_name
+from .source_registry import get_source_registry, split_source_spec
 from .speedtest import SpeedTestManager
 
 # Get logger for this module
@@ -56,12 +68,19 @@ Examples:
   # Using proxy for Cloudflare API and IP list downloads
   %(prog)s -d example.com -p cf -x http://proxy.example.com:8080 -n
 
+  # Probing from several nodes, then merging and updating DNS once
+  %(prog)s -p cf --shard 1/2        (node 1, writes result.shard-1-of-2.csv)
+  %(prog)s -p cf --shard 2/2        (node 2, writes result.shard-2-of-2.csv)
+  %(prog)s merge result.shard-*-of-2.csv
+  %(prog)s -d example.com -p cf -s 2 -n
+
 IP Data Sources:
   cf   - CloudFlare IPs
   gc   - GCore IPs
   ct   - CloudFront IPs
   aws  - Amazon AWS IPs
   <url> - Custom IP data URL
+  cf,<url> - Several sources, downloaded concurrently and merged
 
 Zone Types:
   A, AAAA, CNAME, MX, TXT, SRV, NS, PTR
@@ -125,11 +144,171 @@ Zone Types:
         metavar="COUNT",
         help="Number of DNS records to create (default: 0 = unlimited)",
     )
+    speed_group.add_argument(
+        "--engine",
+        choices=list(ENGINES),
+        default=None,
+        help="Probe engine: cfst binary or built-in TCP connect latency prober (default: cfst)",
+    )
+    speed_group.add_argument(
+        "--probe-concurrency",
+        type=int,
+        default=None,
+        metavar="COUNT",
+        help=f"Addresses probed at once by the tcp engine (default: {DEFAULT_PROBE_CONCURRENCY})",
+    )
+    speed_group.add_argument(
+        "--probe-count",
+        type=int,
+        default=None,
+        metavar="COUNT",
+        help=f"TCP connects per address with the tcp engine (default: {DEFAULT_PROBE_COUNT})",
+    )
+    speed_group.add_argument(
+        "--download-count",
+        type=int,
+        default=None,
+        metavar="COUNT",
+        help="Download test the COUNT lowest-latency addresses with the tcp engine (default: 0)",
+    )
+    speed_group.add_argument(
+        "--download-concurrency",
+        type=int,
+        default=None,
+        metavar="COUNT",
+        help=f"Download tests run at once (default: {DEFAULT_DOWNLOAD_CONCURRENCY})",
+    )
+    speed_group.add_argument(
+        "--download-seconds",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help=f"Download time budget per address (default: {DEFAULT_DOWNLOAD_SECONDS:g})",
+    )
+    speed_group.add_argument(
+        "--download-bytes",
+        type=int,
+        default=None,
+        metavar="BYTES",
+        help="Stop each download after BYTES bytes (default: 0 = time budget only)",
+    )
+    speed_group.add_argument(
+        "--download-tolerance",
+        type=float,
+        default=None,
+        metavar="FRACTION",
+        help="End a download early once its rate is known within FRACTION, e.g. 0.05 for "
+        "±5%% (default: 0 = always use the full time budget)",
+    )
+    speed_group.add_argument(
+        "--download-min-seconds",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Download at least this long before ending early "
+        f"(default: {DEFAULT_MIN_DOWNLOAD_SECONDS:g})",
+    )
+    speed_group.add_argument(
+        "--shortlist",
+        type=int,
+        default=None,
+        metavar="COUNT",
+        help="Sweep latency with TCP connects first and pass only the COUNT best IPs to cfst",
+    )
+    speed_group.add_argument(
+        "--parallel-shards",
+        type=int,
+        default=None,
+        metavar="COUNT",
+        help="Split the IP file across COUNT cfst processes and merge their results (default: 1)",
+    )
+    speed_group.add_argument(
+        "--parallel-jobs",
+        type=int,
+        default=None,
+        metavar="COUNT",
+        help="Run at most COUNT cfst processes at once (default: 0 = one per shard)",
+    )
 
     # IP data source
     data_group = parser.add_argument_group("IP Data Source")
     data_group.add_argument(
-        "-i", "--ip-url", metavar="SOURCE", help="IP data source: cf, gc, ct, aws, or custom URL"
+        "-i",
+        "--ip-url",
+        metavar="SOURCE",
+        help="IP data source: cf, gc, ct, aws, cf6, gc6, aws6, custom URL, or local file path/file:// URL (comma-separate to merge several)",
+    )
+    data_group.add_argument(
+        "--sample",
+        type=int,
+        default=None,
+        metavar="COUNT",
+        help="Expand prefixes into COUNT test addresses per /24 block (default: 0 = pass prefixes as-is)",
+    )
+    data_group.add_argument(
+        "--sample-mode",
+        choices=["uniform", "random", "first+random"],
+        default=None,
+        help="Address sampling strategy (default: uniform)",
+    )
+    data_group.add_argument(
+        "--sample-seed",
+        type=int,
+        default=None,
+        metavar="SEED",
+        help="Random seed for reproducible sampling",
+    )
+    data_group.add_argument(
+        "--sample-block-v6",
+        type=int,
+        default=None,
+        metavar="PREFIXLEN",
+        help="IPv6 sampling block size as a prefix length (default: 48)",
+    )
+    data_group.add_argument(
+        "--sample-max-blocks-v6",
+        type=int,
+        default=None,
+        metavar="COUNT",
+        help="Maximum IPv6 blocks sampled per prefix, spread across it (default: 256, 0 = all)",
+    )
+    data_group.add_argument(
+        "--stratify",
+        type=int,
+        default=None,
+        metavar="BUDGET",
+        help="Pick BUDGET test addresses spread across /16s, or colos once known (replaces --sample)",
+    )
+    data_group.add_argument(
+        "--stratify-allocation",
+        choices=["proportional", "equal"],
+        default=None,
+        help="Split the stratified budget by stratum size or equally (default: proportional)",
+    )
+    data_group.add_argument(
+        "--exclude",
+        metavar="FILE",
+        help="File of IP addresses/CIDR prefixes to remove from the candidate list",
+    )
+    data_group.add_argument(
+        "--ip-filter",
+        metavar="EXPR",
+        help="Filter JSON source entries by field, e.g. service=CLOUDFRONT,region=ap-east-1|us-east-1",
+    )
+    data_group.add_argument(
+        "--delta",
+        action="store_true",
+        help="On refresh, only test prefixes added since the cached list plus recently good blocks",
+    )
+    data_group.add_argument(
+        "--skip-dead",
+        action="store_true",
+        help="Skip addresses and /24 blocks that repeatedly failed to respond (learned from -dd runs)",
+    )
+    data_group.add_argument(
+        "--shard",
+        metavar="I/N",
+        help="Probe only shard I of N of the candidates (merge results with 'cdnbestip merge')",
     )
 
     # Operational flags
@@ -143,6 +322,11 @@ Zone Types:
     ops_group.add_argument(
         "-o", "--only", action="store_true", help="Only update one DNS record (fastest IP)"
     )
+    ops_group.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and rerun the workflow whenever a local IP source file changes",
+    )
 
     # Advanced options
     advanced_group = parser.add_argument_group("Advanced Options")
@@ -159,6 +343,36 @@ Zone Types:
         metavar="URL",
         help="Proxy URL for Cloudflare API and IP list downloads (e.g., http://proxy.example.com:8080)",
     )
+    advanced_group.add_argument(
+        "--cache-format",
+        choices=["text", "packed"],
+        default=None,
+        help="IP list cache format; packed stores binary prefixes loaded via mmap (default: text)",
+    )
+    advanced_group.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=None,
+        metavar="HOURS",
+        help="IP list cache lifetime in hours for all sources (default: per source)",
+    )
+    advanced_group.add_argument(
+        "--stale-while-revalidate",
+        action="store_true",
+        help="Use an expired cached IP list immediately and refresh it in the background",
+    )
+    advanced_group.add_argument(
+        "--race-delay",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Delay before also trying the origin when downloading via the CDN mirror (default: 0.3)",
+    )
+    advanced_group.add_argument(
+        "--no-race",
+        action="store_true",
+        help="Download IP lists only through the CDN mirror instead of racing it against the origin",
+    )
 
     # Logging and debugging options
     debug_group = parser.add_argument_group("Logging and Debugging")
@@ -234,6 +448,173 @@ def validate_arguments(args: argparse.Namespace) -> None:
                 )
             )
 
+        # Validate sample count
+        if hasattr(args, "sample") and args.sample is not None and args.sample < 0:
+            errors.append(
+                ValidationError(
+                    "Sample count must be greater than or equal to 0",
+                    field="sample",
+                    value=str(args.sample),
+                    expected_format="non-negative integer (e.g., 1 per /24)",
+                )
+            )
+
+        # Validate stratified sampling budget
+        if hasattr(args, "stratify") and args.stratify is not None:
+            if args.stratify < 0:
+                errors.append(
+                    ValidationError(
+                        "Stratified budget must be greater than or equal to 0",
+                        field="stratify",
+                        value=str(args.stratify),
+                        expected_format="non-negative integer (e.g., 2000)",
+                    )
+                )
+            elif args.stratify and getattr(args, "sample", None):
+                errors.append(
+                    ValidationError(
+                        "--stratify cannot be combined with --sample",
+                        field="stratify",
+                        value=str(args.stratify),
+                        expected_format="either --sample COUNT or --stratify BUDGET",
+                    )
+                )
+
+        # Validate IPv6 sampling block size
+        if (
+            hasattr(args, "sample_block_v6")
+            and args.sample_block_v6 is not None
+            and not (0 <= args.sample_block_v6 <= 128)
+        ):
+            errors.append(
+                ValidationError(
+                    "IPv6 sampling block prefix must be between 0 and 128",
+                    field="sample_block_v6",
+                    value=str(args.sample_block_v6),
+                    expected_format="prefix length between 0 and 128 (e.g., 48)",
+                )
+            )
+
+        # Validate IPv6 block limit
+        if (
+            hasattr(args, "sample_max_blocks_v6")
+            and args.sample_max_blocks_v6 is not None
+            and args.sample_max_blocks_v6 < 0
+        ):
+            errors.append(
+                ValidationError(
+                    "IPv6 block limit must be greater than or equal to 0",
+                    field="sample_max_blocks_v6",
+                    value=str(args.sample_max_blocks_v6),
+                    expected_format="non-negative integer (0 = no limit)",
+                )
+            )
+
+        # Validate tcp engine settings
+        positive_fields = (
+            "probe_concurrency",
+            "probe_count",
+            "download_concurrency",
+            "download_seconds",
+            "download_min_seconds",
+            "parallel_shards",
+        )
+        for field in positive_fields:
+            value = getattr(args, field, None)
+            if value is not None and value <= 0:
+                errors.append(
+                    ValidationError(
+                        f"{field.replace('_', ' ').capitalize()} must be greater than 0",
+                        field=field,
+                        value=str(value),
+                        expected_format="positive number",
+                    )
+                )
+
+        for field in ("download_count", "download_bytes", "shortlist", "parallel_jobs"):
+            value = getattr(args, field, None)
+            if value is not None and value < 0:
+                errors.append(
+                    ValidationError(
+                        f"{field.replace('_', ' ').capitalize()} must be 0 or greater",
+                        field=field,
+                        value=str(value),
+                        expected_format="non-negative integer",
+                    )
+                )
+
+        tolerance = getattr(args, "download_tolerance", None)
+        if tolerance is not None and tolerance < 0:
+            errors.append(
+                ValidationError(
+                    "Download tolerance must be 0 or greater",
+                    field="download_tolerance",
+                    value=str(tolerance),
+                    expected_format="fraction of the measured rate (0 = off)",
+                )
+            )
+
+        # Validate shard specification
+        if hasattr(args, "shard") and args.shard:
+            try:
+                parse_shard(args.shard)
+            except ValueError as e:
+                errors.append(
+                    ValidationError(
+                        str(e),
+                        field="shard",
+                        value=args.shard,
+                        expected_format="i/N with 1 <= i <= N (e.g., 2/4)",
+                    )
+                )
+
+        # Validate exclusion file
+        if hasattr(args, "exclude") and args.exclude and not os.path.isfile(args.exclude):
+            errors.append(
+                ValidationError(
+                    f"Exclusion file not found: {args.exclude}",
+                    field="exclude",
+                    value=args.exclude,
+                    expected_format="path to a file with one IP or CIDR prefix per line",
+                )
+            )
+
+        # Validate JSON source filter
+        if hasattr(args, "ip_filter") and args.ip_filter:
+            try:
+                ItemFilter.parse(args.ip_filter)
+            except IPSourceError as e:
+                errors.append(
+                    ValidationError(
+                        str(e),
+                        field="ip_filter",
+                        value=args.ip_filter,
+                        expected_format="field=value[|value],... (e.g., service=CLOUDFRONT)",
+                    )
+                )
+
+        # Validate cache TTL
+        if hasattr(args, "cache_ttl") and args.cache_ttl is not None and args.cache_ttl <= 0:
+            errors.append(
+                ValidationError(
+                    "Cache TTL must be greater than 0",
+                    field="cache_ttl",
+                    value=str(args.cache_ttl),
+                    expected_format="positive number of hours (e.g., 24)",
+                )
+            )
+
+        # Validate race delay
+        if hasattr(args, "race_delay") and args.race_delay is not None and args.race_delay < 0:
+            errors.append(
+                ValidationError(
+                    "Race delay must be greater than or equal to 0",
+                    field="race_delay",
+                    value=str(args.race_delay),
+                    expected_format="non-negative number of seconds (e.g., 0.3)",
+                )
+            )
+
         # Validate timeout
         if hasattr(args, "timeout") and args.timeout is not None and args.timeout <= 0:
             errors.append(
@@ -301,17 +682,21 @@ def validate_arguments(args: argparse.Namespace) -> None:
                 )
             )
 
-        # Validate IP data URL if it's not a predefined source
+        # Validate IP data URL(s) that are not predefined sources
         if hasattr(args, "ip_url") and args.ip_url:
-            predefined_sources = ["cf", "gc", "aws", "ct"]
-            if args.ip_url.lower() not in predefined_sources:
-                if not _is_valid_url(args.ip_url):
+            registry = get_source_registry()
+            for source in split_source_spec(args.ip_url, registry):
+                if (
+                    source.lower() not in registry
+                    and not _is_valid_url(source)
+                    and not is_local_source(source)
+                ):
                     errors.append(
                         ValidationError(
                             "Invalid IP data URL format",
                             field="ip_url",
-                            value=args.ip_url,
-                            expected_format="cf, gc, aws, ct, or https://example.com/ips.json",
+                            value=source,
+                            expected_format="cf, gc, aws, ct, cf6, gc6, aws6, https://example.com/ips.json, /path/to/ips.txt, or a comma-separated list",
                         )
                     )
 
@@ -366,6 +751,20 @@ def _is_valid_url(url: str) -> bool:
     return bool(re.match(pattern, url))
 
 
+def _count_ip_entries(ip_file: str) -> int:
+    """Count non-empty lines of an IP list file without materializing them."""
+    count = 0
+    ends_inside_entry = False
+    with open(ip_file) as f:
+        while chunk := f.read(1 << 20):
+            count += len(chunk.split())
+            # An entry split across two chunks was counted twice
+            if ends_inside_entry and not chunk[0].isspace():
+                count -= 1
+            ends_inside_entry = not chunk[-1].isspace()
+    return count
+
+
 def _is_valid_domain(domain: str) -> bool:
     """Validate domain format (matches shell script logic)."""
     import re
@@ -437,15 +836,85 @@ def print_configuration_summary(config: Config) -> None:
     else:
         print("  ✓ Record Limit: Unlimited")
 
+    if config.shortlist:
+        print(
+            f"  ✓ Pipeline: TCP latency sweep ({config.probe_count} connects per IP), "
+            f"best {config.shortlist} to cfst"
+        )
+    if config.parallel_shards > 1:
+        jobs = config.parallel_jobs or config.parallel_shards
+        print(
+            f"  ✓ Parallel: {config.parallel_shards} cfst shards, {jobs} at once "
+            "(download tests one at a time)"
+        )
+    if config.engine == "tcp":
+        print(
+            f"  ✓ Engine: TCP connect ({config.probe_count} connects per IP, "
+            f"{config.probe_concurrency} concurrent)"
+        )
+        if config.download_count:
+            budget = f"{config.download_seconds:g}s"
+            if config.download_bytes:
+                budget += f" or {config.download_bytes} bytes"
+            if config.download_tolerance:
+                budget = (
+                    f"{config.download_min_seconds:g}-{budget} "
+                    f"(until ±{config.download_tolerance:.0%})"
+                )
+            print(
+                f"  ✓ Download Tests: {config.download_count} fastest IPs, {budget} each, "
+                f"{config.download_concurrency} concurrent"
+            )
+
     # IP data source section
     print("\n📊 IP Data Source:")
     if config.ip_data_url:
-        source_names = {"cf": "CloudFlare", "gc": "GCore", "ct": "CloudFront", "aws": "Amazon AWS"}
-        source_name = source_names.get(config.ip_data_url.lower(), config.ip_data_url)
+        source_names = {
+            "cf": "CloudFlare",
+            "gc": "GCore",
+            "ct": "CloudFront",
+            "aws": "Amazon AWS",
+            "cf6": "CloudFlare IPv6",
+            "gc6": "GCore IPv6",
+            "aws6": "Amazon AWS IPv6",
+        }
+        sources = split_source_spec(config.ip_data_url)
+        source_name = ", ".join(source_names.get(source.lower(), source) for source in sources)
         print(f"  ✓ Source: {source_name}")
+    elif config.zone_type == "AAAA":
+        print("  ✓ Source: Default (CloudFlare IPv6)")
     else:
         print("  ✓ Source: Default (CloudFlare)")
 
+    if config.sample_count > 0:
+        print(f"  ✓ Sampling: {config.sample_count} per /24 ({config.sample_mode})")
+    if config.stratify_budget > 0:
+        print(
+            f"  ✓ Stratified Sampling: {config.stratify_budget} probes "
+            f"({config.stratify_allocation}, {config.sample_mode})"
+        )
+    if (
+        config.sample_block_v6 != DEFAULT_BLOCK_PREFIX_V6
+        or config.sample_max_blocks_v6 != DEFAULT_MAX_BLOCKS_V6
+    ):
+        block_limit = config.sample_max_blocks_v6 or "all"
+        print(f"  ✓ IPv6 Sampling: per /{config.sample_block_v6}, {block_limit} blocks per prefix")
+
+    if config.exclude_file:
+        print(f"  ✓ Exclusions: {config.exclude_file}")
+
+    if config.ip_filter:
+        print(f"  ✓ Filter: {config.ip_filter}")
+
+    if config.delta:
+        print("  ✓ Delta Refresh: new prefixes and known-good blocks only")
+
+    if config.skip_dead:
+        print("  ✓ Skip Dead: known-unresponsive addresses and /24s are skipped")
+
+    if config.shard:
+        print(f"  ✓ Shard: {config.shard}")
+
     # Operational settings section
     print("\n⚙️ Operations:")
     operations = []
@@ -456,6 +925,8 @@ def print_configuration_summary(config: Config) -> None:
             operations.append("Update DNS (single record)")
         else:
             operations.append("Update DNS (multiple records)")
+    if config.watch:
+        operations.append("Watch local IP lists and rerun on change")
 
     if operations:
         for op in operations:
@@ -502,6 +973,10 @@ class WorkflowOrchestrator:
         self.results_handler = ResultsHandler(config)
         self.ip_source_manager = IPSourceManager(config)
         self.dns_manager = None
+        self._probed_ip_file = None  # Candidate file probed by this run's speed test
+        self._progress_shown = False  # A speed test status line is on screen
+        if sys.stdout.isatty():
+            self.speedtest_manager.progress_callback = self._show_speed_test_progress
 
         # Initialize DNS manager only if needed
         if config.update_dns:
@@ -513,6 +988,10 @@ class WorkflowOrchestrator:
             f"refresh={config.refresh}, only_one={config.only_one}"
         )
 
+    def close(self) -> None:
+        """Release resources held by the managers (e.g., local source watchers)."""
+        self.ip_source_manager.close()
+
     @log_performance("Complete Workflow")
     def execute(self) -> None:
         """Execute the complete workflow."""
@@ -553,6 +1032,77 @@ class WorkflowOrchestrator:
             self.logger.error(f"Workflow execution failed: {e}", exc_info=True)
             raise
 
+    def watch(self) -> None:
+        """
+        Rerun the workflow each time a local IP source file changes.
+
+        Runs until interrupted. A failed run is reported and the next change is
+        awaited, so a bad intermediate file does not stop the watcher.
+
+        Raises:
+            IPSourceError: If the IP source has no local files to watch
+        """
+        spec = self._get_ip_source()
+        watcher = self.ip_source_manager.watch_local_sources(spec)
+        if watcher is None:
+            raise IPSourceError(
+                "Watch mode requires a local IP source file",
+                source=spec,
+                suggestion="Use -i with a file path or file:// URL",
+            )
+
+        method = "inotify" if watcher.uses_inotify else "polling"
+        with watcher:
+            while True:
+                print(f"\n👀 Watching {len(watcher.paths)} local IP list(s) for changes ({method})")
+                watcher.wait()
+                print("\n🔄 Local IP list changed, rerunning workflow...")
+
+                # New candidates must be tested instead of reusing result.csv
+                self.config.refresh = True
+                try:
+                    self.execute()
+                except CDNBESTIPError as e:
+                    print(f"  ⚠️ Workflow failed, waiting for the next change: {e.message}")
+
+    def _get_ip_source(self) -> str:
+        """Get the IP source specification of this run."""
+        # Default to CloudFlare, using its IPv6 ranges for AAAA records
+        return self.config.ip_data_url or ("cf6" if self.config.zone_type == "AAAA" else "cf")
+
+    def _attribute_results(self, results: list[SpeedTestResult]) -> None:
+        """
+        Attribute results to their source prefixes and learn the colo of each prefix.
+
+        The per-prefix aggregates are stored for pruning ranges from future runs, and
+        the learned colos feed colo-stratified sampling.
+        """
+        try:
+            index = self.ip_source_manager.build_prefix_index(self._get_ip_source())
+            if len(index):
+                prefixes = index.lookup_many(result.ip for result in results)
+                for result, prefix in zip(results, prefixes, strict=True):
+                    result.prefix = prefix
+                    if prefix:
+                        result.source = ",".join(index.sources(prefix)) or None
+
+                aggregates = self.results_handler.aggregate_by_prefix(results)
+                self.ip_source_manager.record_prefix_stats(aggregates)
+                print(f"  ✓ Attributed results to {len(aggregates)} source prefixes")
+                best = sorted(aggregates.items(), key=lambda item: -item[1]["best_speed"])
+                for prefix, stats in best[:3]:
+                    colos = ", ".join(stats["colos"]) or "N/A"
+                    print(
+                        f"    • {prefix}: {stats['count']} results, "
+                        f"best {stats['best_speed']:.2f} MB/s, "
+                        f"avg {stats['avg_latency']:.1f}ms ({colos})"
+                    )
+
+            self.ip_source_manager.learn_prefix_colos(results)
+        except (IPSourceError, OSError, ValueError) as e:
+            # Attribution is informational; the results remain usable
+            self.logger.warning(f"Could not attribute results to source prefixes: {e}")
+
     def _prepare_ip_data(self) -> str:
         """
         Prepare IP data source file.
@@ -567,23 +1117,38 @@ class WorkflowOrchestrator:
         print("📊 Step 1: Preparing IP data source...")
 
         # Determine IP source and corresponding IP file name
-        ip_source = self.config.ip_data_url or "cf"  # Default to CloudFlare
+        ip_source = self._get_ip_source()
 
         # Generate IP file name based on source
-        if ip_source in ["cf", "gc", "ct", "aws"]:
+        if ip_source in get_source_registry():
             ip_file = f"ip_list_{ip_source}.txt"
+        elif len(split_source_spec(ip_source)) > 1:
+            # Several sources are merged into one candidate file
+            ip_file = "ip_list_merged.txt"
         else:
             # For custom URLs, use default name
             ip_file = "ip_list.txt"
 
+        if self.config.shard:
+            # Each shard keeps its own candidate file next to the others
+            ip_file = shard_file_name(ip_file, *parse_shard(self.config.shard))
+
         try:
             # Check if we need to refresh the IP file
             force_refresh = self.config.refresh or not os.path.exists(ip_file)
+            if not force_refresh and self.ip_source_manager.local_sources_newer_than(
+                ip_source, ip_file
+            ):
+                print("  🔄 Local IP list changed since the IP file was written")
+                force_refresh = True
 
             if force_refresh:
                 print(f"  📥 Downloading IP list from source: {ip_source}")
                 try:
-                    self.ip_source_manager.download_ip_list(ip_source, ip_file, force_refresh=True)
+                    # Without --refresh a usable cached list is reused instead of downloaded
+                    self.ip_source_manager.download_ip_list(
+                        ip_source, ip_file, force_refresh=bool(self.config.refresh)
+                    )
                 except Exception as e:
                     if "timeout" in str(e).lower() or "connection" in str(e).lower():
                         raise NetworkError(
@@ -604,9 +1169,15 @@ class WorkflowOrchestrator:
             else:
                 # Check if we can use cached version
                 cache_file = self.ip_source_manager._get_cache_file(ip_source)
-                if cache_file.exists() and self.ip_source_manager._is_cache_valid(cache_file):
+                cache_ttl = self.ip_source_manager.get_cache_ttl(ip_source)
+                if cache_file.exists() and self.ip_source_manager._is_cache_valid(
+                    cache_file, cache_ttl
+                ):
                     print(f"  📋 Using cached IP list from: {cache_file}")
                     self.ip_source_manager._copy_from_cache(cache_file, ip_file)
+                elif cache_file.exists() and self.config.stale_while_revalidate:
+                    print(f"  📋 Using expired cached IP list, refreshing in background: {cache_file}")
+                    self.ip_source_manager.download_ip_list(ip_source, ip_file)
                 else:
                     print(f"  ✓ Using existing IP file: {ip_file}")
 
@@ -620,9 +1191,7 @@ class WorkflowOrchestrator:
                 )
 
             try:
-                with open(ip_file) as f:
-                    ip_lines = [line.strip() for line in f if line.strip()]
-                    ip_count = len(ip_lines)
+                ip_count = _count_ip_entries(ip_file)
 
                 if ip_count == 0:
                     raise FileError(
@@ -647,6 +1216,21 @@ class WorkflowOrchestrator:
         except Exception as e:
             raise IPSourceError(f"Unexpected error preparing IP data: {e}") from e
 
+    def _show_speed_test_progress(self, progress: CfstProgress) -> None:
+        """Redraw the speed test status line."""
+        if progress.phase == "latency":
+            status = (
+                f"Latency test: {progress.done}/{progress.total} tested, "
+                f"{progress.qualified} available"
+            )
+            if progress.eta is not None:
+                minutes, seconds = divmod(int(progress.eta), 60)
+                status += f", ETA {minutes}:{seconds:02d}"
+        else:
+            status = f"Download test: {progress.qualified}/{progress.total} above threshold"
+        print(f"\r    ⏳ {status}\033[K", end="", flush=True)
+        self._progress_shown = True
+
     def _run_speed_test(self, ip_file: str) -> str:
         """
         Run speed test using CloudflareSpeedTest binary.
@@ -665,6 +1249,8 @@ class WorkflowOrchestrator:
         print("\n⚡ Step 2: Running speed test...")
 
         results_file = "result.csv"
+        if self.config.shard:
+            results_file = shard_file_name(results_file, *parse_shard(self.config.shard))
 
         try:
             # Check if we need to refresh results
@@ -681,30 +1267,33 @@ class WorkflowOrchestrator:
                     except OSError as e:
                         print(f"  ⚠️ Warning: Could not remove existing results file: {e}")
                         # Continue anyway, the speed test will overwrite it
-                print("  🔧 Ensuring CloudflareSpeedTest binary is available...")
-                try:
-                    binary_path = self.speedtest_manager.ensure_binary_available()
-                    print(f"  ✓ Binary ready: {binary_path}")
-                except Exception as e:
-                    if "not found" in str(e).lower():
-                        raise BinaryError(
-                            "CloudflareSpeedTest binary not found",
-                            suggestion="The binary will be downloaded automatically. Ensure internet connectivity",
-                        ) from e
-                    elif "permission" in str(e).lower():
-                        raise BinaryError(
-                            f"Permission denied accessing binary: {e}",
-                            suggestion="Check file permissions or run with appropriate privileges",
-                        ) from e
-                    elif "no binary available" in str(e).lower():
-                        os_name, arch = self.speedtest_manager.get_system_info()
-                        raise BinaryError(
-                            f"CloudflareSpeedTest binary not available for {os_name}/{arch}",
-                            platform_info=f"{os_name}/{arch}",
-                            suggestion="Check supported platforms at https://github.com/XIU2/CloudflareSpeedTest/releases",
-                        ) from e
-                    else:
-                        raise BinaryError(f"Binary setup failed: {e}") from e
+                if getattr(self.config, "engine", "cfst") == "tcp":
+                    print("  ✓ Using built-in TCP latency prober (no binary needed)")
+                else:
+                    print("  🔧 Ensuring CloudflareSpeedTest binary is available...")
+                    try:
+                        binary_path = self.speedtest_manager.ensure_binary_available()
+                        print(f"  ✓ Binary ready: {binary_path}")
+                    except Exception as e:
+                        if "not found" in str(e).lower():
+                            raise BinaryError(
+                                "CloudflareSpeedTest binary not found",
+                                suggestion="The binary will be downloaded automatically. Ensure internet connectivity",
+                            ) from e
+                        elif "permission" in str(e).lower():
+                            raise BinaryError(
+                                f"Permission denied accessing binary: {e}",
+                                suggestion="Check file permissions or run with appropriate privileges",
+                            ) from e
+                        elif "no binary available" in str(e).lower():
+                            os_name, arch = self.speedtest_manager.get_system_info()
+                            raise BinaryError(
+                                f"CloudflareSpeedTest binary not available for {os_name}/{arch}",
+                                platform_info=f"{os_name}/{arch}",
+                                suggestion="Check supported platforms at https://github.com/XIU2/CloudflareSpeedTest/releases",
+                            ) from e
+                        else:
+                            raise BinaryError(f"Binary setup failed: {e}") from e
 
                 print("  🏃 Executing speed test...")
                 print(f"    - IP file: {ip_file}")
@@ -717,7 +1306,15 @@ class WorkflowOrchestrator:
                     print(f"    - Result limit: {self.config.quantity}")
 
                 try:
-                    results_file = self.speedtest_manager.run_speed_test(ip_file, results_file)
+                    try:
+                        results_file = self.speedtest_manager.run_speed_test(
+                            ip_file, results_file
+                        )
+                    finally:
+                        if self._progress_shown:
+                            print()
+                            self._progress_shown = False
+                    self._probed_ip_file = ip_file
                     print(f"  ✓ Speed test completed: {results_file}")
                 except Exception as e:
                     if "timeout" in str(e).lower():
@@ -768,9 +1365,22 @@ class WorkflowOrchestrator:
             results = self.speedtest_manager.parse_results(results_file)
             print(f"  ✓ Parsed {len(results)} results")
 
+            # Learn unresponsive candidates when the results cover every responder
+            if (
+                self.config.skip_dead
+                and self._probed_ip_file
+                and self.speedtest_manager.lists_all_responders()
+            ):
+                recorded = self.ip_source_manager.record_dead_candidates(
+                    self._probed_ip_file, (result.ip for result in results)
+                )
+                if recorded:
+                    print(f"  ✓ Recorded {recorded} unresponsive addresses/blocks")
+
             # Validate results
             valid_results = self.speedtest_manager.validate_results(results)
             print(f"  ✓ {len(valid_results)} valid results")
+            self._attribute_results(valid_results)
 
             # Filter by speed threshold (only if specified and > 0)
             if (
@@ -794,6 +1404,10 @@ class WorkflowOrchestrator:
                 filtered_results = valid_results
                 print("  ✓ No speed threshold applied, using all valid results")
 
+            # Remember where qualifying results came from, so a later --delta run can
+            # re-test them even if this run was a full one
+            self.ip_source_manager.record_good_results(result.ip for result in filtered_results)
+
             # Get top results
             if self.config.only_one:
                 top_results = filtered_results[:1]
@@ -1066,6 +1680,7 @@ def execute_command(args: argparse.Namespace) -> None:
     print_configuration_summary(config)
 
     # Execute the workflow
+    workflow = None
     try:
         print("\n🚀 Starting CDNBESTIP workflow...")
         workflow = WorkflowOrchestrator(config)
@@ -1073,6 +1688,9 @@ def execute_command(args: argparse.Namespace) -> None:
         print("\n✅ Workflow completed successfully!")
         logger.info("Workflow completed successfully")
 
+        if config.watch:
+            workflow.watch()
+
     except AuthenticationError as e:
         logger.error(f"Authentication failed: {e}")
         print(f"\n❌ Authentication Error: {e.message}", file=sys.stderr)
@@ -1143,6 +1761,47 @@ def execute_command(args: argparse.Namespace) -> None:
         )
         sys.exit(1)
 
+    finally:
+        if workflow is not None:
+            workflow.close()
+
+
+def merge_command(argv: list[str]) -> None:
+    """
+    Merge the result files of several shards into one result file.
+
+    Args:
+        argv: Arguments following the "merge" command
+
+    Raises:
+        SpeedTestError: If the shard result files cannot be merged
+    """
+    parser = argparse.ArgumentParser(
+        prog="cdnbestip merge",
+        description="Merge per-shard speed test results into one result file",
+    )
+    parser.add_argument("files", nargs="+", metavar="FILE", help="Shard result files")
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="result.csv",
+        metavar="FILE",
+        help="Merged result file (default: result.csv)",
+    )
+    args = parser.parse_args(argv)
+
+    missing = [path for path in args.files if not os.path.isfile(path)]
+    if missing:
+        raise ValidationError(
+            f"Shard result file not found: {missing[0]}",
+            field="files",
+            value=missing[0],
+            expected_format="existing result files written with --shard",
+        )
+
+    rows = merge_result_files(args.files, args.output)
+    print(f"✓ Merged {len(args.files)} result files into {args.output} ({rows} IPs)")
+
 
 def main() -> None:
     """
@@ -1160,6 +1819,10 @@ def main() -> None:
         130: Interrupted by user (SIGINT)
     """
     try:
+        if len(sys.argv) > 1 and sys.argv[1] == "merge":
+            merge_command(sys.argv[2:])
+            return
+
         # Parse command line arguments
         args = parse_arguments()
         logger.info("Starting CDNBESTIP application")
@@ -0,0 +1,62 @@
+"""Bounded-concurrency helpers shared by the asyncio probe engines."""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Iterable
+from typing import TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def gather_bounded(
+    func: Callable[[T], Awaitable[R]], items: Iterable[T], concurrency: int
+) -> list[R]:
+    """
+    Run a coroutine function over items with at most ``concurrency`` in flight.
+
+    Items are consumed lazily and a task is only created once a slot is free.
+    Finished tasks are dropped as soon as their result is stored, so only the
+    tasks in flight are kept; the returned results still grow with the input.
+
+    Args:
+        func: Coroutine function called with each item
+        items: Items to process (may be a generator)
+        concurrency: Maximum number of calls running at once
+
+    Returns:
+        One result per item, in input order
+
+    Raises:
+        Exception: The first exception raised by a call, once all started calls finish
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    results: list[R | None] = []
+    pending: set[asyncio.Task] = set()
+    errors: list[BaseException] = []
+
+    async def run(index: int, item: T) -> None:
+        try:
+            results[index] = await func(item)
+        finally:
+            semaphore.release()
+
+    def finished(task: asyncio.Task) -> None:
+        pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            errors.append(task.exception())
+
+    for index, item in enumerate(items):
+        await semaphore.acquire()
+        if errors:
+            semaphore.release()
+            break
+        results.append(None)
+        task = asyncio.create_task(run(index, item))
+        pending.add(task)
+        task.add_done_callback(finished)
+
+    if pending:
+        await asyncio.wait(pending)
+    if errors:
+        raise errors[0]
+    return results
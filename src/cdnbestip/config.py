@@ -5,7 +5,21 @@ import re
 import socket
 from dataclasses import dataclass
 
-from .exceptions import ConfigurationError
+from .download import (
+    DEFAULT_DOWNLOAD_CONCURRENCY,
+    DEFAULT_DOWNLOAD_SECONDS,
+    DEFAULT_MIN_DOWNLOAD_SECONDS,
+)
+from .exceptions import ConfigurationError, IPSourceError
+from .item_filter import ItemFilter
+from .local_source import is_local_source
+from .mirror_race import DEFAULT_RACE_DELAY
+from .packed_cache import CACHE_FORMATS
+from .probe import DEFAULT_PROBE_CONCURRENCY, DEFAULT_PROBE_COUNT, ENGINES
+from .sampling import DEFAULT_BLOCK_PREFIX_V6, DEFAULT_MAX_BLOCKS_V6, SAMPLE_MODES
+from .sharding import parse_shard
+from .source_registry import get_source_registry
+from .stratified import STRATIFY_ALLOCATIONS
 
 
 def is_china_network() -> bool:
@@ -56,6 +70,18 @@ class Config:
     speed_url: str | None = None
     timeout: int = 600  # Speed test timeout in seconds (default: 10 minutes)
     quantity: int = 0
+    engine: str = "cfst"  # Probe engine: cfst binary or the built-in tcp latency prober
+    probe_concurrency: int = DEFAULT_PROBE_CONCURRENCY  # Addresses probed at once (tcp engine)
+    probe_count: int = DEFAULT_PROBE_COUNT  # Connects per address (tcp engine)
+    download_count: int = 0  # Lowest-latency addresses download tested by the tcp engine
+    download_concurrency: int = DEFAULT_DOWNLOAD_CONCURRENCY  # Downloads run at once
+    download_seconds: float = DEFAULT_DOWNLOAD_SECONDS  # Download time budget per address
+    download_bytes: int = 0  # Download byte budget per address (0 = time budget only)
+    download_tolerance: float = 0.0  # Stop a download once its rate is this precise (0 = off)
+    download_min_seconds: float = DEFAULT_MIN_DOWNLOAD_SECONDS  # Least time before stopping
+    shortlist: int = 0  # Sweep latency natively and pass only the best N addresses to cfst
+    parallel_shards: int = 1  # cfst processes the candidate file is split across
+    parallel_jobs: int = 0  # cfst processes run at the same time (0 = one per shard)
 
     # Operational settings
     refresh: bool = False
@@ -66,6 +92,26 @@ class Config:
     extend_string: str | None = None
     proxy_url: str | None = None
 
+    # Candidate sampling settings
+    sample_count: int = 0  # Addresses per /24 block (0 = keep prefixes as-is)
+    sample_mode: str = "uniform"
+    sample_seed: int | None = None
+    sample_block_v6: int = DEFAULT_BLOCK_PREFIX_V6  # IPv6 sampling block prefix length
+    sample_max_blocks_v6: int = DEFAULT_MAX_BLOCKS_V6  # IPv6 blocks sampled per prefix (0 = all)
+    stratify_budget: int = 0  # Total probes spread across /16s or colos (0 = disabled)
+    stratify_allocation: str = "proportional"  # Budget split across strata: proportional or equal
+    exclude_file: str | None = None  # File of addresses/prefixes never passed to the speed test
+    ip_filter: str | None = None  # Field filter for JSON source items (e.g. "service=CLOUDFRONT")
+    delta: bool = False  # Only probe prefixes added since the cached list plus known-good blocks
+    skip_dead: bool = False  # Skip addresses and /24s that repeatedly failed to respond
+    watch: bool = False  # Keep running and rerun whenever a local IP source file changes
+    shard: str | None = None  # Probe only this node's share of the candidates, as "i/N"
+    cache_format: str = "text"  # IP list cache format: text or packed
+    cache_ttl_hours: float | None = None  # Overrides the per-source cache lifetime
+    stale_while_revalidate: bool = False  # Use expired caches and refresh them in background
+    mirror_race: bool = True  # Race the CDN mirror against the origin URL
+    race_delay: float = DEFAULT_RACE_DELAY  # Seconds before starting the second race candidate
+
     def __post_init__(self):
         """Validate configuration after initialization."""
         # Skip validation if _skip_validation is set (for testing)
@@ -77,6 +123,10 @@ class Config:
         self._validate_credentials()
         self._validate_dns_settings()
         self._validate_speed_settings()
+        self._validate_sampling_settings()
+        self._validate_ip_filter()
+        self._validate_shard_settings()
+        self._validate_cache_settings()
         self._validate_urls()
 
     def _validate_credentials(self) -> None:
@@ -137,6 +187,116 @@ class Config:
         if self.quantity < 0:
             raise ConfigurationError("Quantity must be greater than or equal to 0")
 
+        # Validate probe engine
+        if self.engine not in ENGINES:
+            raise ConfigurationError(
+                f"Invalid engine: {self.engine}. Must be one of {list(ENGINES)}"
+            )
+        if self.probe_concurrency <= 0:
+            raise ConfigurationError("Probe concurrency must be greater than 0")
+        if self.probe_count <= 0:
+            raise ConfigurationError("Probe count must be greater than 0")
+        if self.download_count < 0:
+            raise ConfigurationError("Download count must be greater than or equal to 0")
+        if self.download_concurrency <= 0:
+            raise ConfigurationError("Download concurrency must be greater than 0")
+        if self.download_seconds <= 0:
+            raise ConfigurationError("Download duration must be greater than 0")
+        if self.download_bytes < 0:
+            raise ConfigurationError("Download byte budget must be greater than or equal to 0")
+        if self.download_tolerance < 0:
+            raise ConfigurationError("Download tolerance must be greater than or equal to 0")
+        if self.download_min_seconds <= 0:
+            raise ConfigurationError("Download minimum duration must be greater than 0")
+        if self.shortlist < 0:
+            raise ConfigurationError("Shortlist size must be greater than or equal to 0")
+        if self.shortlist and self.engine == "tcp":
+            raise ConfigurationError(
+                "The tcp engine already download tests a shortlist. "
+                "Use --download-count to set its size"
+            )
+        if self.parallel_shards <= 0:
+            raise ConfigurationError("Parallel shard count must be greater than 0")
+        if self.parallel_jobs < 0:
+            raise ConfigurationError("Parallel job limit must be greater than or equal to 0")
+        if self.parallel_shards > 1 and self.engine == "tcp":
+            raise ConfigurationError(
+                "The tcp engine already probes concurrently. "
+                "Use --probe-concurrency to set how many addresses are probed at once"
+            )
+        if self.engine == "tcp" and self.speed_threshold and not self.download_count:
+            raise ConfigurationError(
+                "A speed threshold needs download tests. "
+                "Set --download-count to download test the fastest addresses with the tcp engine"
+            )
+
+    def _validate_sampling_settings(self) -> None:
+        """Validate candidate sampling settings."""
+        if self.sample_count < 0:
+            raise ConfigurationError("Sample count must be greater than or equal to 0")
+
+        if self.sample_mode not in SAMPLE_MODES:
+            raise ConfigurationError(
+                f"Invalid sample mode: {self.sample_mode}. Must be one of {list(SAMPLE_MODES)}"
+            )
+
+        if not (0 <= self.sample_block_v6 <= 128):
+            raise ConfigurationError("IPv6 sampling block prefix must be between 0 and 128")
+
+        if self.sample_max_blocks_v6 < 0:
+            raise ConfigurationError("IPv6 block limit must be greater than or equal to 0")
+
+        if self.stratify_budget < 0:
+            raise ConfigurationError("Stratified budget must be greater than or equal to 0")
+
+        if self.stratify_allocation not in STRATIFY_ALLOCATIONS:
+            raise ConfigurationError(
+                f"Invalid stratified allocation: {self.stratify_allocation}. "
+                f"Must be one of {list(STRATIFY_ALLOCATIONS)}"
+            )
+
+        if self.stratify_budget and self.sample_count:
+            raise ConfigurationError(
+                "Per-block sampling and stratified sampling cannot be combined"
+            )
+
+    def _validate_cache_settings(self) -> None:
+        """Validate IP list cache settings."""
+        if self.cache_format not in CACHE_FORMATS:
+            raise ConfigurationError(
+                f"Invalid cache format: {self.cache_format}. Must be one of {list(CACHE_FORMATS)}"
+            )
+
+        if self.cache_ttl_hours is not None and self.cache_ttl_hours <= 0:
+            raise ConfigurationError("Cache TTL must be greater than 0")
+
+        if self.race_delay < 0:
+            raise ConfigurationError("Race delay must be greater than or equal to 0")
+
+    def _validate_shard_settings(self) -> None:
+        """Validate multi-node shard settings."""
+        if not self.shard:
+            return
+
+        try:
+            parse_shard(self.shard)
+        except ValueError as e:
+            raise ConfigurationError(str(e)) from e
+
+        if self.update_dns:
+            raise ConfigurationError(
+                "DNS updates need the results of all shards. "
+                "Merge the shard result files with 'cdnbestip merge' and update DNS from result.csv"
+            )
+
+    def _validate_ip_filter(self) -> None:
+        """Validate the JSON source item filter expression."""
+        if self.ip_filter:
+            try:
+                ItemFilter.parse(self.ip_filter)
+            except IPSourceError as e:
+                raise ConfigurationError(f"Invalid IP filter: {e}") from e
+
     def _validate_urls(self) -> None:
         """Validate URL parameters."""
         # Validate speed test URL
@@ -147,12 +307,20 @@ class Config:
         if self.cdn_url and not self._is_valid_url(self.cdn_url):
             raise ConfigurationError(f"Invalid CDN URL: {self.cdn_url}")
 
-        # Validate IP data URL (if it's not a predefined source)
+        # Validate IP data URL(s) (comma-separated; each a predefined source, URL or file)
+        local_sources = []
         if self.ip_data_url:
-            predefined_sources = ["cf", "gc", "aws", "ct"]
-            if self.ip_data_url.lower() not in predefined_sources:
-                if not self._is_valid_url(self.ip_data_url):
-                    raise ConfigurationError(f"Invalid IP data URL: {self.ip_data_url}")
+            registry = get_source_registry()
+            for source in self.ip_data_url.split(","):
+                source = source.strip()
+                if source.lower() not in registry:
+                    if is_local_source(source):
+                        local_sources.append(source)
+                    elif not self._is_valid_url(source):
+                        raise ConfigurationError(f"Invalid IP data URL: {source}")
+
+        if self.watch and not local_sources:
+            raise ConfigurationError("Watch mode requires a local IP source file")
 
         # Validate proxy URL
         if self.proxy_url and not self._is_valid_proxy_url(self.proxy_url):
@@ -259,6 +427,154 @@ def load_config_from_env() -> Config:
     config.extend_string = os.getenv("CDNBESTIP_EXTEND")
     config.proxy_url = os.getenv("CDNBESTIP_PROXY")
 
+    # Candidate sampling
+    sample_env = os.getenv("CDNBESTIP_SAMPLE")
+    if sample_env:
+        try:
+            config.sample_count = int(sample_env)
+        except ValueError:
+            pass
+
+    config.sample_mode = os.getenv("CDNBESTIP_SAMPLE_MODE", "uniform")
+
+    sample_seed_env = os.getenv("CDNBESTIP_SAMPLE_SEED")
+    if sample_seed_env:
+        try:
+            config.sample_seed = int(sample_seed_env)
+        except ValueError:
+            pass
+
+    sample_block_v6_env = os.getenv("CDNBESTIP_SAMPLE_BLOCK_V6")
+    if sample_block_v6_env:
+        try:
+            config.sample_block_v6 = int(sample_block_v6_env)
+        except ValueError:
+            pass
+
+    sample_max_blocks_v6_env = os.getenv("CDNBESTIP_SAMPLE_MAX_BLOCKS_V6")
+    if sample_max_blocks_v6_env:
+        try:
+            config.sample_max_blocks_v6 = int(sample_max_blocks_v6_env)
+        except ValueError:
+            pass
+
+    stratify_env = os.getenv("CDNBESTIP_STRATIFY")
+    if stratify_env:
+        try:
+            config.stratify_budget = int(stratify_env)
+        except ValueError:
+            pass
+
+    config.stratify_allocation = os.getenv("CDNBESTIP_STRATIFY_ALLOCATION", "proportional")
+
+    config.exclude_file = os.getenv("CDNBESTIP_EXCLUDE")
+    config.ip_filter = os.getenv("CDNBESTIP_IP_FILTER")
+    config.shard = os.getenv("CDNBESTIP_SHARD")
+    config.delta = os.getenv("CDNBESTIP_DELTA", "").lower() in ("1", "true", "yes")
+    config.skip_dead = os.getenv("CDNBESTIP_SKIP_DEAD", "").lower() in ("1", "true", "yes")
+    config.watch = os.getenv("CDNBESTIP_WATCH", "").lower() in ("1", "true", "yes")
+    config.cache_format = os.getenv("CDNBESTIP_CACHE_FORMAT", "text")
+
+    cache_ttl_env = os.getenv("CDNBESTIP_CACHE_TTL")
+    if cache_ttl_env:
+        try:
+            config.cache_ttl_hours = float(cache_ttl_env)
+        except ValueError:
+            pass
+
+    config.stale_while_revalidate = os.getenv("CDNBESTIP_STALE_WHILE_REVALIDATE", "").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    config.mirror_race = os.getenv("CDNBESTIP_MIRROR_RACE", "1").lower() not in ("0", "false", "no")
+
+    race_delay_env = os.getenv("CDNBESTIP_RACE_DELAY")
+    if race_delay_env:
+        try:
+            config.race_delay = float(race_delay_env)
+        except ValueError:
+            pass
+
+    config.engine = os.getenv("CDNBESTIP_ENGINE", "cfst")
+
+    probe_concurrency_env = os.getenv("CDNBESTIP_PROBE_CONCURRENCY")
+    if probe_concurrency_env:
+        try:
+            config.probe_concurrency = int(probe_concurrency_env)
+        except ValueError:
+            pass
+
+    probe_count_env = os.getenv("CDNBESTIP_PROBE_COUNT")
+    if probe_count_env:
+        try:
+            config.probe_count = int(probe_count_env)
+        except ValueError:
+            pass
+
+    download_count_env = os.getenv("CDNBESTIP_DOWNLOAD_COUNT")
+    if download_count_env:
+        try:
+            config.download_count = int(download_count_env)
+        except ValueError:
+            pass
+
+    download_concurrency_env = os.getenv("CDNBESTIP_DOWNLOAD_CONCURRENCY")
+    if download_concurrency_env:
+        try:
+            config.download_concurrency = int(download_concurrency_env)
+        except ValueError:
+            pass
+
+    download_seconds_env = os.getenv("CDNBESTIP_DOWNLOAD_SECONDS")
+    if download_seconds_env:
+        try:
+            config.download_seconds = float(download_seconds_env)
+        except ValueError:
+            pass
+
+    download_bytes_env = os.getenv("CDNBESTIP_DOWNLOAD_BYTES")
+    if download_bytes_env:
+        try:
+            config.download_bytes = int(download_bytes_env)
+        except ValueError:
+            pass
+
+    download_tolerance_env = os.getenv("CDNBESTIP_DOWNLOAD_TOLERANCE")
+    if download_tolerance_env:
+        try:
+            config.download_tolerance = float(download_tolerance_env)
+        except ValueError:
+            pass
+
+    download_min_seconds_env = os.getenv("CDNBESTIP_DOWNLOAD_MIN_SECONDS")
+    if download_min_seconds_env:
+        try:
+            config.download_min_seconds = float(download_min_seconds_env)
+        except ValueError:
+            pass
+
+    shortlist_env = os.getenv("CDNBESTIP_SHORTLIST")
+    if shortlist_env:
+        try:
+            config.shortlist = int(shortlist_env)
+        except ValueError:
+            pass
+
+    parallel_shards_env = os.getenv("CDNBESTIP_PARALLEL_SHARDS")
+    if parallel_shards_env:
+        try:
+            config.parallel_shards = int(parallel_shards_env)
+        except ValueError:
+            pass
+
+    parallel_jobs_env = os.getenv("CDNBESTIP_PARALLEL_JOBS")
+    if parallel_jobs_env:
+        try:
+            config.parallel_jobs = int(parallel_jobs_env)
+        except ValueError:
+            pass
+
     return config
 
 
@@ -318,6 +634,70 @@ def load_config(args) -> Config:
     if hasattr(args, "proxy") and args.proxy:
         cli_overrides["proxy_url"] = args.proxy
 
+    # Candidate sampling
+    if hasattr(args, "sample") and args.sample is not None:
+        cli_overrides["sample_count"] = args.sample
+    if hasattr(args, "sample_mode") and args.sample_mode:
+        cli_overrides["sample_mode"] = args.sample_mode
+    if hasattr(args, "sample_seed") and args.sample_seed is not None:
+        cli_overrides["sample_seed"] = args.sample_seed
+    if hasattr(args, "sample_block_v6") and args.sample_block_v6 is not None:
+        cli_overrides["sample_block_v6"] = args.sample_block_v6
+    if hasattr(args, "sample_max_blocks_v6") and args.sample_max_blocks_v6 is not None:
+        cli_overrides["sample_max_blocks_v6"] = args.sample_max_blocks_v6
+    if hasattr(args, "stratify") and args.stratify is not None:
+        cli_overrides["stratify_budget"] = args.stratify
+    if hasattr(args, "stratify_allocation") and args.stratify_allocation:
+        cli_overrides["stratify_allocation"] = args.stratify_allocation
+    if hasattr(args, "exclude") and args.exclude:
+        cli_overrides["exclude_file"] = args.exclude
+    if hasattr(args, "ip_filter") and args.ip_filter:
+        cli_overrides["ip_filter"] = args.ip_filter
+    if hasattr(args, "shard") and args.shard:
+        cli_overrides["shard"] = args.shard
+    if hasattr(args, "delta") and args.delta:
+        cli_overrides["delta"] = args.delta
+    if hasattr(args, "skip_dead") and args.skip_dead:
+        cli_overrides["skip_dead"] = args.skip_dead
+    if hasattr(args, "watch") and args.watch:
+        cli_overrides["watch"] = args.watch
+    if hasattr(args, "cache_format") and args.cache_format:
+        cli_overrides["cache_format"] = args.cache_format
+    if hasattr(args, "cache_ttl") and args.cache_ttl is not None:
+        cli_overrides["cache_ttl_hours"] = args.cache_ttl
+    if hasattr(args, "stale_while_revalidate") and args.stale_while_revalidate:
+        cli_overrides["stale_while_revalidate"] = args.stale_while_revalidate
+    if hasattr(args, "no_race") and args.no_race:
+        cli_overrides["mirror_race"] = False
+    if hasattr(args, "race_delay") and args.race_delay is not None:
+        cli_overrides["race_delay"] = args.race_delay
+
+    # Probe engine
+    if hasattr(args, "engine") and args.engine:
+        cli_overrides["engine"] = args.engine
+    if hasattr(args, "probe_concurrency") and args.probe_concurrency is not None:
+        cli_overrides["probe_concurrency"] = args.probe_concurrency
+    if hasattr(args, "probe_count") and args.probe_count is not None:
+        cli_overrides["probe_count"] = args.probe_count
+    if hasattr(args, "download_count") and args.download_count is not None:
+        cli_overrides["download_count"] = args.download_count
+    if hasattr(args, "download_concurrency") and args.download_concurrency is not None:
+        cli_overrides["download_concurrency"] = args.download_concurrency
+    if hasattr(args, "download_seconds") and args.download_seconds is not None:
+        cli_overrides["download_seconds"] = args.download_seconds
+    if hasattr(args, "download_bytes") and args.download_bytes is not None:
+        cli_overrides["download_bytes"] = args.download_bytes
+    if hasattr(args, "download_tolerance") and args.download_tolerance is not None:
+        cli_overrides["download_tolerance"] = args.download_tolerance
+    if hasattr(args, "download_min_seconds") and args.download_min_seconds is not None:
+        cli_overrides["download_min_seconds"] = args.download_min_seconds
+    if hasattr(args, "shortlist") and args.shortlist is not None:
+        cli_overrides["shortlist"] = args.shortlist
+    if hasattr(args, "parallel_shards") and args.parallel_shards is not None:
+        cli_overrides["parallel_shards"] = args.parallel_shards
+    if hasattr(args, "parallel_jobs") and args.parallel_jobs is not None:
+        cli_overrides["parallel_jobs"] = args.parallel_jobs
+
     # Merge environment config with CLI overrides
     config = merge_config(env_config, **cli_overrides)
 
@@ -350,6 +730,45 @@ def merge_config(base_config: Config, **overrides) -> Config:
         "ip_data_url": overrides.get("ip_data_url") or base_config.ip_data_url,
         "extend_string": overrides.get("extend_string") or base_config.extend_string,
         "proxy_url": overrides.get("proxy_url") or base_config.proxy_url,
+        "sample_count": overrides.get("sample_count", base_config.sample_count),
+        "sample_mode": overrides.get("sample_mode") or base_config.sample_mode,
+        "sample_seed": overrides.get("sample_seed", base_config.sample_seed),
+        "sample_block_v6": overrides.get("sample_block_v6", base_config.sample_block_v6),
+        "sample_max_blocks_v6": overrides.get(
+            "sample_max_blocks_v6", base_config.sample_max_blocks_v6
+        ),
+        "stratify_budget": overrides.get("stratify_budget", base_config.stratify_budget),
+        "stratify_allocation": overrides.get("stratify_allocation")
+        or base_config.stratify_allocation,
+        "exclude_file": overrides.get("exclude_file") or base_config.exclude_file,
+        "ip_filter": overrides.get("ip_filter") or base_config.ip_filter,
+        "shard": overrides.get("shard") or base_config.shard,
+        "delta": overrides.get("delta", base_config.delta),
+        "skip_dead": overrides.get("skip_dead", base_config.skip_dead),
+        "watch": overrides.get("watch", base_config.watch),
+        "cache_format": overrides.get("cache_format") or base_config.cache_format,
+        "cache_ttl_hours": overrides.get("cache_ttl_hours", base_config.cache_ttl_hours),
+        "stale_while_revalidate": overrides.get(
+            "stale_while_revalidate", base_config.stale_while_revalidate
+        ),
+        "mirror_race": overrides.get("mirror_race", base_config.mirror_race),
+        "race_delay": overrides.get("race_delay", base_config.race_delay),
+        "engine": overrides.get("engine") or base_config.engine,
+        "probe_concurrency": overrides.get("probe_concurrency", base_config.probe_concurrency),
+        "probe_count": overrides.get("probe_count", base_config.probe_count),
+        "download_count": overrides.get("download_count", base_config.download_count),
+        "download_concurrency": overrides.get(
+            "download_concurrency", base_config.download_concurrency
+        ),
+        "download_seconds": overrides.get("download_seconds", base_config.download_seconds),
+        "download_bytes": overrides.get("download_bytes", base_config.download_bytes),
+        "download_tolerance": overrides.get("download_tolerance", base_config.download_tolerance),
+        "download_min_seconds": overrides.get(
+            "download_min_seconds", base_config.download_min_seconds
+        ),
+        "shortlist": overrides.get("shortlist", base_config.shortlist),
+        "parallel_shards": overrides.get("parallel_shards", base_config.parallel_shards),
+        "parallel_jobs": overrides.get("parallel_jobs", base_config.parallel_jobs),
     }
 
     return Config(**config_dict)
@@ -381,6 +800,50 @@ def load_config_from_args(args) -> Config:
     config.ip_data_url = args_dict.get("ip_url") or args_dict.get("ipurl")
     config.extend_string = args_dict.get("extend")
     config.proxy_url = args_dict.get("proxy")
+    config.sample_count = args_dict.get("sample") or 0
+    config.sample_mode = args_dict.get("sample_mode") or "uniform"
+    config.sample_seed = args_dict.get("sample_seed")
+    if args_dict.get("sample_block_v6") is not None:
+        config.sample_block_v6 = args_dict["sample_block_v6"]
+    if args_dict.get("sample_max_blocks_v6") is not None:
+        config.sample_max_blocks_v6 = args_dict["sample_max_blocks_v6"]
+    config.stratify_budget = args_dict.get("stratify") or 0
+    config.stratify_allocation = args_dict.get("stratify_allocation") or "proportional"
+    config.exclude_file = args_dict.get("exclude")
+    config.ip_filter = args_dict.get("ip_filter")
+    config.shard = args_dict.get("shard")
+    config.delta = args_dict.get("delta", False)
+    config.skip_dead = args_dict.get("skip_dead", False)
+    config.watch = args_dict.get("watch", False)
+    config.cache_format = args_dict.get("cache_format") or "text"
+    config.cache_ttl_hours = args_dict.get("cache_ttl")
+    config.stale_while_revalidate = args_dict.get("stale_while_revalidate", False)
+    config.mirror_race = not args_dict.get("no_race", False)
+    race_delay = args_dict.get("race_delay")
+    config.race_delay = DEFAULT_RACE_DELAY if race_delay is None else race_delay
+    config.engine = args_dict.get("engine") or "cfst"
+    if args_dict.get("probe_concurrency") is not None:
+        config.probe_concurrency = args_dict["probe_concurrency"]
+    if args_dict.get("probe_count") is not None:
+        config.probe_count = args_dict["probe_count"]
+    if args_dict.get("download_count") is not None:
+        config.download_count = args_dict["download_count"]
+    if args_dict.get("download_concurrency") is not None:
+        config.download_concurrency = args_dict["download_concurrency"]
+    if args_dict.get("download_seconds") is not None:
+        config.download_seconds = args_dict["download_seconds"]
+    if args_dict.get("download_bytes") is not None:
+        config.download_bytes = args_dict["download_bytes"]
+    if args_dict.get("download_tolerance") is not None:
+        config.download_tolerance = args_dict["download_tolerance"]
+    if args_dict.get("download_min_seconds") is not None:
+        config.download_min_seconds = args_dict["download_min_seconds"]
+    if args_dict.get("shortlist") is not None:
+        config.shortlist = args_dict["shortlist"]
+    if args_dict.get("parallel_shards") is not None:
+        config.parallel_shards = args_dict["parallel_shards"]
+    if args_dict.get("parallel_jobs") is not None:
+        config.parallel_jobs = args_dict["parallel_jobs"]
     return config
 
 
@@ -398,18 +861,20 @@ def _apply_ip_source_test_config(config: Config, args) -> None:
 
     try:
         ip_manager = IPSourceManager(config)
-        ip_source = config.ip_data_url.lower()
-
-        # Check if this IP source requires custom URL
-        if ip_manager.requires_custom_url(ip_source):
-            if not user_set_url:
-                raise ConfigurationError(
-                    f"IP source '{ip_source}' requires a custom test URL",
-                    field="url",
-                    suggestion=f"Use -u/--url option to specify test URL for {ip_source.upper()} (e.g., -u https://example.com/test)",
-                )
-            # For sources that require custom URL, don't set default
-            return
+        ip_sources = [source.lower() for source in ip_manager.parse_sources(config.ip_data_url)]
+        ip_source = ip_sources[0] if ip_sources else config.ip_data_url.lower()
+
+        # Check if any of the IP sources requires custom URL
+        for source in ip_sources or [ip_source]:
+            if ip_manager.requires_custom_url(source):
+                if not user_set_url:
+                    raise ConfigurationError(
+                        f"IP source '{source}' requires a custom test URL",
+                        field="url",
+                        suggestion=f"Use -u/--url option to specify test URL for {source.upper()} (e.g., -u https://example.com/test)",
+                    )
+                # For sources that require custom URL, don't set default
+                return
 
         # For cf and gc, set default URL if user didn't specify one
         if not user_set_url:
@@ -0,0 +1,193 @@
+"""Persistent counting Bloom filter of addresses and blocks that keep failing probes."""
+
+import hashlib
+import ipaddress
+import os
+import struct
+import tempfile
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+from .exceptions import IPSourceError
+
+# File layout (little-endian header followed by the packed counters):
+#   magic "CBDF", format version, hash count, log2 of counter count, last aging time
+#   counters          4 bits each, two per byte
+DEAD_FILTER_MAGIC = b"CBDF"
+DEAD_FILTER_VERSION = 1
+_HEADER = struct.Struct("<4sHHId")
+
+# 2^23 four-bit counters (4 MiB) keep false positives low for the whole
+# Cloudflare IPv4 space probed address by address
+DEFAULT_SIZE_LOG2 = 23
+DEFAULT_HASH_COUNT = 4
+
+# Failures needed before an entry is skipped, and how often counters are halved
+DEFAULT_DEAD_THRESHOLD = 2
+DEFAULT_HALF_LIFE_HOURS = 24.0
+
+_COUNTER_MAX = 15
+
+# Halves both 4-bit counters of a byte
+_HALVE_TABLE = bytes(((value >> 5) << 4) | ((value & 0x0F) >> 1) for value in range(256))
+
+
+def block_key(address: ipaddress.IPv4Address | ipaddress.IPv6Address, prefixlen: int) -> str:
+    """Get the filter key of the block containing an address."""
+    return str(ipaddress.ip_network(f"{address}/{prefixlen}", strict=False))
+
+
+class DeadIPFilter:
+    """
+    Counting Bloom filter with exponential aging.
+
+    Each failure increments the entry's counters; all counters are halved once per
+    half-life, so an entry is reported dead only while it keeps failing and expires
+    on its own once it stops. Keys are plain strings: addresses and CIDR blocks.
+    """
+
+    def __init__(
+        self,
+        size_log2: int = DEFAULT_SIZE_LOG2,
+        hash_count: int = DEFAULT_HASH_COUNT,
+        threshold: int = DEFAULT_DEAD_THRESHOLD,
+        half_life_hours: float = DEFAULT_HALF_LIFE_HOURS,
+    ):
+        """
+        Create an empty filter.
+
+        Args:
+            size_log2: Log2 of the number of counters
+            hash_count: Number of counters per key
+            threshold: Failure count at which a key is considered dead
+            half_life_hours: Interval after which all counters are halved
+        """
+        if not (1 <= size_log2 <= 32):
+            raise IPSourceError("Dead filter size must be between 2^1 and 2^32 counters")
+        if not (1 <= threshold <= _COUNTER_MAX):
+            raise IPSourceError(f"Dead filter threshold must be between 1 and {_COUNTER_MAX}")
+
+        self.size_log2 = size_log2
+        self.hash_count = hash_count
+        self.threshold = threshold
+        self.half_life_hours = half_life_hours
+        self.last_aged = time.time()
+        self._mask = (1 << size_log2) - 1
+        self._counters = bytearray(max(1, (1 << size_log2) // 2))
+
+    @classmethod
+    def load(cls, path: str | Path, **kwargs) -> "DeadIPFilter":
+        """
+        Load a filter file, returning an empty filter if it is missing or unusable.
+
+        Args:
+            path: Filter file
+            **kwargs: Threshold and half-life used for the loaded filter
+
+        Returns:
+            Filter aged to the current time
+        """
+        try:
+            data = Path(path).read_bytes()
+        except OSError:
+            return cls(**kwargs)
+
+        if len(data) < _HEADER.size:
+            return cls(**kwargs)
+        magic, version, hash_count, size_log2, last_aged = _HEADER.unpack_from(data, 0)
+        if magic != DEAD_FILTER_MAGIC or version != DEAD_FILTER_VERSION:
+            return cls(**kwargs)
+
+        dead_filter = cls(size_log2=size_log2, hash_count=hash_count, **kwargs)
+        counters = data[_HEADER.size :]
+        if len(counters) != len(dead_filter._counters):
+            return cls(**kwargs)
+
+        dead_filter._counters[:] = counters
+        dead_filter.last_aged = last_aged
+        dead_filter.age()
+        return dead_filter
+
+    def save(self, path: str | Path) -> None:
+        """
+        Write the filter atomically.
+
+        Raises:
+            OSError: If the file cannot be written
+        """
+        path = Path(path)
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(
+                    _HEADER.pack(
+                        DEAD_FILTER_MAGIC,
+                        DEAD_FILTER_VERSION,
+                        self.hash_count,
+                        self.size_log2,
+                        self.last_aged,
+                    )
+                )
+                f.write(self._counters)
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def _indexes(self, key: str) -> list[int]:
+        """Counter positions of a key (Kirsch-Mitzenmacher double hashing)."""
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) & self._mask for i in range(self.hash_count)]
+
+    def _get(self, index: int) -> int:
+        return (self._counters[index >> 1] >> ((index & 1) * 4)) & 0x0F
+
+    def count(self, key: str) -> int:
+        """Get the estimated failure count of a key."""
+        return min(self._get(index) for index in self._indexes(key))
+
+    def add(self, key: str) -> None:
+        """Record one failure of a key."""
+        # Conservative update: only raise the counters at the current minimum
+        indexes = self._indexes(key)
+        current = min(self._get(index) for index in indexes)
+        if current >= _COUNTER_MAX:
+            return
+        for index in indexes:
+            if self._get(index) == current:
+                shift = (index & 1) * 4
+                byte = index >> 1
+                self._counters[byte] += 1 << shift
+
+    def update(self, keys: Iterable[str]) -> None:
+        """Record one failure of each key."""
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        return self.count(key) >= self.threshold
+
+    def age(self, now: float | None = None) -> None:
+        """Halve all counters once for every half-life elapsed since the last aging."""
+        now = time.time() if now is None else now
+        half_life = self.half_life_hours * 3600
+        if half_life <= 0:
+            return
+
+        periods = int((now - self.last_aged) // half_life)
+        if periods <= 0:
+            return
+
+        if periods >= 4:
+            # Four halvings empty every 4-bit counter
+            self._counters = bytearray(len(self._counters))
+        else:
+            for _ in range(periods):
+                self._counters = self._counters.translate(_HALVE_TABLE)
+        self.last_aged += periods * half_life
@@ -0,0 +1,316 @@
+"""Built-in download speed tester: HTTP(S) downloads pinned to candidate IPs with asyncio."""
+
+import asyncio
+import math
+import ssl
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+from .concurrency import gather_bounded
+from .exceptions import SpeedTestError
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Cloudflare-served test file used when no speed test URL is configured
+DEFAULT_DOWNLOAD_URL = "https://speed.cloudflare.com/__down?bytes=200000000"
+
+# Defaults of the download tester (cfst downloads for 10 seconds per address)
+DEFAULT_DOWNLOAD_SECONDS = 10.0
+DEFAULT_DOWNLOAD_CONCURRENCY = 4
+DEFAULT_CONNECT_TIMEOUT = 5.0
+
+# Adaptive duration: throughput is sampled per window and a download stops early
+# once the confidence interval of the rate is within the tolerance
+DEFAULT_MIN_DOWNLOAD_SECONDS = 2.0
+DEFAULT_SAMPLE_WINDOW = 0.25
+
+_MIN_WINDOWS = 5  # Windows needed for an estimate, not counting the first
+_CONFIDENCE_Z = 1.96  # 95% confidence
+
+_READ_SIZE = 64 * 1024
+_BYTES_PER_MB = 1024 * 1024
+
+
+@dataclass
+class DownloadMeasurement:
+    """Download throughput measured for one address."""
+
+    ip: str
+    bytes: int
+    seconds: float
+    colo: str | None = None  # Data center reported by the CDN, if any
+    error: str | None = None
+
+    @property
+    def speed(self) -> float:
+        """Throughput in MB/s, as reported in SpeedTestResult.speed."""
+        if self.seconds <= 0:
+            return 0.0
+        return self.bytes / self.seconds / _BYTES_PER_MB
+
+
+def rate_converged(rates: list[float], tolerance: float) -> bool:
+    """
+    Check if sampled throughput rates give a precise enough estimate.
+
+    The first window is left out, as it covers connection ramp-up.
+
+    Args:
+        rates: Throughput of each sampling window, in order
+        tolerance: Largest accepted half-width of the 95% confidence interval,
+            as a fraction of the mean rate
+
+    Returns:
+        True once enough windows are sampled and the interval is narrow enough
+    """
+    samples = rates[1:]
+    if len(samples) < _MIN_WINDOWS:
+        return False
+    mean = sum(samples) / len(samples)
+    if mean <= 0:
+        return False
+    variance = sum((rate - mean) ** 2 for rate in samples) / (len(samples) - 1)
+    half_width = _CONFIDENCE_Z * math.sqrt(variance / len(samples))
+    return half_width <= tolerance * mean
+
+
+def colo_from_headers(headers: dict[str, str]) -> str | None:
+    """
+    Get the serving data center from CDN response headers.
+
+    Args:
+        headers: Response headers with lower-case names
+
+    Returns:
+        IATA-style colo code (cf-ray suffix or CloudFront POP prefix), or None
+    """
+    ray = headers.get("cf-ray", "")
+    if "-" in ray:
+        return ray.rsplit("-", 1)[1].strip().upper() or None
+    pop = headers.get("x-amz-cf-pop", "")
+    if len(pop) >= 3:
+        return pop[:3].upper()
+    return None
+
+
+class DownloadTester:
+    """
+    Measures download throughput from candidate IPs.
+
+    Each test opens a connection to the candidate IP itself, using the test
+    URL's host name for SNI and the Host header, and streams the response
+    body until the time or byte budget is spent. Several addresses are tested
+    at once, bounded by a semaphore.
+
+    With a tolerance, the duration becomes an upper bound: throughput is
+    sampled in short windows and a download stops after min_duration once
+    the rate estimate has converged (see rate_converged).
+    """
+
+    def __init__(
+        self,
+        url: str = DEFAULT_DOWNLOAD_URL,
+        port: int | None = None,
+        duration: float = DEFAULT_DOWNLOAD_SECONDS,
+        max_bytes: int = 0,
+        concurrency: int = DEFAULT_DOWNLOAD_CONCURRENCY,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        ssl_context: ssl.SSLContext | None = None,
+        tolerance: float = 0.0,
+        min_duration: float = DEFAULT_MIN_DOWNLOAD_SECONDS,
+        window: float = DEFAULT_SAMPLE_WINDOW,
+    ):
+        """
+        Initialize tester.
+
+        Args:
+            url: HTTP or HTTPS URL of the test file
+            port: Port to connect to (defaults to the URL's port)
+            duration: Seconds to download from each address (at most, with a tolerance)
+            max_bytes: Stop after this many body bytes (0 = time budget only)
+            concurrency: Maximum addresses tested at the same time
+            connect_timeout: Seconds allowed for connecting and receiving headers
+            ssl_context: TLS context for HTTPS (defaults to certificate verification)
+            tolerance: Relative confidence interval half-width that ends a download
+                early (0 = always use the full duration)
+            min_duration: Seconds to download before stopping early
+            window: Seconds per throughput sample
+
+        Raises:
+            SpeedTestError: If the URL or the budgets are invalid
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise SpeedTestError(f"Invalid download test URL: {url}")
+        if duration <= 0:
+            raise SpeedTestError("Download duration must be greater than 0")
+        if max_bytes < 0:
+            raise SpeedTestError("Download byte budget must be greater than or equal to 0")
+        if concurrency <= 0:
+            raise SpeedTestError("Download concurrency must be greater than 0")
+        if tolerance < 0:
+            raise SpeedTestError("Download tolerance must be greater than or equal to 0")
+        if min_duration <= 0 or window <= 0:
+            raise SpeedTestError("Download minimum duration and window must be greater than 0")
+
+        self.url = url
+        self.host = parts.hostname
+        self.tls = parts.scheme == "https"
+        self.port = port or parts.port or (443 if self.tls else 80)
+        self.path = parts.path or "/"
+        if parts.query:
+            self.path += f"?{parts.query}"
+        self.duration = duration
+        self.max_bytes = max_bytes
+        self.concurrency = concurrency
+        self.connect_timeout = connect_timeout
+        self.ssl_context = ssl_context
+        self.tolerance = tolerance
+        self.min_duration = min_duration
+        self.window = window
+
+    def _request(self) -> bytes:
+        """Build the GET request for the test file."""
+        default_port = 443 if self.tls else 80
+        host = self.host if ":" not in self.host else f"[{self.host}]"
+        if self.port != default_port:
+            host = f"{host}:{self.port}"
+        return (
+            f"GET {self.path} HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            "User-Agent: cdnbestip\r\n"
+            "Accept: */*\r\n"
+            "Accept-Encoding: identity\r\n"
+            "Connection: close\r\n"
+            "\r\n"
+        ).encode("ascii")
+
+    async def _open(self, ip: str) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Connect to the candidate IP, presenting the URL host for TLS."""
+        if not self.tls:
+            return await asyncio.open_connection(ip, self.port)
+        context = self.ssl_context or ssl.create_default_context()
+        return await asyncio.open_connection(
+            ip, self.port, ssl=context, server_hostname=self.host
+        )
+
+    @staticmethod
+    async def _read_headers(reader: asyncio.StreamReader) -> tuple[int, dict[str, str]]:
+        """Read the status line and headers of the response."""
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status_parts = lines[0].split(" ", 2)
+        if len(status_parts) < 2 or not status_parts[0].startswith("HTTP/"):
+            raise ValueError(f"malformed status line {lines[0]!r}")
+        headers = {}
+        for line in lines[1:]:
+            name, separator, value = line.partition(":")
+            if separator:
+                headers[name.strip().lower()] = value.strip()
+        return int(status_parts[1]), headers
+
+    async def _stream_body(self, reader: asyncio.StreamReader) -> tuple[int, float]:
+        """Read the body until EOF, the budget is spent or the rate converged."""
+        received = 0
+        start = time.perf_counter()
+        deadline = start + self.duration
+        rates = []
+        window_start = start
+        window_bytes = 0
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                chunk = await asyncio.wait_for(reader.read(_READ_SIZE), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            if not chunk:
+                break
+            received += len(chunk)
+            if self.max_bytes and received >= self.max_bytes:
+                break
+
+            if not self.tolerance:
+                continue
+            window_bytes += len(chunk)
+            now = time.perf_counter()
+            if now - window_start < self.window:
+                continue
+            rates.append(window_bytes / (now - window_start))
+            window_start = now
+            window_bytes = 0
+            if now - start >= self.min_duration and rate_converged(rates, self.tolerance):
+                break
+        return received, time.perf_counter() - start
+
+    async def measure_address(self, ip: str) -> DownloadMeasurement:
+        """
+        Download the test file from one address.
+
+        Args:
+            ip: Candidate IP address
+
+        Returns:
+            Measurement; failed downloads have no bytes and carry the error
+        """
+        writer = None
+        try:
+            reader, writer = await asyncio.wait_for(self._open(ip), timeout=self.connect_timeout)
+            writer.write(self._request())
+            await writer.drain()
+            status, headers = await asyncio.wait_for(
+                self._read_headers(reader), timeout=self.connect_timeout
+            )
+            colo = colo_from_headers(headers)
+            if not 200 <= status < 300:
+                return DownloadMeasurement(ip, 0, 0.0, colo=colo, error=f"HTTP {status}")
+
+            received, seconds = await self._stream_body(reader)
+            return DownloadMeasurement(ip, received, seconds, colo=colo)
+        except (
+            OSError,
+            ValueError,
+            asyncio.TimeoutError,
+            asyncio.IncompleteReadError,
+            asyncio.LimitOverrunError,
+        ) as e:
+            return DownloadMeasurement(ip, 0, 0.0, error=str(e) or type(e).__name__)
+        finally:
+            if writer is not None:
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except (OSError, ssl.SSLError):
+                    pass
+
+    async def measure_all(self, addresses: Iterable[str]) -> list[DownloadMeasurement]:
+        """
+        Test addresses concurrently, at most ``concurrency`` at a time.
+
+        Args:
+            addresses: Candidate IP addresses
+
+        Returns:
+            One measurement per address, in input order
+        """
+        return await gather_bounded(self.measure_address, addresses, self.concurrency)
+
+    def measure(self, addresses: Iterable[str]) -> list[DownloadMeasurement]:
+        """
+        Test addresses and log failures.
+
+        Args:
+            addresses: Candidate IP addresses
+
+        Returns:
+            One measurement per address, in input order
+        """
+        measurements = asyncio.run(self.measure_all(addresses))
+        for measurement in measurements:
+            if measurement.error:
+                logger.debug(f"Download test of {measurement.ip} failed: {measurement.error}")
+        return measurements
@@ -0,0 +1,93 @@
+"""Shared HTTP session with connection pooling, retries and proxy settings."""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
+
+from .config import Config
+
+# Connection pool and retry defaults for outbound downloads
+POOL_SIZE = 10
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_shared_sessions: dict[str | None, requests.Session] = {}
+_shared_sessions_lock = threading.Lock()
+
+
+def get_proxy_config(proxy_url: str) -> dict[str, str]:
+    """Convert proxy URL to requests-compatible proxy configuration."""
+    # requests library expects proxies in format: {'http': 'proxy_url', 'https': 'proxy_url'}
+    return {"http": proxy_url, "https": proxy_url}
+
+
+def create_session(config: Config | None = None) -> requests.Session:
+    """
+    Create a pooled session with keep-alive, retry policy and proxy settings.
+
+    Args:
+        config: Configuration providing the optional proxy URL
+
+    Returns:
+        Configured requests session
+    """
+    from . import __version__
+
+    session = requests.Session()
+
+    retry = Retry(
+        total=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = f"cdnbestip/{__version__}"
+    # Offer every content coding urllib3 can decode (br and zstd when their packages are installed)
+    session.headers["Accept-Encoding"] = make_headers(accept_encoding=True)["accept-encoding"]
+
+    proxy_url = getattr(config, "proxy_url", None)
+    if proxy_url:
+        session.proxies.update(get_proxy_config(proxy_url))
+        # Environment proxies would otherwise override the session's per request
+        session.trust_env = False
+
+    return session
+
+
+def get_shared_session(config: Config | None = None) -> requests.Session:
+    """
+    Get the process-wide session for the configured proxy, creating it on first use.
+
+    Managers created with the same proxy settings reuse one connection pool, so
+    repeated requests to the same hosts skip the TCP and TLS handshakes.
+
+    Args:
+        config: Configuration providing the optional proxy URL
+
+    Returns:
+        Shared requests session
+    """
+    proxy_url = getattr(config, "proxy_url", None) or None
+    with _shared_sessions_lock:
+        session = _shared_sessions.get(proxy_url)
+        if session is None:
+            session = create_session(config)
+            _shared_sessions[proxy_url] = session
+        return session
+
+
+def close_shared_sessions() -> None:
+    """Close all shared sessions and their pooled connections."""
+    with _shared_sessions_lock:
+        for session in _shared_sessions.values():
+            session.close()
+        _shared_sessions.clear()
@@ -1,121 +1,636 @@
 """IP data source management for downloading IP lists from various CDN providers."""
 
+import ipaddress
 import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
+from urllib.parse import urlparse
 
 import requests
 
 from .config import Config
+from .dead_filter import DeadIPFilter, block_key
 from .exceptions import IPSourceError
+from .http_session import get_shared_session
+from .ipset import IPIntervalSet
+from .item_filter import ItemFilter
+from .json_stream import JSONStreamExtractor
+from .local_source import FileWatcher, is_local_source, local_source_path, read_local_list
+from .logging_config import get_logger
+from .mirror_race import DEFAULT_RACE_DELAY, race_get
+from .packed_cache import PackedPrefixList, write_packed
+from .prefix_index import PrefixIndex
+from .sampling import (
+    DEFAULT_BLOCK_PREFIX_V4,
+    DEFAULT_BLOCK_PREFIX_V6,
+    DEFAULT_MAX_BLOCKS_V6,
+    CandidateSampler,
+)
+from .sharding import CandidateSharder, parse_shard
+from .source_registry import (
+    BUILTIN_SOURCES,
+    SourceParser,
+    SourceRegistry,
+    get_source_registry,
+    split_source_spec,
+)
+from .stratified import StratifiedSampler
+
+logger = get_logger(__name__)
+
+
+# Quoted or bare tokens shaped like an address or prefix, for checking structured bodies
+_ADDRESS_TOKEN = re.compile(rb"[0-9A-Fa-f:.]{2,}(?:/\d{1,3})?")
+
+
+def _is_ip_or_prefix(entry: str) -> bool:
+    """Check if an entry is an IP address or CIDR prefix."""
+    try:
+        ipaddress.ip_network(entry, strict=False)
+        return True
+    except ValueError:
+        return False
 
 
 class IPSourceManager:
     """Manages IP list downloads from various CDN providers."""
 
-    # Predefined IP data sources with their default test endpoints
-    IP_SOURCES = {
-        "cf": {
-            "name": "CloudFlare",
-            "url": "https://www.cloudflare.com/ips-v4",
-            "type": "text",
-            "description": "CloudFlare IPv4 ranges",
-            "default_test_url": "",  # CloudFlare default test endpoint
-        },
-        "gc": {
-            "name": "GCore",
-            "url": "https://api.gcore.com/cdn/public-ip-list",
-            "type": "json",
-            "json_path": "addresses",
-            "description": "GCore CDN IP addresses",
-            "default_test_url": "https://hk2-speedtest.tools.gcore.com/speedtest-backend/garbage.php?ckSize=100",  # GCore default test endpoint
-        },
-        "ct": {
-            "name": "CloudFront",
-            "url": "https://d7uri8nf7uskq.cloudfront.net/tools/list-cloudfront-ips",
-            "type": "json",
-            "json_path": "CLOUDFRONT_GLOBAL_IP_LIST",
-            "description": "AWS CloudFront IP ranges",
-            "requires_custom_url": True,  # Requires -u parameter
-        },
-        "aws": {
-            "name": "Amazon Web Services",
-            "url": "https://ip-ranges.amazonaws.com/ip-ranges.json",
-            "type": "json",
-            "json_path": "prefixes",
-            "json_field": "ip_prefix",
-            "description": "AWS IP ranges",
-            "requires_custom_url": True,  # Requires -u parameter
-        },
-    }
-
-    def __init__(self, config: Config):
-        """Initialize IP source manager with configuration."""
+    # Built-in IP data sources; plugins are looked up through the source registry
+    IP_SOURCES = BUILTIN_SOURCES
+
+    # Cache lifetime for sources without their own cache_ttl_hours
+    DEFAULT_CACHE_TTL_HOURS = 24
+
+    # Chunk size used when streaming response bodies
+    STREAM_CHUNK_SIZE = 64 * 1024
+
+    # Maximum number of sources downloaded concurrently
+    MAX_FETCH_WORKERS = 8
+
+    # How long a block that produced a qualifying result is re-tested by delta refreshes
+    GOOD_PREFIX_MAX_AGE_HOURS = 168
+
+    def __init__(
+        self,
+        config: Config,
+        session: requests.Session | None = None,
+        registry: SourceRegistry | None = None,
+    ):
+        """
+        Initialize IP source manager with configuration.
+
+        Args:
+            config: Configuration
+            session: HTTP session to use (defaults to the shared pooled session)
+            registry: Named sources to resolve (defaults to the shared registry)
+        """
         self.config = config
+        self._session = session
+        self.registry = registry or get_source_registry()
         self.cache_dir = Path.home() / ".cdnbestip" / "cache"
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._revalidations: dict[Path, threading.Thread] = {}
+        self._revalidations_lock = threading.Lock()
+        self._race_winners_lock = threading.Lock()
+        self._local_lists: dict[Path, tuple[FileWatcher, list[str]]] = {}
+        self._local_lists_lock = threading.Lock()
+
+    def close(self) -> None:
+        """Stop the watchers kept for local sources and forget their cached lists."""
+        with self._local_lists_lock:
+            for watcher, _ in self._local_lists.values():
+                watcher.close()
+            self._local_lists.clear()
+
+    def __enter__(self) -> "IPSourceManager":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def session(self) -> requests.Session:
+        """HTTP session used for downloads."""
+        return self._session or get_shared_session(self.config)
 
     def get_available_sources(self) -> list[str]:
-        """Get list of available IP sources."""
-        return list(self.IP_SOURCES.keys())
+        """Get list of available IP sources, including discovered plugins."""
+        return self.registry.names()
 
     def get_source_info(self, source: str) -> dict[str, Any]:
         """Get information about a specific IP source."""
-        if source not in self.IP_SOURCES:
-            raise IPSourceError(f"Unknown IP source: {source}")
-        return self.IP_SOURCES[source].copy()
+        return self.registry.get(source).copy()
+
+    def get_cache_ttl(self, source: str) -> float:
+        """
+        Get how long the cached list of a source stays fresh.
+
+        Args:
+            source: Predefined source name or custom URL
+
+        Returns:
+            Cache lifetime in hours (the configured override wins over the source default)
+        """
+        override = getattr(self.config, "cache_ttl_hours", None)
+        if override is not None:
+            return override
+        if source in self.registry:
+            return self.registry.get(source).get("cache_ttl_hours", self.DEFAULT_CACHE_TTL_HOURS)
+        return self.DEFAULT_CACHE_TTL_HOURS
 
     def get_default_test_url(self, source: str) -> str | None:
         """Get default test URL for a specific IP source."""
-        if source not in self.IP_SOURCES:
+        if source not in self.registry:
             return None
 
-        source_info = self.IP_SOURCES[source]
+        source_info = self.registry.get(source)
         return source_info.get("default_test_url")
 
     def requires_custom_url(self, source: str) -> bool:
         """Check if IP source requires custom URL (-u parameter)."""
-        if source not in self.IP_SOURCES:
+        if source not in self.registry:
             return True  # Unknown sources require custom URL
 
-        source_info = self.IP_SOURCES[source]
+        source_info = self.registry.get(source)
         return source_info.get("requires_custom_url", False)
 
+    def parse_sources(self, spec: str) -> list[str]:
+        """
+        Split a comma-separated source specification into individual sources.
+
+        Commas inside a URL are kept (see split_source_spec).
+
+        Args:
+            spec: One or more predefined source names or URLs (e.g., "cf,https://mirror/extra.txt")
+
+        Returns:
+            List of unique sources in the given order
+        """
+        sources = []
+        for part in split_source_spec(spec, self.registry):
+            if part.lower() in self.registry:
+                part = part.lower()
+            if part not in sources:
+                sources.append(part)
+        return sources
+
     def download_ip_list(self, source: str, output_file: str, force_refresh: bool = False) -> None:
-        """Download IP list from specified source and save to file."""
-        if source in self.IP_SOURCES:
-            # Use predefined source
-            source_info = self.IP_SOURCES[source]
-            url = source_info["url"]
+        """
+        Download IP list from specified source(s) and save to file.
 
-            # Apply CDN URL if configured and not using proxy
-            # When using proxy, access original URL directly
-            if (
-                hasattr(self.config, "cdn_url")
-                and self.config.cdn_url
-                and not (hasattr(self.config, "proxy_url") and self.config.proxy_url)
-            ):
-                url = self._apply_cdn_url(url)
+        In delta mode the candidates are limited to prefixes added since the previously
+        cached list plus blocks that recently produced qualifying results.
+        """
+        sources = self.parse_sources(source) or [source]
+        previous = None
+        if getattr(self.config, "delta", False):
+            previous = self._load_previous_lists(sources)
 
-            self._download_from_source(source_info, url, output_file, force_refresh, source)
+        if len(sources) == 1 and previous is None and not force_refresh:
+            cache_file = self._get_fresh_packed_cache(sources[0])
+            if cache_file is not None:
+                # Feed the mapped cache to candidate preparation without decoding it
+                self._copy_from_cache(cache_file, output_file)
+                return
+
+        if len(sources) > 1:
+            ip_list, prefix_sources = self.fetch_ip_lists(sources, force_refresh)
+        else:
+            ip_list, prefix_sources = self.fetch_ip_list(sources[0], force_refresh), None
+
+        if previous is not None:
+            ip_list = self.select_delta(previous, ip_list)
+
+        self._save_ip_list(self.prepare_candidates(ip_list), output_file)
+        if prefix_sources is not None:
+            self._save_prefix_sources(prefix_sources, output_file)
+
+    def _get_fresh_packed_cache(self, source: str) -> Path | None:
+        """
+        Get the packed cache file of a downloaded source if it can be used as is.
+
+        Args:
+            source: Predefined source name or custom URL
+
+        Returns:
+            Path of the fresh packed cache, or None if the source must be fetched
+        """
+        if source not in self.registry and is_local_source(source):
+            return None
+        cache_file = self._get_cache_file(source)
+        if not self._is_packed_cache(cache_file):
+            return None
+        if not self._is_cache_valid(cache_file, self.get_cache_ttl(source)):
+            return None
+        return cache_file
+
+    def fetch_ip_list(self, source: str, force_refresh: bool = False) -> list[str]:
+        """
+        Fetch the raw prefix list of a single source, using the cache when possible.
+
+        Args:
+            source: Predefined source name or custom URL
+            force_refresh: Revalidate with the source even if the cache is fresh
+
+        Returns:
+            List of IP addresses/prefixes as published by the source
+        """
+        if source in self.registry:
+            # Use predefined or plugin source
+            source_info = self.registry.get(source)
+            url = source_info["url"]
+        elif is_local_source(source):
+            return self._fetch_local_list(source)
         else:
             # Treat as custom URL
             if not source.startswith(("http://", "https://")):
                 raise IPSourceError(f"Invalid URL or unknown source: {source}")
 
-            # Apply CDN URL if configured and not using proxy
-            # When using proxy, access original URL directly
-            url = source
-            if (
-                hasattr(self.config, "cdn_url")
-                and self.config.cdn_url
-                and not (hasattr(self.config, "proxy_url") and self.config.proxy_url)
-            ):
-                url = self._apply_cdn_url(url)
-
             # Assume text format for custom URLs
             source_info = {"type": "text", "name": "Custom"}
-            self._download_from_source(source_info, url, output_file, force_refresh, source)
+            url = source
+
+        # Apply CDN URL if configured and not using proxy
+        # When using proxy, access original URL directly
+        origin_url = None
+        if (
+            hasattr(self.config, "cdn_url")
+            and self.config.cdn_url
+            and not (hasattr(self.config, "proxy_url") and self.config.proxy_url)
+        ):
+            if getattr(self.config, "mirror_race", True):
+                origin_url = url
+            url = self._apply_cdn_url(url)
+
+        return self._fetch_from_source(source_info, url, force_refresh, source, origin_url)
+
+    def _fetch_local_list(self, source: str) -> list[str]:
+        """
+        Read a local source file, reusing the parsed list until the file changes.
+
+        Local files bypass the download cache: a watcher decides when the file must
+        be read again. Each new version is still stored as the source's cache entry,
+        which delta refreshes and result attribution compare against.
+
+        Args:
+            source: file:// URL or filesystem path
+
+        Returns:
+            List of IP addresses/prefixes in the file
+
+        Raises:
+            IPSourceError: If the file does not exist or cannot be read
+        """
+        path = local_source_path(source)
+        with self._local_lists_lock:
+            entry = self._local_lists.get(path)
+            if entry is not None and not entry[0].changed():
+                return list(entry[1])
+
+            if not path.is_file():
+                raise IPSourceError(f"IP list file not found: {path}")
+
+            # Watch before reading so a rewrite during the read is not missed
+            watcher = entry[0] if entry is not None else FileWatcher([path])
+            ip_list = read_local_list(path)
+            self._local_lists[path] = (watcher, ip_list)
+
+        logger.info(f"Read {len(ip_list)} entries from local IP list {path}")
+        self._save_to_cache(ip_list, self._get_cache_file(source))
+        return list(ip_list)
+
+    def get_local_paths(self, spec: str) -> list[Path]:
+        """
+        Get the files behind the local sources of a source specification.
+
+        Args:
+            spec: Source specification as passed to download_ip_list
+
+        Returns:
+            Paths of the local sources, in the given order (empty if there are none)
+        """
+        return [
+            local_source_path(source)
+            for source in self.parse_sources(spec) or [spec]
+            if source not in self.registry and is_local_source(source)
+        ]
+
+    def local_sources_newer_than(self, spec: str, path: str) -> bool:
+        """
+        Check if a local source was modified after a file was written.
+
+        Args:
+            spec: Source specification as passed to download_ip_list
+            path: File to compare with, typically the candidate file
+
+        Returns:
+            True if any local source of the specification is newer than the file
+        """
+        try:
+            written = os.path.getmtime(path)
+        except OSError:
+            return True
+        for local_path in self.get_local_paths(spec):
+            try:
+                if local_path.stat().st_mtime > written:
+                    return True
+            except OSError:
+                continue
+        return False
+
+    def watch_local_sources(self, spec: str) -> FileWatcher | None:
+        """
+        Create a watcher over the local sources of a source specification.
+
+        Args:
+            spec: Source specification as passed to download_ip_list
+
+        Returns:
+            Watcher reporting changes to the local source files, or None if there are none
+        """
+        paths = self.get_local_paths(spec)
+        return FileWatcher(paths) if paths else None
+
+    def fetch_ip_lists(
+        self, sources: list[str], force_refresh: bool = False
+    ) -> tuple[list[str], dict[str, list[str]]]:
+        """
+        Fetch several sources concurrently and merge them into one de-duplicated list.
+
+        Sources that fail are skipped with a warning as long as at least one succeeds.
+
+        Args:
+            sources: Predefined source names and/or custom URLs
+            force_refresh: Revalidate with the sources even if their caches are fresh
+
+        Returns:
+            Tuple of (merged prefix list, mapping of prefix to the sources that published it)
+
+        Raises:
+            IPSourceError: If every source fails
+        """
+        results: dict[str, list[str]] = {}
+        errors: dict[str, Exception] = {}
+
+        max_workers = min(len(sources), self.MAX_FETCH_WORKERS) or 1
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.fetch_ip_list, source, force_refresh): source
+                for source in sources
+            }
+            for future in as_completed(futures):
+                source = futures[future]
+                try:
+                    results[source] = future.result()
+                except IPSourceError as e:
+                    errors[source] = e
+                    logger.warning(f"Skipping IP source {source}: {e.message}")
+
+        if not results:
+            details = "; ".join(f"{source}: {error}" for source, error in errors.items())
+            raise IPSourceError(f"Failed to download IP lists from all sources: {details}")
+
+        # Merge in the order the sources were given so the output is deterministic
+        merged: list[str] = []
+        prefix_sources: dict[str, list[str]] = {}
+        for source in sources:
+            for prefix in results.get(source, []):
+                origins = prefix_sources.get(prefix)
+                if origins is None:
+                    prefix_sources[prefix] = [source]
+                    merged.append(prefix)
+                elif source not in origins:
+                    origins.append(source)
+
+        return merged, prefix_sources
+
+    def _get_prefix_sources_file(self, ip_file: str) -> Path:
+        """Get path of the provenance file written next to a candidate file."""
+        return Path(f"{ip_file}.sources")
+
+    def _save_prefix_sources(self, prefix_sources: dict[str, list[str]], ip_file: str) -> None:
+        """Record which source(s) each prefix of a merged list came from."""
+        try:
+            with open(self._get_prefix_sources_file(ip_file), "w", encoding="utf-8") as f:
+                for prefix, origins in prefix_sources.items():
+                    f.write(f"{prefix}\t{','.join(origins)}\n")
+        except OSError:
+            # Provenance is informational only
+            pass
+
+    def load_prefix_sources(self, ip_file: str) -> dict[str, list[str]]:
+        """
+        Load the prefix provenance recorded for a merged candidate file.
+
+        Args:
+            ip_file: Candidate file written by download_ip_list
+
+        Returns:
+            Mapping of prefix to source names (empty if no provenance was recorded)
+        """
+        prefix_sources = {}
+        try:
+            with open(self._get_prefix_sources_file(ip_file), encoding="utf-8") as f:
+                for line in f:
+                    prefix, _, origins = line.rstrip("\n").partition("\t")
+                    if prefix and origins:
+                        prefix_sources[prefix] = origins.split(",")
+        except OSError:
+            pass
+        return prefix_sources
+
+    def _load_previous_lists(self, sources: list[str]) -> IPIntervalSet | None:
+        """Load the cached lists of sources before they are refreshed (None if none are cached)."""
+        previous = None
+        for source in sources:
+            cache_file = self._get_cache_file(source)
+            if not cache_file.exists():
+                continue
+            try:
+                cached = IPIntervalSet.from_prefixes(self._load_from_cache(cache_file))
+            except IPSourceError as e:
+                logger.warning(f"Ignoring unreadable cache {cache_file} for delta refresh: {e}")
+                continue
+            previous = cached if previous is None else previous | cached
+        return previous
+
+    def select_delta(self, previous: IPIntervalSet, ip_list: list[str]) -> list[str]:
+        """
+        Reduce a refreshed list to the prefixes worth probing again.
+
+        Args:
+            previous: Ranges of the list cached before the refresh
+            ip_list: Freshly fetched IP addresses/prefixes
+
+        Returns:
+            Added ranges plus recently good blocks, or the full list if that is empty
+        """
+        current = IPIntervalSet.from_prefixes(ip_list)
+        added = current - previous
+        good = current & IPIntervalSet.from_prefixes(self.load_good_prefixes())
+
+        delta = (added | good).to_prefixes()
+        if not delta:
+            logger.info("Delta refresh found no new or known-good prefixes, probing the full list")
+            return ip_list
+
+        logger.info(
+            f"Delta refresh: {len(added.to_prefixes())} added and "
+            f"{len(good.to_prefixes())} known-good prefixes selected"
+        )
+        return delta
+
+    def _get_good_prefixes_file(self) -> Path:
+        """Get path of the blocks that recently produced qualifying results."""
+        return self.cache_dir / "good_prefixes.json"
+
+    def _load_good_prefix_times(self) -> dict[str, float]:
+        """Load good blocks with the time they last qualified."""
+        good_file = self._get_good_prefixes_file()
+        if not good_file.exists():
+            return {}
+
+        try:
+            entries = json.loads(good_file.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+        if not isinstance(entries, dict):
+            return {}
+        return {
+            prefix: seen for prefix, seen in entries.items() if isinstance(seen, int | float)
+        }
+
+    def load_good_prefixes(self) -> list[str]:
+        """Get blocks that produced qualifying results within the retention window."""
+        cutoff = time.time() - self.GOOD_PREFIX_MAX_AGE_HOURS * 3600
+        return [prefix for prefix, seen in self._load_good_prefix_times().items() if seen >= cutoff]
+
+    def record_good_results(self, ips: Iterable[str]) -> None:
+        """
+        Remember the sampling blocks of addresses that produced qualifying results.
+
+        Args:
+            ips: Addresses that met the speed test criteria
+        """
+        block_v6 = getattr(self.config, "sample_block_v6", DEFAULT_BLOCK_PREFIX_V6)
+        now = time.time()
+        cutoff = now - self.GOOD_PREFIX_MAX_AGE_HOURS * 3600
+
+        entries = {
+            prefix: seen
+            for prefix, seen in self._load_good_prefix_times().items()
+            if seen >= cutoff
+        }
+        for ip in ips:
+            try:
+                address = ipaddress.ip_address(ip.strip())
+            except ValueError:
+                continue
+            prefixlen = DEFAULT_BLOCK_PREFIX_V4 if address.version == 4 else block_v6
+            entries[str(ipaddress.ip_network(f"{address}/{prefixlen}", strict=False))] = now
+
+        try:
+            self._get_good_prefixes_file().write_text(
+                json.dumps(entries, indent=2, sort_keys=True), encoding="utf-8"
+            )
+        except OSError:
+            # Without the history the next delta refresh only probes added prefixes
+            pass
+
+    def _race_mirror(
+        self,
+        mirror_url: str,
+        origin_url: str,
+        source_info: dict[str, Any],
+        request_kwargs: dict[str, Any],
+    ) -> tuple[str, requests.Response]:
+        """
+        Race a CDN mirror against its origin and remember the winner per origin host.
+
+        The previous winner for the host is started first; the other URL follows after
+        the configured race delay. A candidate only wins once the start of its body
+        contains an IP address or prefix, so a portal page answering 200 loses.
+
+        Returns:
+            Tuple of (winning URL, response)
+        """
+        host = urlparse(origin_url).netloc
+        candidates = {"mirror": mirror_url, "origin": origin_url}
+        order = ["mirror", "origin"]
+        if self._load_race_winners().get(host) == "origin":
+            order.reverse()
+
+        delay = getattr(self.config, "race_delay", DEFAULT_RACE_DELAY)
+        winner_url, response = race_get(
+            self.session,
+            [candidates[name] for name in order],
+            delay,
+            validate=lambda chunk: self._body_has_prefixes(source_info, chunk),
+            peek_size=self.STREAM_CHUNK_SIZE,
+            **request_kwargs,
+        )
+
+        winner = "origin" if winner_url == origin_url else "mirror"
+        logger.debug(f"Download race for {host} won by {winner}: {winner_url}")
+        self._save_race_winner(host, winner)
+        return winner_url, response
+
+    def _body_has_prefixes(self, source_info: dict[str, Any], chunk: bytes) -> bool:
+        """
+        Check if the start of a response body contains an IP address or prefix.
+
+        Text bodies go through the same line parser as the full download; other
+        formats are scanned for address-shaped tokens.
+        """
+        if source_info.get("parser") is None and source_info.get("type") == "text":
+            entries: list[str] = []
+            invalid = self._parse_text_lines(chunk.splitlines(), entries)
+            return len(entries) > invalid
+
+        return any(
+            _is_ip_or_prefix(token.decode("ascii")) for token in _ADDRESS_TOKEN.findall(chunk)
+        )
+
+    def _get_race_winners_file(self) -> Path:
+        """Get path of the remembered mirror race winners."""
+        return self.cache_dir / "race_winners.json"
+
+    def _load_race_winners(self) -> dict[str, str]:
+        """Load remembered race winners keyed by origin host."""
+        winners_file = self._get_race_winners_file()
+        if not winners_file.exists():
+            return {}
+
+        try:
+            winners = json.loads(winners_file.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+        return winners if isinstance(winners, dict) else {}
+
+    def _save_race_winner(self, host: str, winner: str) -> None:
+        """Remember which URL kind won the race for a host."""
+        with self._race_winners_lock:
+            winners = self._load_race_winners()
+            if winners.get(host) == winner:
+                return
+            winners[host] = winner
+            try:
+                self._get_race_winners_file().write_text(
+                    json.dumps(winners, indent=2), encoding="utf-8"
+                )
+            except OSError:
+                # Losing the preference only costs one staggered start next time
+                pass
 
     def _apply_cdn_url(self, url: str) -> str:
         """Apply CDN URL prefix if configured."""
@@ -137,42 +652,94 @@ class IPSourceManager:
             else:
                 return f"{cdn_url}/{url}"
 
-    def _download_from_source(
-        self, source_info: dict[str, Any], url: str, output_file: str, force_refresh: bool = False, source: str = None
-    ) -> None:
-        """Download and process IP list from a source."""
+    def _fetch_from_source(
+        self,
+        source_info: dict[str, Any],
+        url: str,
+        force_refresh: bool = False,
+        source: str = None,
+        origin_url: str | None = None,
+    ) -> list[str]:
+        """
+        Fetch the raw IP list of a source, revalidating and updating its cache.
+
+        When ``origin_url`` is given, ``url`` is a mirror of it and both are raced.
+        """
         try:
             # Check cache first
             cache_file = self._get_cache_file(source or url)
-            if not force_refresh and cache_file.exists() and self._is_cache_valid(cache_file):
-                self._copy_from_cache(cache_file, output_file)
-                return
+            if not force_refresh and cache_file.exists():
+                if self._is_cache_valid(cache_file, self.get_cache_ttl(source or url)):
+                    return self._load_from_cache(cache_file)
 
-            # Prepare request parameters
-            request_kwargs = {"timeout": 30}
+                # Serve the expired list now and refresh it for the next run
+                if getattr(self.config, "stale_while_revalidate", False):
+                    self._revalidate_in_background(
+                        source_info, url, source, cache_file, origin_url
+                    )
+                    return self._load_from_cache(cache_file)
+
+            # Prepare request parameters; bodies are streamed so JSON can be parsed as it arrives
+            request_kwargs = {"timeout": 30, "stream": True}
+
+            # Revalidate an existing cache entry instead of downloading it again
+            conditional_headers = self._get_conditional_headers(cache_file)
+            if conditional_headers:
+                request_kwargs["headers"] = conditional_headers
+
+            # Download from source; proxy settings come from the session
+            if origin_url and origin_url != url:
+                url, response = self._race_mirror(url, origin_url, source_info, request_kwargs)
+            else:
+                response = self.session.get(url, **request_kwargs)
 
-            # Add proxy configuration if available
-            if hasattr(self.config, "proxy_url") and self.config.proxy_url:
-                proxies = self._get_proxy_config(self.config.proxy_url)
-                request_kwargs["proxies"] = proxies
+            # Not modified: the cached list is still current
+            if response.status_code == 304 and cache_file.exists():
+                self._refresh_cache(cache_file)
+                return self._load_from_cache(cache_file)
 
-            # Download from source
-            response = requests.get(url, **request_kwargs)
             response.raise_for_status()
+            validators = self._get_response_validators(response)
 
-            # Process based on source type
-            if source_info["type"] == "text":
-                ip_list = self._process_text_response(response.text)
+            # Process with the provider's own parser, or based on source type
+            cached = False
+            if source_info.get("parser") is not None:
+                ip_list = self._process_with_parser(
+                    source_info["parser"],
+                    response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE),
+                    source or url,
+                )
+            elif source_info["type"] == "text":
+                ip_list, cached = self._process_text_stream(
+                    response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE), cache_file
+                )
             elif source_info["type"] == "json":
-                ip_list = self._process_json_response(response.json(), source_info)
+                cached_token = None
+                if cache_file.exists():
+                    cached_token = self._load_cache_meta(cache_file).get("sync_token")
+
+                ip_list, metadata = self._process_json_stream(
+                    response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE),
+                    source_info,
+                    stop_sync_token=cached_token,
+                )
+                if isinstance(metadata.get("syncToken"), str):
+                    validators["sync_token"] = metadata["syncToken"]
+
+                # Unchanged sync token: the provider published no new ranges
+                if cached_token and validators.get("sync_token") == cached_token:
+                    response.close()
+                    self._refresh_cache(cache_file)
+                    self._save_cache_meta(cache_file, validators)
+                    return self._load_from_cache(cache_file)
             else:
                 raise IPSourceError(f"Unsupported source type: {source_info['type']}")
 
-            # Save to output file
-            self._save_ip_list(ip_list, output_file)
-
-            # Cache the result
-            self._save_to_cache(ip_list, cache_file)
+            # Cache the result unless it was already written while streaming
+            if not cached:
+                self._save_to_cache(ip_list, cache_file)
+            self._save_cache_meta(cache_file, validators)
+            return ip_list
 
         except requests.RequestException as e:
             raise IPSourceError(f"Failed to download from {url}: {e}") from e
@@ -191,40 +758,535 @@ class IPSourceManager:
 
         return ip_list
 
-    def _process_json_response(
-        self, data: dict[str, Any], source_info: dict[str, Any]
+    def _process_with_parser(
+        self, parser: SourceParser, chunks: Iterable[bytes], source: str
     ) -> list[str]:
-        """Process JSON response to extract IP addresses."""
-        json_path = source_info.get("json_path")
-        json_field = source_info.get("json_field")
-
-        if not json_path:
-            raise IPSourceError("JSON path not specified for JSON source")
-
-        # Navigate to the data using json_path
-        current_data = data
-        for path_part in json_path.split("."):
-            if path_part in current_data:
-                current_data = current_data[path_part]
-            else:
-                raise IPSourceError(f"JSON path '{json_path}' not found in response")
-
-        # Extract IP addresses
-        if isinstance(current_data, list):
-            if json_field:
-                # Extract specific fieldach object
-                ip_list = []
-                for item in current_data:
-                    if isinstance(item, dict) and json_field in item:
-                        ip_list.append(item[json_field])
-                return ip_list
-            else:
-                # Use items directly (should be strings)
-                return [str(item) for item in current_data]
+        """
+        Run a provider-supplied parser over a streamed response.
+
+        Raises:
+            IPSourceError: If the parser fails on the response
+        """
+        try:
+            return [str(entry).strip() for entry in parser(chunks) if str(entry).strip()]
+        except (IPSourceError, requests.RequestException):
+            raise
+        except Exception as e:
+            raise IPSourceError(f"Parser of IP source '{source}' failed: {e}", source=source) from e
+
+    def _process_text_stream(
+        self, chunks: Iterable[bytes], cache_file: Path | None = None
+    ) -> tuple[list[str], bool]:
+        """
+        Extract IP addresses from a streamed text response as its chunks arrive.
+
+        Entries are written to a temporary file next to a text-format ``cache_file``
+        in the same pass and the file is renamed over the cache entry once the body
+        is complete, so the response is neither buffered whole nor written twice.
+
+        Args:
+            chunks: Decoded response body chunks
+            cache_file: Cache entry to replace (packed caches are not written here)
+
+        Returns:
+            Tuple of (extracted IP list, whether the cache entry was written)
+        """
+        tee = None
+        if cache_file is not None and not self._is_packed_cache(cache_file):
+            try:
+                tee = tempfile.NamedTemporaryFile(
+                    "w",
+                    encoding="utf-8",
+                    dir=cache_file.parent,
+                    prefix=f".{cache_file.name}.",
+                    suffix=".tmp",
+                    delete=False,
+                )
+            except OSError as e:
+                # Cache failure shouldn't be fatal
+                logger.debug(f"Cannot write cache {cache_file}: {e}")
+
+        ip_list: list[str] = []
+        invalid = 0
+        pending = b""
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                start = len(ip_list)
+                invalid += self._parse_text_lines(lines, ip_list)
+                tee = self._tee_entries(tee, ip_list[start:])
+
+            start = len(ip_list)
+            invalid += self._parse_text_lines([pending], ip_list)
+            tee = self._tee_entries(tee, ip_list[start:])
+        except BaseException:
+            self._discard_temp_file(tee)
+            raise
+
+        if tee is not None:
+            try:
+                tee.close()
+                os.replace(tee.name, cache_file)
+            except OSError as e:
+                logger.debug(f"Cannot write cache {cache_file}: {e}")
+                self._discard_temp_file(tee)
+                tee = None
+
+        if invalid:
+            logger.warning(f"{invalid} entries in the response are not IP addresses or prefixes")
+        return ip_list, tee is not None
+
+    def _parse_text_lines(self, lines: list[bytes], ip_list: list[str]) -> int:
+        """
+        Append the entries of raw text lines, skipping blank lines and comments.
+
+        Returns:
+            Number of entries that are not IP addresses or prefixes (kept for cfst to report)
+        """
+        invalid = 0
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith(b"#"):
+                continue
+            entry = line.decode("utf-8", errors="replace")
+            ip_list.append(entry)
+            if not _is_ip_or_prefix(entry):
+                invalid += 1
+        return invalid
+
+    def _tee_entries(self, tee: IO[str] | None, entries: list[str]) -> IO[str] | None:
+        """Write entries to a streaming cache file, dropping the file if writing fails."""
+        if tee is None or not entries:
+            return tee
+        try:
+            tee.write("\n".join(entries) + "\n")
+            return tee
+        except OSError as e:
+            # Cache failure shouldn't be fatal
+            logger.debug(f"Cannot write cache {tee.name}: {e}")
+            self._discard_temp_file(tee)
+            return None
+
+    @staticmethod
+    def _discard_temp_file(temp_file: IO[str] | None) -> None:
+        """Close and remove a partially written temporary file."""
+        if temp_file is None:
+            return
+        try:
+            temp_file.close()
+        except OSError:
+            pass
+        try:
+            os.unlink(temp_file.name)
+        except OSError:
+            pass
+
+    def prepare_candidates(self, ip_list: list[str] | PackedPrefixList) -> list[str]:
+        """
+        Turn a downloaded prefix list into the candidate list written for the speed test.
+
+        Overlapping and adjacent prefixes are collapsed and excluded ranges are removed
+        before optional sampling. A stratified budget spreads a fixed number of probes
+        across /16s or known colos; otherwise IPv6 prefixes are always sampled, one
+        address per block unless a per-block count is configured, since testing them
+        whole is not feasible. With a shard configured, only the blocks assigned to
+        this node are kept.
+
+        Args:
+            ip_list: IP addresses or CIDR prefixes from the source, or a packed cache view
+
+        Returns:
+            Candidate list; prefixes are expanded into sampled addresses when sampling is enabled
+        """
+        if isinstance(ip_list, PackedPrefixList):
+            candidates = ip_list.to_interval_set()
+            unparsed = []
         else:
-            raise IPSourceError(
-                f"Expected list at JSON path '{json_path}', got {type(current_data)}"
+            candidates = IPIntervalSet.from_prefixes(ip_list)
+            # Entries that are not addresses or prefixes are left for cfst to report
+            unparsed = [entry for entry in ip_list if not _is_ip_or_prefix(entry)]
+
+        exclusions = self._load_exclusions()
+        if exclusions:
+            before = candidates.num_addresses()
+            candidates = candidates - exclusions
+            logger.info(
+                f"Excluded {before - candidates.num_addresses()} addresses "
+                f"listed in {self.config.exclude_file}"
+            )
+
+        prefixes = candidates.to_prefixes()
+
+        stratify_budget = getattr(self.config, "stratify_budget", 0)
+        sample_count = getattr(self.config, "sample_count", 0)
+        if stratify_budget:
+            sampler = StratifiedSampler(
+                stratify_budget,
+                allocation=getattr(self.config, "stratify_allocation", "proportional"),
+                mode=getattr(self.config, "sample_mode", "uniform"),
+                seed=getattr(self.config, "sample_seed", None),
+            )
+            prefixes = sampler.sample(candidates, self.load_prefix_colos())
+        elif sample_count:
+            prefixes = self._create_sampler(sample_count).sample(prefixes)
+        elif candidates.intervals(6):
+            v6_prefixes = [prefix for prefix in prefixes if ":" in prefix]
+            v6_candidates = self._create_sampler(1).sample(v6_prefixes)
+            logger.info(
+                f"Sampled {len(v6_candidates)} IPv6 addresses from {len(v6_prefixes)} prefixes"
             )
+            prefixes = [prefix for prefix in prefixes if ":" not in prefix] + v6_candidates
+
+        if getattr(self.config, "skip_dead", False):
+            prefixes = self._drop_dead(prefixes)
+
+        shard = getattr(self.config, "shard", None)
+        if shard:
+            prefixes, unparsed = self._select_shard(shard, prefixes, unparsed)
+
+        return prefixes + unparsed
+
+    def _select_shard(
+        self, shard: str, candidates: list[str], unparsed: list[str]
+    ) -> tuple[list[str], list[str]]:
+        """
+        Keep the share of the candidates assigned to this node.
+
+        Args:
+            shard: Shard specification ("i/N")
+            candidates: Candidate addresses and prefixes
+            unparsed: Entries that are not addresses or prefixes
+
+        Returns:
+            Tuple of (candidates of this shard, unparsed entries, kept by the first shard only)
+        """
+        try:
+            shard_index, shard_count = parse_shard(shard)
+        except ValueError as e:
+            raise IPSourceError(str(e)) from e
+
+        sharder = CandidateSharder(
+            shard_index, shard_count, block_prefix_v6=self._block_prefixlen(6)
+        )
+        selected = sharder.select(candidates)
+        logger.info(
+            f"Shard {shard_index}/{shard_count}: kept {len(selected)} candidate entries "
+            f"from {len(candidates)}"
+        )
+        return selected, unparsed if shard_index == 1 else []
+
+    def _create_sampler(self, per_block: int) -> CandidateSampler:
+        """Create a candidate sampler from the sampling settings."""
+        max_blocks_v6 = getattr(self.config, "sample_max_blocks_v6", DEFAULT_MAX_BLOCKS_V6)
+        return CandidateSampler(
+            per_block,
+            mode=getattr(self.config, "sample_mode", "uniform"),
+            seed=getattr(self.config, "sample_seed", None),
+            block_prefix_v6=getattr(self.config, "sample_block_v6", DEFAULT_BLOCK_PREFIX_V6),
+            max_blocks_v6=max_blocks_v6 or None,
+        )
+
+    def _get_prefix_colos_file(self) -> Path:
+        """Get path of the known data center per prefix."""
+        return self.cache_dir / "prefix_colos.json"
+
+    def load_prefix_colos(self) -> dict[str, str]:
+        """Load the known data center code per prefix (empty if none is known)."""
+        colos_file = self._get_prefix_colos_file()
+        if not colos_file.exists():
+            return {}
+
+        try:
+            prefix_colos = json.loads(colos_file.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+        if not isinstance(prefix_colos, dict):
+            return {}
+        return {
+            prefix: colo
+            for prefix, colo in prefix_colos.items()
+            if isinstance(colo, str) and colo and _is_ip_or_prefix(prefix)
+        }
+
+    def learn_prefix_colos(self, results: Iterable[Any]) -> int:
+        """
+        Learn the data center of tested blocks and of their source prefixes.
+
+        Each result maps its /24 (IPv6: sampling block) to the colo it reached; attributed
+        results also map their source prefix to its most common colo, which stands in
+        for untested neighbours.
+
+        Args:
+            results: Speed test results, optionally attributed to a prefix
+
+        Returns:
+            Number of results learned from
+        """
+        prefix_colos = self.load_prefix_colos()
+        prefix_votes: dict[str, Counter] = {}
+        learned = 0
+        for result in results:
+            colo = (result.data_center or "").strip().upper()
+            if not colo or colo == "N/A":
+                continue
+            try:
+                address = ipaddress.ip_address(result.ip.strip())
+            except ValueError:
+                continue
+
+            prefix_colos[block_key(address, self._block_prefixlen(address.version))] = colo
+            learned += 1
+            prefix = getattr(result, "prefix", None)
+            if prefix:
+                prefix_votes.setdefault(prefix, Counter())[colo] += 1
+
+        if not learned:
+            return 0
+
+        for prefix, votes in prefix_votes.items():
+            prefix_colos[prefix] = votes.most_common(1)[0][0]
+
+        try:
+            self._get_prefix_colos_file().write_text(
+                json.dumps(prefix_colos, indent=2, sort_keys=True), encoding="utf-8"
+            )
+        except OSError as e:
+            logger.warning(f"Could not save prefix colo table: {e}")
+        return learned
+
+    def _get_prefix_stats_file(self) -> Path:
+        """Get path of the per-prefix result aggregates."""
+        return self.cache_dir / "prefix_stats.json"
+
+    def load_prefix_stats(self) -> dict[str, dict]:
+        """Load the latest result aggregates per source prefix (empty if none are known)."""
+        stats_file = self._get_prefix_stats_file()
+        if not stats_file.exists():
+            return {}
+
+        try:
+            prefix_stats = json.loads(stats_file.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+        if not isinstance(prefix_stats, dict):
+            return {}
+        return {
+            prefix: stats
+            for prefix, stats in prefix_stats.items()
+            if isinstance(stats, dict) and _is_ip_or_prefix(prefix)
+        }
+
+    def record_prefix_stats(self, aggregates: dict[str, dict]) -> None:
+        """
+        Store the result aggregates of source prefixes for pruning future runs.
+
+        Each prefix keeps the aggregates of the last run that tested it, stamped with
+        the time they were recorded; prefixes not tested by this run are kept as they are.
+
+        Args:
+            aggregates: Mapping of prefix to its aggregates (see aggregate_by_prefix)
+        """
+        if not aggregates:
+            return
+
+        prefix_stats = self.load_prefix_stats()
+        now = time.time()
+        for prefix, stats in aggregates.items():
+            prefix_stats[prefix] = {**stats, "updated": now}
+
+        try:
+            self._get_prefix_stats_file().write_text(
+                json.dumps(prefix_stats, indent=2, sort_keys=True), encoding="utf-8"
+            )
+        except OSError as e:
+            logger.warning(f"Could not save prefix statistics: {e}")
+
+    def build_prefix_index(self, spec: str) -> PrefixIndex:
+        """
+        Index the cached prefix lists of one or more sources.
+
+        Args:
+            spec: Source specification as passed to download_ip_list
+
+        Returns:
+            Index mapping addresses to the source prefixes (and sources) containing them
+        """
+        prefix_sources: dict[str, list[str]] = {}
+        for source in self.parse_sources(spec) or [spec]:
+            cache_file = self._get_cache_file(source)
+            if not cache_file.exists():
+                continue
+            for prefix in self._load_from_cache(cache_file):
+                prefix_sources.setdefault(prefix, []).append(source)
+        return PrefixIndex(prefix_sources)
+
+    def _get_dead_filter_file(self) -> Path:
+        """Get path of the filter of repeatedly failing addresses and blocks."""
+        return self.cache_dir / "dead_ips.bin"
+
+    def _block_prefixlen(self, version: int) -> int:
+        """Get the sampling block size used to track failures of an IP version."""
+        if version == 4:
+            return DEFAULT_BLOCK_PREFIX_V4
+        return getattr(self.config, "sample_block_v6", DEFAULT_BLOCK_PREFIX_V6)
+
+    def _drop_dead(self, candidates: list[str]) -> list[str]:
+        """
+        Remove addresses and IPv4 /24 blocks the dead filter reports as repeatedly failing.
+
+        IPv4 prefixes are split into /24s and re-collapsed when some of them are dead;
+        IPv6 prefixes are kept as they are.
+        """
+        dead = DeadIPFilter.load(self._get_dead_filter_file())
+        kept = []
+        skipped = 0
+        for entry in candidates:
+            network = ipaddress.ip_network(entry, strict=False)
+            address = network.network_address
+
+            if network.num_addresses == 1:
+                block = block_key(address, self._block_prefixlen(network.version))
+                if str(address) in dead or block in dead:
+                    skipped += 1
+                else:
+                    kept.append(entry)
+            elif network.version == 4 and network.prefixlen <= DEFAULT_BLOCK_PREFIX_V4:
+                blocks = [
+                    str(block) for block in network.subnets(new_prefix=DEFAULT_BLOCK_PREFIX_V4)
+                ]
+                live = [block for block in blocks if block not in dead]
+                if len(live) == len(blocks):
+                    kept.append(entry)
+                else:
+                    skipped += len(blocks) - len(live)
+                    kept.extend(IPIntervalSet.from_prefixes(live).to_prefixes())
+            elif network.version == 4 and block_key(address, DEFAULT_BLOCK_PREFIX_V4) in dead:
+                skipped += 1
+            else:
+                kept.append(entry)
+
+        if skipped:
+            logger.info(f"Skipped {skipped} known-dead addresses and blocks")
+        return kept
+
+    def record_dead_candidates(self, ip_file: str, responders: Iterable[str]) -> int:
+        """
+        Record candidates of a completed probe run that did not respond.
+
+        Single addresses missing from the responders count as failed, as do the
+        blocks (IPv4 /24s, including those of probed prefixes) without any responder.
+        Only meaningful when the responders include every address that answered.
+
+        Args:
+            ip_file: Candidate file that was probed
+            responders: Addresses that appear in the probe results
+
+        Returns:
+            Number of failed addresses and blocks recorded
+        """
+        responding = set()
+        for ip in responders:
+            try:
+                responding.add(ipaddress.ip_address(ip.strip()))
+            except ValueError:
+                continue
+        responding_blocks = {
+            block_key(address, self._block_prefixlen(address.version)) for address in responding
+        }
+
+        try:
+            with open(ip_file, encoding="utf-8") as f:
+                entries = [line.strip() for line in f if line.strip()]
+        except OSError as e:
+            logger.warning(f"Could not read probed candidates from {ip_file}: {e}")
+            return 0
+
+        failed = []
+        tested_blocks = set()
+        for entry in entries:
+            try:
+                network = ipaddress.ip_network(entry, strict=False)
+            except ValueError:
+                continue
+            address = network.network_address
+
+            if network.num_addresses == 1:
+                tested_blocks.add(block_key(address, self._block_prefixlen(network.version)))
+                if address not in responding:
+                    failed.append(str(address))
+            elif network.version == 4 and network.prefixlen <= DEFAULT_BLOCK_PREFIX_V4:
+                # cfst probes one address in each /24 of a prefix
+                tested_blocks.update(
+                    str(block) for block in network.subnets(new_prefix=DEFAULT_BLOCK_PREFIX_V4)
+                )
+
+        failed.extend(sorted(tested_blocks - responding_blocks))
+        if not failed:
+            return 0
+
+        dead = DeadIPFilter.load(self._get_dead_filter_file())
+        dead.update(failed)
+        try:
+            dead.save(self._get_dead_filter_file())
+        except OSError as e:
+            logger.warning(f"Could not save dead IP filter: {e}")
+            return 0
+
+        logger.info(f"Recorded {len(failed)} unresponsive addresses and blocks")
+        return len(failed)
+
+    def _load_exclusions(self) -> IPIntervalSet | None:
+        """Load the configured exclusion list, if any."""
+        exclude_file = getattr(self.config, "exclude_file", None)
+        if not exclude_file:
+            return None
+        return IPIntervalSet.from_file(exclude_file)
+
+    def _process_json_stream(
+        self,
+        chunks: Iterable[bytes],
+        source_info: dict[str, Any],
+        stop_sync_token: str | None = None,
+    ) -> tuple[list[str], dict[str, Any]]:
+        """
+        Extract IP addresses from a streamed JSON response without loading the whole document.
+
+        Args:
+            chunks: Raw response body chunks
+            source_info: Source definition with json_path and optional json_field
+            stop_sync_token: Stop reading once the document's syncToken equals this value
+
+        Returns:
+            Tuple of (extracted IP list, top-level scalar metadata such as syncToken)
+        """
+        extractor = JSONStreamExtractor(
+            source_info.get("json_path"), source_info.get("json_field"), self._get_item_filter()
+        )
+        ip_list = []
+
+        for chunk in chunks:
+            if not chunk:
+                continue
+            ip_list.extend(extractor.feed_bytes(chunk))
+            if stop_sync_token and extractor.metadata.get("syncToken") == stop_sync_token:
+                return ip_list, extractor.metadata
+
+        ip_list.extend(extractor.close())
+        if not ip_list and extractor.item_filter:
+            logger.warning(f"IP filter '{self.config.ip_filter}' matched no entries")
+        return ip_list, extractor.metadata
+
+    def _get_item_filter(self) -> ItemFilter | None:
+        """Get the configured filter for JSON source items, if any."""
+        ip_filter = getattr(self.config, "ip_filter", None)
+        if not ip_filter:
+            return None
+        return ItemFilter.parse(ip_filter)
 
     def _save_ip_list(self, ip_list: list[str], output_file: str) -> None:
         """Save IP list to output file."""
@@ -240,17 +1302,69 @@ class IPSourceManager:
         import hashlib
 
         # Generate cache filename based on source type
-        if source in self.IP_SOURCES:
+        if source in self.registry:
             # Use predefined source name for cache
-            cache_name = f"ip_list_{source}.txt"
+            cache_name = f"ip_list_{source}"
+
+            # Filtered JSON sources get their own cache entry per filter
+            item_filter = self._get_item_filter()
+            if item_filter and self.registry.get(source)["type"] == "json":
+                filter_hash = hashlib.md5(item_filter.expression.encode()).hexdigest()[:8]
+                cache_name = f"ip_list_{source}_{filter_hash}"
         else:
             # Use MD5 hash of custom URL for cache
             url_hash = hashlib.md5(source.encode()).hexdigest()
-            cache_name = f"ip_list_{url_hash}.txt"
+            cache_name = f"ip_list_{url_hash}"
+
+        extension = ".bin" if getattr(self.config, "cache_format", "text") == "packed" else ".txt"
+        return self.cache_dir / f"{cache_name}{extension}"
+
+    def _revalidate_in_background(
+        self,
+        source_info: dict[str, Any],
+        url: str,
+        source: str | None,
+        cache_file: Path,
+        origin_url: str | None = None,
+    ) -> None:
+        """Refresh an expired cache entry on a background thread."""
+        with self._revalidations_lock:
+            running = self._revalidations.get(cache_file)
+            if running and running.is_alive():
+                return
 
-        return self.cache_dir / cache_name
+            def revalidate() -> None:
+                try:
+                    self._fetch_from_source(
+                        source_info, url, force_refresh=True, source=source, origin_url=origin_url
+                    )
+                    logger.info(f"Refreshed cached IP list from {url}")
+                except IPSourceError as e:
+                    logger.warning(f"Background refresh of {url} failed: {e}")
+
+            # Not a daemon thread: the refreshed list is meant for the next run
+            thread = threading.Thread(
+                target=revalidate, name=f"revalidate-{cache_file.name}", daemon=False
+            )
+            self._revalidations[cache_file] = thread
+            thread.start()
+        logger.info(f"Using expired cache {cache_file}, refreshing in background")
 
-    def _is_cache_valid(self, cache_file: Path, max_age_hours: int = 24) -> bool:
+    def wait_for_revalidation(self, timeout: float | None = None) -> None:
+        """
+        Wait for background cache refreshes to finish.
+
+        Args:
+            timeout: Maximum seconds to wait for each refresh (None waits indefinitely)
+        """
+        with self._revalidations_lock:
+            threads = list(self._revalidations.values())
+        for thread in threads:
+            thread.join(timeout)
+
+    def _is_cache_valid(
+        self, cache_file: Path, max_age_hours: float = DEFAULT_CACHE_TTL_HOURS
+    ) -> bool:
         """Check if cache file is still valid."""
         if not cache_file.exists():
             return False
@@ -262,18 +1376,104 @@ class IPSourceManager:
 
         return file_age < max_age_seconds
 
-    def _copy_from_cache(self, cache_file: Path, output_file: str) -> None:
-        """Copy IP list from cache to output file."""
+    def _get_cache_meta_file(self, cache_file: Path) -> Path:
+        """Get path of the validator metadata stored next to a cache file."""
+        if self._is_packed_cache(cache_file):
+            return cache_file.with_name(f"{cache_file.name}.meta.json")
+        return cache_file.with_suffix(".meta.json")
+
+    def _load_cache_meta(self, cache_file: Path) -> dict[str, str]:
+        """Load HTTP validators (ETag, Last-Modified, sync token) for a cache file."""
+        meta_file = self._get_cache_meta_file(cache_file)
+        if not meta_file.exists():
+            return {}
+
         try:
-            import shutil
+            with open(meta_file, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+        return meta if isinstance(meta, dict) else {}
 
-            shutil.copy2(cache_file, output_file)
+    def _save_cache_meta(self, cache_file: Path, validators: dict[str, str]) -> None:
+        """Save HTTP validators for a cache file."""
+        meta_file = self._get_cache_meta_file(cache_file)
+        try:
+            if validators:
+                with open(meta_file, "w", encoding="utf-8") as f:
+                    json.dump(validators, f)
+            else:
+                meta_file.unlink(missing_ok=True)
+        except OSError:
+            # Metadata failure shouldn't be fatal, it only disables revalidation
+            pass
+
+    def _get_conditional_headers(self, cache_file: Path) -> dict[str, str]:
+        """Build conditional request headers from the validators of a cached list."""
+        if not cache_file.exists():
+            return {}
+
+        meta = self._load_cache_meta(cache_file)
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def _get_response_validators(self, response: requests.Response) -> dict[str, str]:
+        """Extract cache validators from a response."""
+        validators = {}
+        for header, key in (("ETag", "etag"), ("Last-Modified", "last_modified")):
+            value = response.headers.get(header)
+            if isinstance(value, str) and value:
+                validators[key] = value
+        return validators
+
+    def _refresh_cache(self, cache_file: Path) -> None:
+        """Mark a revalidated cache file as fresh without rewriting it."""
+        try:
+            cache_file.touch()
+        except OSError:
+            pass
+
+    def _load_from_cache(self, cache_file: Path) -> list[str]:
+        """Load the raw IP list stored in a cache file."""
+        if self._is_packed_cache(cache_file):
+            with PackedPrefixList(cache_file) as packed:
+                return packed.to_list()
+
+        try:
+            with open(cache_file, encoding="utf-8") as f:
+                return self._process_text_response(f.read())
+        except OSError as e:
+            raise IPSourceError(f"Failed to read from cache: {e}") from e
+
+    def _copy_from_cache(self, cache_file: Path, output_file: str) -> None:
+        """Write candidates from the cached IP list to output file."""
+        try:
+            if self._is_packed_cache(cache_file):
+                # Packed caches feed the interval set without parsing strings
+                with PackedPrefixList(cache_file) as packed:
+                    candidates = self.prepare_candidates(packed)
+            else:
+                candidates = self.prepare_candidates(self._load_from_cache(cache_file))
+            self._save_ip_list(candidates, output_file)
         except OSError as e:
             raise IPSourceError(f"Failed to copy from cache: {e}") from e
 
+    def _is_packed_cache(self, cache_file: Path) -> bool:
+        """Check if a cache file uses the packed binary format."""
+        return cache_file.suffix == ".bin"
+
     def _save_to_cache(self, ip_list: list[str], cache_file: Path) -> None:
         """Save IP list to cache file."""
         try:
+            if self._is_packed_cache(cache_file):
+                write_packed(cache_file, ip_list)
+                return
+
             with open(cache_file, "w", encoding="utf-8") as f:
                 for ip in ip_list:
                     f.write(f"{ip}\n")
@@ -293,17 +1493,20 @@ class IPSourceManager:
             # Cache clearing failure shouldn't be fatal
             pass
 
-    def _get_proxy_config(self, proxy_url: str) -> dict[str, str]:
-        """Convert proxy URL to requests-compatible proxy configuration."""
-        # requests library expects proxies in format: {'http': 'proxy_url', 'https': 'proxy_url'}
-        return {"http": proxy_url, "https": proxy_url}
+    def _get_cache_source(self, cache_file: Path) -> str:
+        """Get the source name encoded in a cache file name (a URL hash for custom sources)."""
+        return cache_file.name.removeprefix("ip_list_").split(".")[0].split("_")[0]
 
     def get_cache_info(self) -> dict[str, Any]:
         """Get information about cached files."""
         cache_info = {"cache_dir": str(self.cache_dir), "files": []}
 
         if self.cache_dir.exists():
-            for cache_file in self.cache_dir.glob("ip_list_*.txt"):
+            cache_files = [
+                *self.cache_dir.glob("ip_list_*.txt"),
+                *self.cache_dir.glob("ip_list_*.bin"),
+            ]
+            for cache_file in cache_files:
                 try:
                     stat = cache_file.stat()
                     cache_info["files"].append(
@@ -311,7 +1514,9 @@ class IPSourceManager:
                             "file": cache_file.name,
                             "size": stat.st_size,
                             "modified": stat.st_mtime,
-                            "valid": self._is_cache_valid(cache_file),
+                            "valid": self._is_cache_valid(
+                                cache_file, self.get_cache_ttl(self._get_cache_source(cache_file))
+                            ),
                         }
                     )
                 except OSError:
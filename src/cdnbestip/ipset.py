@@ -0,0 +1,214 @@
+"""Interval sets of IPv4/IPv6 addresses for collapsing and excluding prefixes."""
+
+import ipaddress
+from collections.abc import Iterable, Iterator
+
+from .exceptions import IPSourceError
+from .sampling import int_to_ip, parse_prefix
+
+_ADDRESS_BITS = {4: 32, 6: 128}
+
+
+def _normalize(intervals: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Sort intervals and merge overlapping or adjacent ones."""
+    if not intervals:
+        return []
+
+    intervals = sorted(intervals)
+    merged = [intervals[0]]
+    for first, last in intervals[1:]:
+        prev_first, prev_last = merged[-1]
+        if first <= prev_last + 1:
+            if last > prev_last:
+                merged[-1] = (prev_first, last)
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def _intersect(left: list[tuple[int, int]], right: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Intersect two normalized interval lists."""
+    result = []
+    i = j = 0
+    while i < len(left) and j < len(right):
+        first = max(left[i][0], right[j][0])
+        last = min(left[i][1], right[j][1])
+        if first <= last:
+            result.append((first, last))
+        if left[i][1] < right[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def _subtract(left: list[tuple[int, int]], right: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Subtract a normalized interval list from another."""
+    result = []
+    j = 0
+    for first, last in left:
+        # Skip exclusions that end before this interval
+        while j < len(right) and right[j][1] < first:
+            j += 1
+
+        current = first
+        k = j
+        while k < len(right) and right[k][0] <= last:
+            if right[k][0] > current:
+                result.append((current, right[k][0] - 1))
+            current = max(current, right[k][1] + 1)
+            if current > last:
+                break
+            k += 1
+
+        if current <= last:
+            result.append((current, last))
+    return result
+
+
+class IPIntervalSet:
+    """Set of IP addresses stored as sorted, disjoint integer intervals per IP version."""
+
+    def __init__(self, intervals: Iterable[tuple[int, int, int]] = ()):
+        """
+        Initialize interval set.
+
+        Args:
+            intervals: (ip_version, first_address, last_address) tuples
+        """
+        by_version: dict[int, list[tuple[int, int]]] = {4: [], 6: []}
+        for version, first, last in intervals:
+            by_version[version].append((first, last))
+        self._intervals = {version: _normalize(items) for version, items in by_version.items()}
+
+    @classmethod
+    def from_prefixes(cls, prefixes: Iterable[str]) -> "IPIntervalSet":
+        """
+        Build a set from IP addresses and CIDR prefixes, ignoring invalid entries.
+
+        Args:
+            prefixes: IP addresses or CIDR prefixes
+        """
+        intervals = []
+        for prefix in prefixes:
+            try:
+                intervals.append(parse_prefix(prefix))
+            except ValueError:
+                continue
+        return cls(intervals)
+
+    @classmethod
+    def from_file(cls, path: str) -> "IPIntervalSet":
+        """
+        Load a set from a file with one address or prefix per line.
+
+        Empty lines and '#' comments are ignored.
+
+        Raises:
+            IPSourceError: If the file cannot be read
+        """
+        try:
+            with open(path, encoding="utf-8") as f:
+                lines = [line.split("#", 1)[0].strip() for line in f]
+        except OSError as e:
+            raise IPSourceError(f"Failed to read IP list file {path}: {e}") from e
+        return cls.from_prefixes(line for line in lines if line)
+
+    def intervals(self, version: int) -> list[tuple[int, int]]:
+        """Get the normalized (first, last) intervals of an IP version."""
+        return list(self._intervals[version])
+
+    def num_addresses(self) -> int:
+        """Get the total number of addresses in the set."""
+        return sum(
+            last - first + 1 for items in self._intervals.values() for first, last in items
+        )
+
+    def __bool__(self) -> bool:
+        return any(self._intervals.values())
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, IPIntervalSet):
+            return NotImplemented
+        return self._intervals == other._intervals
+
+    def __contains__(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+
+        value = int(ip)
+        items = self._intervals[ip.version]
+        low, high = 0, len(items)
+        while low < high:
+            mid = (low + high) // 2
+            if items[mid][1] < value:
+                low = mid + 1
+            else:
+                high = mid
+        return low < len(items) and items[low][0] <= value
+
+    def __or__(self, other: "IPIntervalSet") -> "IPIntervalSet":
+        return self._combine(other, lambda left, right: _normalize(left + right))
+
+    def __and__(self, other: "IPIntervalSet") -> "IPIntervalSet":
+        return self._combine(other, _intersect)
+
+    def __sub__(self, other: "IPIntervalSet") -> "IPIntervalSet":
+        return self._combine(other, _subtract)
+
+    def union(self, other: "IPIntervalSet") -> "IPIntervalSet":
+        """Get addresses in either set."""
+        return self | other
+
+    def intersection(self, other: "IPIntervalSet") -> "IPIntervalSet":
+        """Get addresses in both sets."""
+        return self & other
+
+    def difference(self, other: "IPIntervalSet") -> "IPIntervalSet":
+        """Get addresses in this set but not in the other."""
+        return self - other
+
+    def _combine(self, other: "IPIntervalSet", operation) -> "IPIntervalSet":
+        """Apply an interval list operation per IP version."""
+        result = IPIntervalSet()
+        result._intervals = {
+            version: operation(self._intervals[version], other._intervals[version])
+            for version in (4, 6)
+        }
+        return result
+
+    def iter_prefixes(self) -> Iterator[tuple[int, int, int]]:
+        """
+        Iterate the minimal CIDR cover of the set.
+
+        Yields:
+            (ip_version, network_address, prefix_length) tuples, IPv4 first
+        """
+        for version in (4, 6):
+            bits = _ADDRESS_BITS[version]
+            for first, last in self._intervals[version]:
+                current = first
+                while current <= last:
+                    # Largest block aligned at current that fits in the remaining range
+                    alignment = (current & -current).bit_length() - 1 if current else bits
+                    remaining = (last - current + 1).bit_length() - 1
+                    size_bits = min(alignment, remaining)
+                    yield version, current, bits - size_bits
+                    current += 1 << size_bits
+
+    def to_prefixes(self) -> list[str]:
+        """
+        Collapse the set into a minimal list of CIDR prefixes.
+
+        Single addresses are written without a prefix length.
+        """
+        prefixes = []
+        for version, network, prefix_length in self.iter_prefixes():
+            address = int_to_ip(version, network)
+            if prefix_length == _ADDRESS_BITS[version]:
+                prefixes.append(address)
+            else:
+                prefixes.append(f"{address}/{prefix_length}")
+        return prefixes
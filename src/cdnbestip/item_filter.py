@@ -0,0 +1,70 @@
+"""Filter expressions on the per-item fields of JSON range sources."""
+
+from typing import Any
+
+from .exceptions import IPSourceError
+
+
+class ItemFilter:
+    """
+    Matches JSON list items against field conditions.
+
+    Expressions are comma-separated ``field=value`` or ``field!=value`` terms that must
+    all match. A term may list alternative values separated by ``|``. Values are
+    compared case-insensitively, e.g. ``service=CLOUDFRONT,region=ap-east-1|ap-southeast-1``.
+    """
+
+    def __init__(self, conditions: list[tuple[str, bool, frozenset[str]]]):
+        """
+        Initialize item filter.
+
+        Args:
+            conditions: (field, negated, accepted_values) tuples; values are lowercase
+        """
+        self.conditions = conditions
+
+    @classmethod
+    def parse(cls, expression: str) -> "ItemFilter":
+        """
+        Parse a filter expression.
+
+        Raises:
+            IPSourceError: If the expression is malformed
+        """
+        conditions = []
+        for term in expression.split(","):
+            term = term.strip()
+            if not term:
+                continue
+
+            negated = "!=" in term
+            field, sep, values = term.partition("!=" if negated else "=")
+            field = field.strip()
+            accepted = frozenset(v.strip().lower() for v in values.split("|") if v.strip())
+            if not sep or not field or not accepted:
+                raise IPSourceError(
+                    f"Invalid filter term '{term}'. Expected field=value or field!=value"
+                )
+            conditions.append((field, negated, accepted))
+
+        if not conditions:
+            raise IPSourceError("Filter expression is empty")
+        return cls(conditions)
+
+    @property
+    def expression(self) -> str:
+        """Canonical form of the filter, stable across equivalent expressions."""
+        terms = sorted(
+            f"{field}{'!=' if negated else '='}{'|'.join(sorted(values))}"
+            for field, negated, values in self.conditions
+        )
+        return ",".join(terms)
+
+    def matches(self, item: dict[str, Any]) -> bool:
+        """Check if a JSON object item satisfies every condition."""
+        for field, negated, accepted in self.conditions:
+            value = item.get(field)
+            found = value is not None and str(value).lower() in accepted
+            if found == negated:
+                return False
+        return True
@@ -0,0 +1,355 @@
+"""Streaming extraction of IP ranges from large JSON documents."""
+
+import codecs
+import json
+import re
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from .exceptions import IPSourceError
+from .item_filter import ItemFilter
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_STRUCTURAL = re.compile(r'["\[\]{}]')
+
+# Value roles
+_DESCEND = "descend"
+_TARGET = "target"
+_EXTRACT = "extract"
+_METADATA = "metadata"
+_SKIP = "skip"
+
+
+class _Frame:
+    """Open JSON container on the parser stack."""
+
+    __slots__ = ("kind", "path", "state", "key", "is_target")
+
+    def __init__(self, kind: str, path: list[str], is_target: bool = False):
+        self.kind = kind  # "object" or "array"
+        self.path = path
+        self.state = "first"  # first, key, colon, value, next
+        self.key: str | None = None
+        self.is_target = is_target
+
+
+class JSONStreamExtractor:
+    """
+    Incrementally extracts the items of a list at a JSON path.
+
+    The document is fed in text chunks as they arrive. Only the items of the target
+    list are decoded; everything else is scanned over without being materialized.
+    Top-level scalar values (e.g., AWS ``syncToken``) are collected in ``metadata``.
+    """
+
+    def __init__(
+        self,
+        json_path: str,
+        json_field: str | None = None,
+        item_filter: ItemFilter | None = None,
+    ):
+        """
+        Initialize JSON stream extractor.
+
+        Args:
+            json_path: Dot-separated path of the list to extract (e.g., "prefixes")
+            json_field: Field to extract from each object item (None uses items directly)
+            item_filter: Filter applied to object items before extraction
+        """
+        if not json_path:
+            raise IPSourceError("JSON path not specified for JSON source")
+
+        self.json_path = json_path
+        self.target = json_path.split(".")
+        self.json_field = json_field
+        self.item_filter = item_filter
+        self.metadata: dict[str, Any] = {}
+        self.found = False
+
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._stack: list[_Frame] = []
+        self._started = False
+        self._finished = False
+        self._skip_depth = 0
+
+    def feed_bytes(self, chunk: bytes) -> list[Any]:
+        """Feed a raw UTF-8 chunk and return the items completed by it."""
+        try:
+            text = self._text_decoder.decode(chunk)
+        except UnicodeDecodeError as e:
+            raise IPSourceError(f"Invalid UTF-8 in JSON response: {e}") from e
+        return self.feed(text)
+
+    def feed(self, text: str) -> list[Any]:
+        """Feed a text chunk and return the items completed by it."""
+        self._buffer += text
+        items: list[Any] = []
+        self._run(items, final=False)
+
+        # Drop consumed input so memory stays bounded by the largest pending token
+        self._buffer = self._buffer[self._pos :]
+        self._pos = 0
+        return items
+
+    def close(self) -> list[Any]:
+        """
+        Finish parsing and return any remaining items.
+
+        Raises:
+            IPSourceError: If the document is truncated or the JSON path was not found
+        """
+        items: list[Any] = []
+        self._buffer += self._text_decoder.decode(b"", final=True)
+        self._run(items, final=True)
+
+        if not self._finished:
+            if self.found or self._started:
+                raise IPSourceError("Failed to parse response: truncated or invalid JSON")
+            raise IPSourceError("Failed to parse response: empty JSON document")
+        if not self.found:
+            raise IPSourceError(f"JSON path '{self.json_path}' not found in response")
+        return items
+
+    def _run(self, items: list[Any], final: bool) -> None:
+        """Advance the parser as far as the buffered input allows."""
+        buffer = self._buffer
+        while not self._finished:
+            if self._skip_depth:
+                if not self._skip_container(final):
+                    return
+                self._value_done()
+                continue
+
+            pos = _WHITESPACE.match(buffer, self._pos).end()
+            self._pos = pos
+            if pos >= len(buffer):
+                return
+
+            char = buffer[pos]
+            frame = self._stack[-1] if self._stack else None
+
+            if frame is None:
+                # Root value
+                if self._started:
+                    raise IPSourceError("Failed to parse response: unexpected data after JSON")
+                if char != "{":
+                    raise IPSourceError("Failed to parse response: expected JSON object")
+                self._started = True
+                self._stack.append(_Frame("object", []))
+                self._pos = pos + 1
+                continue
+
+            if frame.kind == "object":
+                if frame.state in ("first", "next") and char == "}":
+                    self._close_frame(pos)
+                    continue
+                if frame.state == "next":
+                    self._expect(char, ",")
+                    frame.state = "key"
+                    self._pos = pos + 1
+                    continue
+                if frame.state in ("first", "key"):
+                    match = _STRING.match(buffer, pos)
+                    if not match:
+                        # Either a malformed key or a key split across chunks
+                        self._expect(char, '"')
+                        return
+                    frame.key = json.loads(match.group())
+                    frame.state = "colon"
+                    self._pos = match.end()
+                    continue
+                if frame.state == "colon":
+                    self._expect(char, ":")
+                    frame.state = "value"
+                    self._pos = pos + 1
+                    continue
+            else:
+                if frame.state in ("first", "next") and char == "]":
+                    self._close_frame(pos)
+                    continue
+                if frame.state == "next":
+                    self._expect(char, ",")
+                    frame.state = "value"
+                    self._pos = pos + 1
+                    continue
+
+            if not self._read_value(frame, char, items, final):
+                return
+
+    def _read_value(self, frame: _Frame, char: str, items: list[Any], final: bool) -> bool:
+        """Handle the value at the current position; return False when more input is needed."""
+        role = self._value_role(frame)
+        pos = self._pos
+
+        if role == _DESCEND and char == "{":
+            self._stack.append(_Frame("object", frame.path + [frame.key]))
+            self._pos = pos + 1
+            return True
+
+        if role == _TARGET:
+            if char != "[":
+                raise IPSourceError(
+                    f"Expected list at JSON path '{self.json_path}', got non-list value"
+                )
+            self.found = True
+            self._stack.append(_Frame("array", frame.path + [frame.key], is_target=True))
+            self._pos = pos + 1
+            return True
+
+        if role == _EXTRACT or (role == _METADATA and char not in "[{"):
+            value, end = self._decode_value(pos, final)
+            if end is None:
+                return False
+            if role == _EXTRACT:
+                self._emit(value, items)
+            else:
+                self.metadata[frame.key] = value
+            self._pos = end
+            self._value_done()
+            return True
+
+        # Skip the value without decoding it
+        if char in "[{":
+            self._skip_depth = 1
+            self._pos = pos + 1
+            return True
+        end = self._scan_scalar(pos, final)
+        if end is None:
+            return False
+        self._pos = end
+        self._value_done()
+        return True
+
+    def _value_role(self, frame: _Frame) -> str:
+        """Decide how to treat the value about to be read."""
+        if frame.kind == "array":
+            return _EXTRACT if frame.is_target else _SKIP
+
+        path = frame.path + [frame.key]
+        if path == self.target:
+            return _TARGET
+        if path == self.target[: len(path)]:
+            return _DESCEND
+        if not frame.path:
+            return _METADATA
+        return _SKIP
+
+    def _decode_value(self, pos: int, final: bool) -> tuple[Any, int | None]:
+        """Decode a complete value, or return (None, None) if it is still incomplete."""
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, pos)
+        except json.JSONDecodeError as e:
+            if final:
+                raise IPSourceError(f"Failed to parse response: {e}") from e
+            return None, None
+
+        # A number or literal touching the end of the buffer may continue in the next chunk
+        if end >= len(self._buffer) and not final:
+            return None, None
+        return value, end
+
+    def _scan_scalar(self, pos: int, final: bool) -> int | None:
+        """Find the end of a scalar value without decoding it."""
+        buffer = self._buffer
+        if buffer[pos] == '"':
+            match = _STRING.match(buffer, pos)
+            if not match:
+                if final:
+                    raise IPSourceError("Failed to parse response: unterminated string")
+                return None
+            return match.end()
+
+        end = pos
+        while end < len(buffer) and buffer[end] not in ",]} \t\n\r":
+            end += 1
+        if end >= len(buffer) and not final:
+            return None
+        return end
+
+    def _skip_container(self, final: bool) -> bool:
+        """Scan over a container that is not on the target path."""
+        buffer = self._buffer
+        pos = self._pos
+        while self._skip_depth:
+            match = _STRUCTURAL.search(buffer, pos)
+            if not match:
+                self._pos = len(buffer)
+                return False
+
+            char = match.group()
+            if char == '"':
+                string = _STRING.match(buffer, match.start())
+                if not string:
+                    # Resume at the opening quote once more input arrives
+                    self._pos = match.start()
+                    return False
+                pos = string.end()
+            elif char in "[{":
+                self._skip_depth += 1
+                pos = match.end()
+            else:
+                self._skip_depth -= 1
+                pos = match.end()
+
+        self._pos = pos
+        return True
+
+    def _close_frame(self, pos: int) -> None:
+        """Close the innermost container."""
+        self._stack.pop()
+        self._pos = pos + 1
+        if self._stack:
+            self._value_done()
+        else:
+            self._finished = True
+
+    def _value_done(self) -> None:
+        """Mark the current value of the innermost container as complete."""
+        if self._stack:
+            self._stack[-1].state = "next"
+
+    def _expect(self, char: str, expected: str) -> None:
+        """Raise a parse error if the current character is not the expected one."""
+        if char != expected:
+            raise IPSourceError(
+                f"Failed to parse response: expected '{expected}', got '{char}'"
+            )
+
+    def _emit(self, item: Any, items: list[Any]) -> None:
+        """Collect an extracted list item."""
+        if self.item_filter and isinstance(item, dict) and not self.item_filter.matches(item):
+            return
+        if self.json_field:
+            if isinstance(item, dict) and self.json_field in item:
+                items.append(item[self.json_field])
+        else:
+            items.append(str(item))
+
+
+def iter_json_stream(
+    chunks: Iterable[bytes],
+    json_path: str,
+    json_field: str | None = None,
+    item_filter: ItemFilter | None = None,
+) -> Iterator[Any]:
+    """
+    Yield items of the list at a JSON path from a stream of raw chunks.
+
+    Args:
+        chunks: Raw response body chunks (e.g., from ``response.iter_content()``)
+        json_path: Dot-separated path of the list to extract
+        json_field: Field to extract from each object item
+        item_filter: Filter applied to object items before extraction
+
+    Yields:
+        Extracted values in document order
+    """
+    extractor = JSONStreamExtractor(json_path, json_field, item_filter)
+    for chunk in chunks:
+        if chunk:
+            yield from extractor.feed_bytes(chunk)
+    yield from extractor.close()
@@ -0,0 +1,272 @@
+"""Local file IP sources: memory-mapped reading and change watching."""
+
+import ctypes
+import ctypes.util
+import mmap
+import os
+import select
+import struct
+import sys
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+from urllib.request import url2pathname
+
+from .exceptions import IPSourceError
+from .logging_config import get_logger
+from .packed_cache import PACKED_MAGIC, PackedPrefixList
+
+logger = get_logger(__name__)
+
+# inotify event masks (linux/inotify.h); a completed write or a rename into
+# place both mean a producer finished replacing the file
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_DELETE_SELF | _IN_MOVE_SELF
+_IN_EVENT = struct.Struct("iIII")
+
+# Interval between stat checks when inotify is unavailable
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+def is_local_source(source: str) -> bool:
+    """
+    Check if a source refers to a local file rather than a URL or source name.
+
+    Args:
+        source: file:// URL, filesystem path, predefined source name or URL
+
+    Returns:
+        True for file:// URLs, path-like strings and existing files
+    """
+    if source.startswith("file://"):
+        return True
+    if "://" in source:
+        return False
+    return "/" in source or os.sep in source or source.startswith("~") or os.path.isfile(source)
+
+
+def local_source_path(source: str) -> Path:
+    """
+    Resolve a local source to an absolute file path.
+
+    Args:
+        source: file:// URL or filesystem path
+
+    Returns:
+        Absolute path of the file
+
+    Raises:
+        IPSourceError: If a file:// URL names a remote host
+    """
+    if source.startswith("file://"):
+        parsed = urlparse(source)
+        if parsed.netloc not in ("", "localhost"):
+            raise IPSourceError(f"Remote file URLs are not supported: {source}")
+        source = url2pathname(unquote(parsed.path))
+    return Path(source).expanduser().absolute()
+
+
+def read_local_list(path: str | Path) -> list[str]:
+    """
+    Read IP addresses and prefixes from a local file.
+
+    Text files are memory-mapped and split line by line without loading a
+    decoded copy of the whole file; blank lines and # comments are skipped.
+    Files in the packed cache format are read through PackedPrefixList.
+
+    Args:
+        path: Text or packed prefix list
+
+    Returns:
+        List of IP addresses/prefixes in file order
+
+    Raises:
+        IPSourceError: If the file cannot be read
+    """
+    path = Path(path)
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if mm[: len(PACKED_MAGIC)] != PACKED_MAGIC:
+                    entries = []
+                    for line in iter(mm.readline, b""):
+                        line = line.strip()
+                        if line and not line.startswith(b"#"):
+                            entries.append(line.decode("utf-8", errors="replace"))
+                    return entries
+    except (OSError, ValueError) as e:
+        raise IPSourceError(f"Failed to read IP list file {path}: {e}") from e
+
+    with PackedPrefixList(path) as packed:
+        return packed.to_list()
+
+
+def _load_inotify() -> ctypes.CDLL | None:
+    """Load the libc inotify functions (None when the platform has no inotify)."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class FileWatcher:
+    """
+    Reports when any of a set of files is rewritten or replaced.
+
+    On Linux the parent directories are watched with inotify, which catches
+    both in-place rewrites and files renamed into place by another job. Other
+    platforms fall back to comparing the files' mtime, size and inode.
+    """
+
+    def __init__(
+        self,
+        paths: Iterable[str | Path],
+        use_inotify: bool = True,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ):
+        """
+        Start watching files.
+
+        Args:
+            paths: Files to watch (they do not need to exist yet)
+            use_inotify: Use inotify when available instead of stat polling
+            poll_interval: Seconds between stat checks in the polling fallback
+        """
+        self.paths = [Path(path).absolute() for path in paths]
+        self.poll_interval = poll_interval
+        self._fd: int | None = None
+        self._watches: dict[int, set[str]] = {}
+        self._signatures = {path: self._signature(path) for path in self.paths}
+
+        libc = _load_inotify() if use_inotify else None
+        if libc is not None:
+            self._start_inotify(libc)
+
+    @property
+    def uses_inotify(self) -> bool:
+        """Whether changes are detected with inotify rather than stat polling."""
+        return self._fd is not None
+
+    def _start_inotify(self, libc: ctypes.CDLL) -> None:
+        """Add inotify watches on the directories of the watched files."""
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            logger.debug(f"inotify unavailable: {os.strerror(ctypes.get_errno())}")
+            return
+
+        directories: dict[Path, set[str]] = {}
+        for path in self.paths:
+            directories.setdefault(path.parent, set()).add(path.name)
+
+        for directory, names in directories.items():
+            wd = libc.inotify_add_watch(fd, os.fsencode(directory), _IN_WATCH_MASK)
+            if wd < 0:
+                logger.debug(
+                    f"Cannot watch {directory}: {os.strerror(ctypes.get_errno())}, polling instead"
+                )
+                os.close(fd)
+                self._watches.clear()
+                return
+            self._watches.setdefault(wd, set()).update(names)
+        self._fd = fd
+
+    @staticmethod
+    def _signature(path: Path) -> tuple[int, int, int] | None:
+        """Get the (mtime, size, inode) of a file, or None if it does not exist."""
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _read_events(self) -> bool:
+        """Drain pending inotify events; True if any concerns a watched file."""
+        changed = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            if not data:
+                return changed
+
+            offset = 0
+            while offset + _IN_EVENT.size <= len(data):
+                wd, mask, _, name_len = _IN_EVENT.unpack_from(data, offset)
+                offset += _IN_EVENT.size
+                name = os.fsdecode(data[offset : offset + name_len].rstrip(b"\0"))
+                offset += name_len
+                if name in self._watches.get(wd, ()) or mask & (_IN_DELETE_SELF | _IN_MOVE_SELF):
+                    changed = True
+
+    def _poll(self) -> bool:
+        """Compare file signatures with the last seen ones; True if any differ."""
+        changed = False
+        for path in self.paths:
+            signature = self._signature(path)
+            if signature != self._signatures[path]:
+                self._signatures[path] = signature
+                changed = True
+        return changed
+
+    def changed(self) -> bool:
+        """
+        Check without blocking whether a watched file changed since the last check.
+
+        Returns:
+            True if any watched file was rewritten, replaced or removed
+        """
+        if self._fd is not None:
+            return self._read_events()
+        return self._poll()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """
+        Block until a watched file changes.
+
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if a change was seen, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if self._fd is not None:
+                readable, _, _ = select.select([self._fd], [], [], remaining)
+                if readable and self._read_events():
+                    return True
+            else:
+                if self._poll():
+                    return True
+                delay = self.poll_interval
+                if remaining is not None:
+                    delay = min(delay, remaining)
+                time.sleep(delay)
+            if deadline is not None and time.monotonic() >= deadline:
+                return self.changed()
+
+    def close(self) -> None:
+        """Stop watching."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            self._watches.clear()
+
+    def __enter__(self) -> "FileWatcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,175 @@
+"""Staggered racing of equivalent download URLs (e.g., a CDN mirror and its origin)."""
+
+import queue
+import threading
+from collections.abc import Callable, Iterator
+
+import requests
+
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Delay before starting the next candidate while the previous one is still pending
+DEFAULT_RACE_DELAY = 0.3
+
+# Size of the first body chunk read to validate a candidate
+DEFAULT_PEEK_SIZE = 64 * 1024
+
+
+class PeekedResponse:
+    """
+    Response whose first body chunk was already read during the race.
+
+    ``iter_content`` yields the peeked chunk before the rest of the body; every
+    other attribute is taken from the wrapped response.
+    """
+
+    def __init__(self, response: requests.Response, first_chunk: bytes, rest: Iterator[bytes]):
+        self._response = response
+        self._first_chunk = first_chunk
+        self._rest = rest
+
+    def __getattr__(self, name: str):
+        return getattr(self._response, name)
+
+    def iter_content(self, chunk_size: int | None = None, decode_unicode: bool = False):
+        """Iterate the body, starting with the peeked chunk (chunk_size only applied once)."""
+        if self._first_chunk:
+            yield self._first_chunk
+        yield from self._rest
+
+
+def _is_usable(response: requests.Response) -> bool:
+    """Check if a response can be used (successful or not modified)."""
+    return response.status_code == 304 or bool(response.ok)
+
+
+def _peek(
+    response: requests.Response, validate: Callable[[bytes], bool], chunk_size: int
+) -> PeekedResponse | None:
+    """
+    Read the start of the body and check it before the response may win.
+
+    Returns:
+        Response replaying the peeked chunk, or None if the body failed validation
+    """
+    chunks = iter(response.iter_content(chunk_size=chunk_size))
+    first_chunk = b""
+    # Chunks can come back shorter than requested; gather up to a full chunk
+    for chunk in chunks:
+        first_chunk += chunk
+        if len(first_chunk) >= chunk_size:
+            break
+    if not validate(first_chunk):
+        return None
+    return PeekedResponse(response, first_chunk, chunks)
+
+
+def race_get(
+    session: requests.Session,
+    urls: list[str],
+    delay: float = DEFAULT_RACE_DELAY,
+    validate: Callable[[bytes], bool] | None = None,
+    peek_size: int = DEFAULT_PEEK_SIZE,
+    **kwargs,
+) -> tuple[str, requests.Response]:
+    """
+    GET equivalent URLs happy-eyeballs style and return the first usable response.
+
+    The first URL starts immediately; each further URL starts once the previous ones
+    have been pending for ``delay`` seconds, or right away when one of them fails.
+    Responses that lose the race are closed as soon as they arrive.
+
+    With ``validate``, a successful response only wins once its first body chunk
+    passes the check, so a captive portal or error page answering 200 counts as a
+    failed candidate. The winner then replays the peeked chunk from ``iter_content``.
+    Not-modified responses have no body and are not validated.
+
+    Args:
+        session: Session used for the requests
+        urls: Candidate URLs in order of preference
+        delay: Stagger delay in seconds between starting candidates
+        validate: Check applied to the first body chunk of successful responses
+        peek_size: Size of the chunk passed to ``validate``
+        **kwargs: Arguments passed to ``session.get`` (use ``stream=True`` with validate)
+
+    Returns:
+        Tuple of (winning URL, response)
+
+    Raises:
+        requests.RequestException: If every candidate fails
+    """
+    if not urls:
+        raise ValueError("No URLs to race")
+
+    results: queue.Queue = queue.Queue()
+    lock = threading.Lock()
+    finished = threading.Event()
+
+    def attempt(url: str) -> None:
+        response, error = None, None
+        try:
+            response = session.get(url, **kwargs)
+            if validate is not None and response.status_code != 304 and response.ok:
+                peeked = _peek(response, validate, peek_size)
+                if peeked is None:
+                    response.close()
+                    response, error = None, "unexpected response body"
+                else:
+                    response = peeked
+        except requests.RequestException as e:
+            if response is not None:
+                response.close()
+            response, error = None, e
+
+        with lock:
+            if finished.is_set():
+                # Lost the race: release the connection
+                if response is not None:
+                    response.close()
+                return
+            results.put((url, response, error))
+
+    started = 0
+    pending = 0
+    errors = []
+
+    def start_next() -> None:
+        nonlocal started, pending
+        url = urls[started]
+        started += 1
+        pending += 1
+        threading.Thread(target=attempt, args=(url,), name="race-get", daemon=True).start()
+
+    start_next()
+    while True:
+        try:
+            timeout = delay if started < len(urls) else None
+            url, response, error = results.get(timeout=timeout)
+        except queue.Empty:
+            start_next()
+            continue
+
+        pending -= 1
+        if response is not None and _is_usable(response):
+            with lock:
+                finished.set()
+                # Close responses that completed while this one was being checked
+                while not results.empty():
+                    _, other, _ = results.get_nowait()
+                    if other is not None:
+                        other.close()
+            return url, response
+
+        if response is not None:
+            errors.append(f"{url}: HTTP {response.status_code}")
+            response.close()
+        else:
+            errors.append(f"{url}: {error}")
+        logger.debug(f"Race candidate failed: {errors[-1]}")
+
+        if started < len(urls):
+            start_next()
+        elif pending == 0:
+            raise requests.RequestException("All download URLs failed: " + "; ".join(errors))
@@ -14,6 +14,8 @@ class SpeedTestResult:
     city: str
     speed: float  # MB/s
     latency: float  # ms
+    prefix: str | None = None  # Source prefix containing the IP, once attributed
+    source: str | None = None  # Source(s) listing that prefix, comma-separated
 
 
 @dataclass
@@ -0,0 +1,233 @@
+"""Packed binary storage for IP prefix lists with memory-mapped loading."""
+
+import ipaddress
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections.abc import Iterable, Iterator
+from itertools import repeat
+from pathlib import Path
+
+from .exceptions import IPSourceError
+from .ipset import IPIntervalSet
+from .sampling import int_to_ip
+
+# File layout (little-endian header):
+#   magic "CBIP", format version, reserved, IPv4 count, IPv6 count
+#   IPv4 networks     uint32 little-endian   x IPv4 count
+#   IPv6 networks     16 bytes big-endian    x IPv6 count
+#   IPv4 prefix lens  uint8                  x IPv4 count
+#   IPv6 prefix lens  uint8                  x IPv6 count
+# Supported IP list cache formats
+CACHE_FORMATS = ("text", "packed")
+
+PACKED_MAGIC = b"CBIP"
+PACKED_VERSION = 1
+_HEADER = struct.Struct("<4sHHII")
+
+
+def write_packed(path: str | Path, prefixes: Iterable[str]) -> int:
+    """
+    Write IP addresses and CIDR prefixes to a packed cache file.
+
+    Entries that are not valid addresses or networks are skipped. The file is
+    written to a temporary name first and renamed into place.
+
+    Args:
+        path: Destination file
+        prefixes: IP addresses or CIDR prefixes
+
+    Returns:
+        Number of prefixes written
+
+    Raises:
+        OSError: If the file cannot be written
+    """
+    v4_networks = array("I")
+    v4_lengths = bytearray()
+    v6_networks = bytearray()
+    v6_lengths = bytearray()
+
+    for prefix in prefixes:
+        try:
+            network = ipaddress.ip_network(prefix.strip(), strict=False)
+        except ValueError:
+            continue
+        if network.version == 4:
+            v4_networks.append(int(network.network_address))
+            v4_lengths.append(network.prefixlen)
+        else:
+            v6_networks += network.network_address.packed
+            v6_lengths.append(network.prefixlen)
+
+    if sys.byteorder == "big":
+        v4_networks.byteswap()
+
+    path = Path(path)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(
+                _HEADER.pack(PACKED_MAGIC, PACKED_VERSION, 0, len(v4_lengths), len(v6_lengths))
+            )
+            f.write(v4_networks.tobytes())
+            f.write(v6_networks)
+            f.write(v4_lengths)
+            f.write(v6_lengths)
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+    return len(v4_lengths) + len(v6_lengths)
+
+
+def is_packed(path: str | Path) -> bool:
+    """Check if a file starts with the packed cache magic."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(PACKED_MAGIC)) == PACKED_MAGIC
+    except OSError:
+        return False
+
+
+class PackedPrefixList:
+    """
+    Read-only, memory-mapped view of a packed prefix list.
+
+    Counts come straight from the header and the network and prefix length
+    arrays are exposed as memoryviews over the mapping, so nothing is parsed
+    until it is iterated.
+    """
+
+    def __init__(self, path: str | Path):
+        """
+        Open a packed cache file.
+
+        Args:
+            path: Packed cache file
+
+        Raises:
+            IPSourceError: If the file cannot be read or is not a valid packed cache
+        """
+        self.path = Path(path)
+        self._views: list[memoryview] = []
+        try:
+            with open(self.path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise IPSourceError(f"Failed to open packed IP cache {self.path}: {e}") from e
+
+        try:
+            self._parse_header()
+        except IPSourceError:
+            self.close()
+            raise
+
+    def _parse_header(self) -> None:
+        """Validate the header and create views over the data sections."""
+        if len(self._mmap) < _HEADER.size:
+            raise IPSourceError(f"Invalid packed IP cache {self.path}: file too short")
+
+        magic, version, _, v4_count, v6_count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != PACKED_MAGIC:
+            raise IPSourceError(f"Invalid packed IP cache {self.path}: bad magic")
+        if version != PACKED_VERSION:
+            raise IPSourceError(
+                f"Unsupported packed IP cache version {version} in {self.path}"
+            )
+
+        expected_size = _HEADER.size + v4_count * 5 + v6_count * 17
+        if len(self._mmap) != expected_size:
+            raise IPSourceError(f"Invalid packed IP cache {self.path}: truncated data")
+
+        self.v4_count = v4_count
+        self.v6_count = v6_count
+
+        data = self._view(memoryview(self._mmap))
+        offset = _HEADER.size
+        v4_bytes = data[offset : offset + v4_count * 4]
+        offset += v4_count * 4
+        self.v6_networks = self._view(data[offset : offset + v6_count * 16])
+        offset += v6_count * 16
+        self.v4_prefix_lengths = self._view(data[offset : offset + v4_count])
+        offset += v4_count
+        self.v6_prefix_lengths = self._view(data[offset : offset + v6_count])
+
+        if sys.byteorder == "little":
+            self.v4_networks = self._view(self._view(v4_bytes).cast("I"))
+        else:
+            # Big-endian hosts need a byte-swapped copy
+            swapped = array("I", v4_bytes.tobytes())
+            swapped.byteswap()
+            self.v4_networks = memoryview(swapped)
+
+    def _view(self, view: memoryview) -> memoryview:
+        """Track a memoryview so it can be released before the mapping is closed."""
+        self._views.append(view)
+        return view
+
+    def __len__(self) -> int:
+        return self.v4_count + self.v6_count
+
+    def __iter__(self) -> Iterator[str]:
+        for version, network, prefix_length in self.iter_prefixes():
+            address = int_to_ip(version, network)
+            if prefix_length == (32 if version == 4 else 128):
+                yield address
+            else:
+                yield f"{address}/{prefix_length}"
+
+    def __enter__(self) -> "PackedPrefixList":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the views and unmap the file."""
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        if not self._mmap.closed:
+            self._mmap.close()
+
+    def iter_prefixes(self) -> Iterator[tuple[int, int, int]]:
+        """
+        Iterate stored prefixes without formatting them.
+
+        Yields:
+            (ip_version, network_address, prefix_length) tuples, IPv4 first
+        """
+        yield from zip(repeat(4), self.v4_networks, self.v4_prefix_lengths)
+        for index in range(self.v6_count):
+            network = int.from_bytes(self.v6_networks[index * 16 : index * 16 + 16], "big")
+            yield 6, network, self.v6_prefix_lengths[index]
+
+    def num_addresses(self) -> int:
+        """Get the total number of addresses covered, counting overlaps repeatedly."""
+        total = 0
+        for bits, lengths in ((32, self.v4_prefix_lengths), (128, self.v6_prefix_lengths)):
+            histogram = lengths.tobytes()
+            for prefix_length in range(bits + 1):
+                count = histogram.count(prefix_length)
+                if count:
+                    total += count << (bits - prefix_length)
+        return total
+
+    def to_interval_set(self) -> IPIntervalSet:
+        """Build an interval set directly from the packed integers."""
+        return IPIntervalSet(
+            (version, network, network + (1 << ((32 if version == 4 else 128) - length)) - 1)
+            for version, network, length in self.iter_prefixes()
+        )
+
+    def to_list(self) -> list[str]:
+        """Format all stored prefixes as strings."""
+        return list(self)
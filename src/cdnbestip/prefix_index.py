@@ -0,0 +1,143 @@
+"""Sorted-interval index mapping addresses back to the source prefixes that contain them."""
+
+import ipaddress
+from bisect import bisect_right
+from collections.abc import Iterable
+
+from .sampling import parse_prefix
+
+
+class PrefixIndex:
+    """
+    Longest-prefix-match index over a list of CIDR prefixes.
+
+    Nested prefixes are flattened into disjoint intervals labelled with their most
+    specific prefix, so a lookup is one binary search and a batch of lookups is a
+    single merge walk over the sorted addresses.
+    """
+
+    def __init__(self, prefix_sources: dict[str, list[str]] | Iterable[str]):
+        """
+        Build the index.
+
+        Args:
+            prefix_sources: Mapping of prefix to the sources that list it, or plain prefixes
+        """
+        if not isinstance(prefix_sources, dict):
+            prefix_sources = {prefix: [] for prefix in prefix_sources}
+
+        self._sources: dict[str, list[str]] = {}
+        items: dict[int, list[tuple[int, int, str]]] = {4: [], 6: []}
+        for prefix, sources in prefix_sources.items():
+            try:
+                version, first, last = parse_prefix(prefix)
+            except ValueError:
+                continue
+            label = str(ipaddress.ip_network(prefix.strip(), strict=False))
+            if label not in self._sources:
+                items[version].append((first, last, label))
+                self._sources[label] = []
+            self._sources[label].extend(s for s in sources if s not in self._sources[label])
+
+        self._starts: dict[int, list[int]] = {}
+        self._segments: dict[int, list[tuple[int, int, str]]] = {}
+        for version, version_items in items.items():
+            segments = self._flatten(sorted(version_items, key=lambda item: (item[0], -item[1])))
+            self._segments[version] = segments
+            self._starts[version] = [first for first, _, _ in segments]
+
+    @staticmethod
+    def _flatten(items: list[tuple[int, int, str]]) -> list[tuple[int, int, str]]:
+        """
+        Flatten nested or disjoint CIDR ranges sorted by (first, -last) into disjoint segments.
+
+        CIDR ranges never partially overlap, so a stack of open containers is enough.
+        """
+        segments = []
+        stack: list[tuple[int, str]] = []
+        position = 0
+
+        for first, last, label in items:
+            # Close containers that end before this range, emitting their tails
+            while stack and stack[-1][0] < first:
+                top_last, top_label = stack.pop()
+                if position <= top_last:
+                    segments.append((position, top_last, top_label))
+                position = max(position, top_last + 1)
+
+            # Part of the enclosing container before this nested range
+            if stack and position < first:
+                segments.append((position, first - 1, stack[-1][1]))
+            stack.append((last, label))
+            position = first
+
+        while stack:
+            top_last, top_label = stack.pop()
+            if position <= top_last:
+                segments.append((position, top_last, top_label))
+            position = max(position, top_last + 1)
+
+        return segments
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def sources(self, prefix: str) -> list[str]:
+        """Get the sources that list a prefix of the index."""
+        return list(self._sources.get(prefix, []))
+
+    def lookup(self, ip: str) -> str | None:
+        """
+        Find the most specific indexed prefix containing an address.
+
+        Args:
+            ip: IP address
+
+        Returns:
+            Prefix in canonical CIDR form, or None if no prefix contains the address
+        """
+        try:
+            address = ipaddress.ip_address(ip.strip())
+        except ValueError:
+            return None
+
+        value = int(address)
+        index = bisect_right(self._starts[address.version], value) - 1
+        if index < 0:
+            return None
+        _, last, label = self._segments[address.version][index]
+        return label if value <= last else None
+
+    def lookup_many(self, ips: Iterable[str]) -> list[str | None]:
+        """
+        Find the containing prefix of many addresses in one pass.
+
+        Args:
+            ips: IP addresses
+
+        Returns:
+            Prefix (or None) for each address, in input order
+        """
+        queries: dict[int, list[tuple[int, int]]] = {4: [], 6: []}
+        results: list[str | None] = []
+        for position, ip in enumerate(ips):
+            results.append(None)
+            try:
+                address = ipaddress.ip_address(ip.strip())
+            except ValueError:
+                continue
+            queries[address.version].append((int(address), position))
+
+        for version, version_queries in queries.items():
+            segments = self._segments[version]
+            index = 0
+            for value, position in sorted(version_queries):
+                while index < len(segments) and segments[index][1] < value:
+                    index += 1
+                if index == len(segments):
+                    break
+                first, _, label = segments[index]
+                if first <= value:
+                    results[position] = label
+
+        return results
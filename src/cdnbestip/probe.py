@@ -0,0 +1,231 @@
+"""Built-in latency engine: concurrent TCP connects with asyncio."""
+
+import asyncio
+import math
+import os
+import tempfile
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+from .concurrency import gather_bounded
+from .exceptions import SpeedTestError
+from .logging_config import get_logger
+from .models import SpeedTestResult
+from .sampling import CandidateSampler
+
+logger = get_logger(__name__)
+
+# Probe engines: the external CloudflareSpeedTest binary or the built-in TCP prober
+ENGINES = ("cfst", "tcp")
+
+# Defaults of the TCP prober (cfst uses 200 threads and 4 pings per address)
+DEFAULT_PROBE_CONCURRENCY = 1000
+DEFAULT_PROBE_COUNT = 4
+DEFAULT_CONNECT_TIMEOUT = 1.0
+DEFAULT_PROBE_PORT = 443
+
+# File descriptors left for everything else when capping concurrency
+_RESERVED_FDS = 64
+
+# Header cfst writes, so result files from both engines are read the same way
+RESULT_HEADER = "IP 地址,已发送,已接收,丢包率,平均延迟,下载速度(MB/s),地区码"
+
+
+@dataclass
+class LatencySample:
+    """Connect latency measured for one address, plus its download test if it had one."""
+
+    ip: str
+    sent: int
+    received: int
+    latency: float  # Average connect time in ms (inf when nothing answered)
+    speed: float = 0.0  # Download speed in MB/s (0 until download tested)
+    colo: str = "N/A"  # Data center reported during the download test
+
+    @property
+    def loss(self) -> float:
+        """Fraction of connects that failed or timed out."""
+        return 1 - self.received / self.sent if self.sent else 1.0
+
+    def to_result(self, port: int) -> SpeedTestResult:
+        """Convert to a speed test result."""
+        return SpeedTestResult(
+            ip=self.ip,
+            port=port,
+            data_center=self.colo,
+            region=self.colo,
+            city=self.colo,
+            speed=self.speed,
+            latency=self.latency,
+        )
+
+    def to_csv_row(self) -> str:
+        """Format as a row of a cfst result file."""
+        return (
+            f"{self.ip},{self.sent},{self.received},{self.loss:.2f},"
+            f"{self.latency:.2f},{self.speed:.2f},{self.colo}"
+        )
+
+
+def _fd_limit() -> int | None:
+    """Get the soft limit on open files (None where it cannot be read)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    return None if soft == resource.RLIM_INFINITY else soft
+
+
+class TCPProber:
+    """
+    Measures TCP connect latency to many addresses at once.
+
+    Every address is connected to several times in a row; the connects of
+    different addresses run concurrently on one event loop, bounded by a
+    semaphore instead of a fixed thread pool. Concurrency is capped below the
+    open file limit so large sweeps do not fail with EMFILE.
+    """
+
+    def __init__(
+        self,
+        port: int = DEFAULT_PROBE_PORT,
+        count: int = DEFAULT_PROBE_COUNT,
+        timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        concurrency: int = DEFAULT_PROBE_CONCURRENCY,
+    ):
+        """
+        Initialize prober.
+
+        Args:
+            port: TCP port to connect to
+            count: Connects per address
+            timeout: Seconds before a connect counts as lost
+            concurrency: Maximum addresses probed at the same time
+        """
+        if count <= 0:
+            raise SpeedTestError("Probe count must be greater than 0")
+        if concurrency <= 0:
+            raise SpeedTestError("Probe concurrency must be greater than 0")
+
+        fd_limit = _fd_limit()
+        if fd_limit is not None and concurrency > fd_limit - _RESERVED_FDS:
+            capped = max(1, fd_limit - _RESERVED_FDS)
+            logger.warning(
+                f"Probe concurrency {concurrency} exceeds the open file limit ({fd_limit}), "
+                f"using {capped}"
+            )
+            concurrency = capped
+
+        self.port = port
+        self.count = count
+        self.timeout = timeout
+        self.concurrency = concurrency
+
+    async def _connect_time(self, ip: str) -> float | None:
+        """Time one TCP connect in ms (None if it failed or timed out)."""
+        start = time.perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(ip, self.port), timeout=self.timeout
+            )
+        except (OSError, asyncio.TimeoutError):
+            return None
+        elapsed = (time.perf_counter() - start) * 1000
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return elapsed
+
+    async def _probe_address(self, ip: str) -> LatencySample:
+        """Connect to one address several times."""
+        times = []
+        for _ in range(self.count):
+            elapsed = await self._connect_time(ip)
+            if elapsed is not None:
+                times.append(elapsed)
+        latency = sum(times) / len(times) if times else math.inf
+        return LatencySample(ip=ip, sent=self.count, received=len(times), latency=latency)
+
+    async def probe_all(self, addresses: Iterable[str]) -> list[LatencySample]:
+        """
+        Probe addresses concurrently.
+
+        At most ``concurrency`` probes are in flight and only their tasks are kept;
+        the returned samples still grow with the number of addresses.
+
+        Args:
+            addresses: IP addresses to probe
+
+        Returns:
+            One sample per address, in input order
+        """
+        return await gather_bounded(self._probe_address, addresses, self.concurrency)
+
+    def probe(self, addresses: Iterable[str]) -> list[LatencySample]:
+        """
+        Probe addresses and keep those that answered, best first.
+
+        Args:
+            addresses: IP addresses to probe
+
+        Returns:
+            Samples of responding addresses, ordered like cfst orders them:
+            by loss, then by latency
+        """
+        samples = asyncio.run(self.probe_all(addresses))
+        responding = [sample for sample in samples if sample.received]
+        responding.sort(key=lambda sample: (sample.loss, sample.latency))
+        return responding
+
+
+def expand_candidates(entries: Iterable[str], seed: int | None = None) -> list[str]:
+    """
+    Turn candidate file entries into addresses the way cfst does.
+
+    Single addresses are kept; prefixes contribute one random address per /24
+    (per sampling block for IPv6).
+
+    Args:
+        entries: IP addresses and CIDR prefixes
+        seed: Random seed for reproducible address selection
+
+    Returns:
+        Addresses to probe
+    """
+    return CandidateSampler(1, mode="random", seed=seed).sample(entries)
+
+
+def write_results(samples: Iterable[LatencySample], output_file: str | Path) -> int:
+    """
+    Write samples as a cfst result file.
+
+    Args:
+        samples: Samples to write, in order
+        output_file: Result file (replaced atomically)
+
+    Returns:
+        Number of rows written
+
+    Raises:
+        SpeedTestError: If the file cannot be written
+    """
+    rows = [sample.to_csv_row() for sample in samples]
+    output_path = Path(output_file)
+    temp_path = None
+    try:
+        fd, temp_path = tempfile.mkstemp(
+            dir=output_path.parent, prefix=f".{output_path.name}.", suffix=".tmp"
+        )
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write("\n".join([RESULT_HEADER, *rows]) + "\n")
+        os.replace(temp_path, output_path)
+    except OSError as e:
+        if temp_path:
+            Path(temp_path).unlink(missing_ok=True)
+        raise SpeedTestError(f"Failed to write results to {output_file}: {e}") from e
+    return len(rows)
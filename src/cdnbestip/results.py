@@ -33,6 +33,32 @@ class ResultsHandler:
             return results
         return [result for result in results if result.speed >= threshold]
 
+    def aggregate_by_prefix(self, results: list[SpeedTestResult]) -> dict[str, dict]:
+        """
+        Aggregate attributed results per source prefix.
+
+        Args:
+            results: Speed test results with their prefix attributed
+
+        Returns:
+            Mapping of prefix to count, best_speed, avg_latency and colos;
+            results without a prefix are skipped
+        """
+        groups: dict[str, list[SpeedTestResult]] = {}
+        for result in results:
+            if result.prefix:
+                groups.setdefault(result.prefix, []).append(result)
+
+        return {
+            prefix: {
+                "count": len(group),
+                "best_speed": max(result.speed for result in group),
+                "avg_latency": sum(result.latency for result in group) / len(group),
+                "colos": sorted({result.data_center for result in group if result.data_center}),
+            }
+            for prefix, group in groups.items()
+        }
+
     def filter_by_latency(
         self, results: list[SpeedTestResult], max_latency: float
     ) -> list[SpeedTestResult]:
@@ -0,0 +1,233 @@
+"""Candidate sampling for expanding IP prefixes into individual test addresses."""
+
+import ipaddress
+import random
+import socket
+from collections.abc import Iterable, Iterator
+
+from .exceptions import IPSourceError
+
+# Supported sampling strategies
+SAMPLE_MODES = ("uniform", "random", "first+random")
+
+# Default sampling block size (one block = one /24 for IPv4, one /48 for IPv6)
+DEFAULT_BLOCK_PREFIX_V4 = 24
+DEFAULT_BLOCK_PREFIX_V6 = 48
+
+# Default limit on sampled IPv6 blocks per prefix (a /32 alone holds 65536 /48s)
+DEFAULT_MAX_BLOCKS_V6 = 256
+
+_ADDRESS_BITS = {4: 32, 6: 128}
+
+
+def parse_prefix(prefix: str) -> tuple[int, int, int]:
+    """
+    Parse an IP address or CIDR prefix into an integer range.
+
+    Args:
+        prefix: IP address or CIDR prefix (e.g., 104.16.0.0/13)
+
+    Returns:
+        Tuple of (ip_version, first_address, last_address)
+
+    Raises:
+        ValueError: If the prefix is not a valid address or network
+    """
+    network = ipaddress.ip_network(prefix.strip(), strict=False)
+    first = int(network.network_address)
+    return network.version, first, first + network.num_addresses - 1
+
+
+def prefixes_to_ranges(prefixes: Iterable[str]) -> list[tuple[int, int, int]]:
+    """
+    Convert prefixes into integer ranges, skipping entries that are not valid networks.
+
+    Args:
+        prefixes: IP addresses or CIDR prefixes
+
+    Returns:
+        List of (ip_version, first_address, last_address) tuples
+    """
+    ranges = []
+    for prefix in prefixes:
+        try:
+            ranges.append(parse_prefix(prefix))
+        except ValueError:
+            continue
+    return ranges
+
+
+def int_to_ip(version: int, value: int) -> str:
+    """Format an integer address as an IP address string."""
+    if version == 4:
+        return socket.inet_ntoa(value.to_bytes(4, "big"))
+    return str(ipaddress.IPv6Address(value))
+
+
+def pick_distinct(rng: random.Random, low: int, high: int, count: int) -> list[int]:
+    """Pick distinct random integers from an inclusive range of any size."""
+    if high - low + 1 <= 1 << 32:
+        return rng.sample(range(low, high + 1), count)
+
+    # IPv6 ranges exceed what random.sample accepts; collisions are negligible
+    picked: set[int] = set()
+    while len(picked) < count:
+        picked.add(rng.randint(low, high))
+    return list(picked)
+
+
+class CandidateSampler:
+    """Expands prefixes into a bounded number of test addresses per address block."""
+
+    def __init__(
+        self,
+        per_block: int,
+        mode: str = "uniform",
+        seed: int | None = None,
+        block_prefix_v4: int = DEFAULT_BLOCK_PREFIX_V4,
+        block_prefix_v6: int = DEFAULT_BLOCK_PREFIX_V6,
+        max_blocks_v6: int | None = DEFAULT_MAX_BLOCKS_V6,
+    ):
+        """
+        Initialize candidate sampler.
+
+        Args:
+            per_block: Number of addresses to emit per block (hosts beyond the block size are capped)
+            mode: Sampling strategy: uniform, random, or first+random
+            seed: Random seed for reproducible random sampling
+            block_prefix_v4: Prefix length defining one IPv4 sampling block
+            block_prefix_v6: Prefix length defining one IPv6 sampling block
+            max_blocks_v6: Maximum IPv6 blocks sampled per prefix, spread across it (None = all)
+        """
+        if per_block <= 0:
+            raise IPSourceError("Sample count must be greater than 0")
+        if mode not in SAMPLE_MODES:
+            raise IPSourceError(
+                f"Invalid sample mode: {mode}. Must be one of {list(SAMPLE_MODES)}"
+            )
+        if not (0 <= block_prefix_v4 <= 32):
+            raise IPSourceError("IPv4 sampling block prefix must be between 0 and 32")
+        if not (0 <= block_prefix_v6 <= 128):
+            raise IPSourceError("IPv6 sampling block prefix must be between 0 and 128")
+        if max_blocks_v6 is not None and max_blocks_v6 <= 0:
+            raise IPSourceError("IPv6 block limit must be greater than 0")
+
+        self.per_block = per_block
+        self.mode = mode
+        self.rng = random.Random(seed)
+        self.block_prefix_v4 = block_prefix_v4
+        self.block_prefix_v6 = block_prefix_v6
+        self.max_blocks_v6 = max_blocks_v6
+
+    def sample(self, prefixes: Iterable[str]) -> list[str]:
+        """
+        Expand prefixes into individual test addresses.
+
+        Args:
+            prefixes: IP addresses or CIDR prefixes
+
+        Returns:
+            List of sampled IP addresses
+        """
+        candidates = []
+        for prefix in prefixes:
+            try:
+                version, first, last = parse_prefix(prefix)
+            except ValueError:
+                continue
+
+            candidates.extend(
+                int_to_ip(version, value) for value in self.sample_range(first, last, version)
+            )
+
+        return candidates
+
+    def sample_range(self, first: int, last: int, version: int = 4) -> Iterator[int]:
+        """
+        Sample addresses from an integer range block by block.
+
+        IPv6 ranges are limited to ``max_blocks_v6`` blocks, spread evenly across the
+        range (or picked at random in the random modes).
+
+        Args:
+            first: First address of the range
+            last: Last address of the range
+            version: IP version of the range
+
+        Yields:
+            Sampled integer addresses in ascending block order
+        """
+        block_prefix = self.block_prefix_v4 if version == 4 else self.block_prefix_v6
+        block_size = 1 << (_ADDRESS_BITS[version] - block_prefix)
+        span = last - first + 1
+
+        # Ranges smaller than one block are sampled as a single block
+        if span <= block_size:
+            yield from self._sample_block(first, span)
+            return
+
+        block_count = span // block_size
+        if version == 6 and self.max_blocks_v6 and block_count > self.max_blocks_v6:
+            block_indexes = self._pick_blocks(block_count, self.max_blocks_v6)
+        else:
+            block_indexes = range(block_count)
+
+        # CIDR ranges are block aligned, so every block has the same host offsets
+        # and the uniform offsets can be computed once and added to each block base.
+        if self.mode == "uniform":
+            offsets = self._uniform_offsets(block_size)
+            for index in block_indexes:
+                base = first + index * block_size
+                for offset in offsets:
+                    yield base + offset
+            return
+
+        for index in block_indexes:
+            yield from self._sample_block(first + index * block_size, block_size)
+
+    def _pick_blocks(self, block_count: int, limit: int) -> list[int]:
+        """Choose which blocks of an oversized range to sample."""
+        if self.mode == "uniform":
+            # Evenly strided across the range
+            return [(index * block_count) // limit for index in range(limit)]
+        return sorted(pick_distinct(self.rng, 0, block_count - 1, limit))
+
+    def _sample_block(self, base: int, size: int) -> list[int]:
+        """Sample addresses from a single block."""
+        if self.mode == "uniform":
+            return [base + offset for offset in self._uniform_offsets(size)]
+
+        low, high = self._host_bounds(size)
+        hosts = high - low + 1
+        if self.per_block >= hosts:
+            return [base + offset for offset in range(low, high + 1)]
+
+        if self.mode == "random":
+            offsets = pick_distinct(self.rng, low, high, self.per_block)
+        else:
+            # first+random: first usable host plus random picks from the rest
+            offsets = [low]
+            if self.per_block > 1:
+                offsets.extend(pick_distinct(self.rng, low + 1, high, self.per_block - 1))
+
+        return [base + offset for offset in sorted(offsets)]
+
+    def _uniform_offsets(self, size: int) -> list[int]:
+        """Get evenly spaced host offsets for a block of the given size."""
+        low, high = self._host_bounds(size)
+        hosts = high - low + 1
+        if self.per_block >= hosts:
+            return list(range(low, high + 1))
+
+        # Center each pick inside its equal-width slice of the host range
+        return [
+            low + ((2 * index + 1) * hosts) // (2 * self.per_block)
+            for index in range(self.per_block)
+        ]
+
+    @staticmethod
+    def _host_bounds(size: int) -> tuple[int, int]:
+        """Get usable host offsets for a block, skipping network and broadcast addresses."""
+        if size >= 4:
+            return 1, size - 2
+        return 0, size - 1
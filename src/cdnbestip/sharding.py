@@ -0,0 +1,252 @@
+"""Consistent-hash sharding of candidates across probing nodes and merging of their results."""
+
+import ipaddress
+import math
+import os
+import tempfile
+from bisect import bisect_right
+from collections.abc import Iterable
+from hashlib import blake2b
+from pathlib import Path
+
+from .exceptions import SpeedTestError
+from .sampling import DEFAULT_BLOCK_PREFIX_V4, DEFAULT_BLOCK_PREFIX_V6
+
+# Points per shard on the hash ring; more points even out the share of each shard
+DEFAULT_VIRTUAL_NODES = 256
+
+_ADDRESS_BITS = {4: 32, 6: 128}
+
+# Encodings cfst result files are written in, depending on the platform
+_RESULT_ENCODINGS = ("utf-8", "gbk", "cp1252", "latin1")
+
+
+def parse_shard(spec: str) -> tuple[int, int]:
+    """
+    Parse a shard specification.
+
+    Args:
+        spec: Shard as "i/N" with 1 <= i <= N (e.g., "2/4")
+
+    Returns:
+        Tuple of (shard index, shard count)
+
+    Raises:
+        ValueError: If the specification is malformed or out of range
+    """
+    index, separator, count = spec.strip().partition("/")
+    if not separator:
+        raise ValueError(f"Invalid shard '{spec}': expected i/N")
+    try:
+        shard_index, shard_count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}': expected i/N") from None
+    if shard_count < 1 or not 1 <= shard_index <= shard_count:
+        raise ValueError(f"Invalid shard '{spec}': index must be between 1 and {shard_count}")
+    return shard_index, shard_count
+
+
+def shard_file_name(path: str, shard_index: int, shard_count: int) -> str:
+    """Get the per-shard variant of a file name (result.csv -> result.shard-2-of-4.csv)."""
+    root, extension = os.path.splitext(path)
+    return f"{root}.shard-{shard_index}-of-{shard_count}{extension}"
+
+
+def _hash64(data: bytes) -> int:
+    """Stable 64-bit hash shared by all nodes."""
+    return int.from_bytes(blake2b(data, digest_size=8).digest(), "big")
+
+
+class ShardRing:
+    """
+    Consistent hash ring mapping keys to shards.
+
+    Every shard owns many points on the ring, so shares are even and changing the
+    shard count moves only the keys of the added or removed shards.
+    """
+
+    def __init__(self, shard_count: int, virtual_nodes: int = DEFAULT_VIRTUAL_NODES):
+        """
+        Build the ring.
+
+        Args:
+            shard_count: Number of shards
+            virtual_nodes: Ring points per shard
+        """
+        points = sorted(
+            (_hash64(f"shard:{shard}:{point}".encode()), shard)
+            for shard in range(1, shard_count + 1)
+            for point in range(virtual_nodes)
+        )
+        self.shard_count = shard_count
+        self._points = [point for point, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_of(self, key: bytes) -> int:
+        """Get the shard (1-based) owning a key."""
+        index = bisect_right(self._points, _hash64(key))
+        return self._shards[index % len(self._shards)]
+
+
+class CandidateSharder:
+    """
+    Selects the candidates of one node.
+
+    Candidates are assigned per block (/24 for IPv4, the IPv6 sampling block):
+    prefixes larger than a block are split into blocks and each block goes to the
+    shard owning it on the ring. Every node computes the same assignment, so the
+    shards are disjoint and together cover the whole candidate list.
+    """
+
+    def __init__(
+        self,
+        shard_index: int,
+        shard_count: int,
+        block_prefix_v4: int = DEFAULT_BLOCK_PREFIX_V4,
+        block_prefix_v6: int = DEFAULT_BLOCK_PREFIX_V6,
+        virtual_nodes: int = DEFAULT_VIRTUAL_NODES,
+    ):
+        """
+        Initialize sharder.
+
+        Args:
+            shard_index: Shard of this node (1-based)
+            shard_count: Number of nodes
+            block_prefix_v4: Prefix length of the IPv4 assignment unit
+            block_prefix_v6: Prefix length of the IPv6 assignment unit
+            virtual_nodes: Ring points per shard
+        """
+        self.shard_index = shard_index
+        self.ring = ShardRing(shard_count, virtual_nodes)
+        self.block_prefix = {4: block_prefix_v4, 6: block_prefix_v6}
+
+    def owns(self, version: int, block: int) -> bool:
+        """Check if the block starting at an address value belongs to this shard."""
+        key = bytes((version,)) + block.to_bytes(16, "big")
+        return self.ring.shard_of(key) == self.shard_index
+
+    def select(self, candidates: Iterable[str]) -> list[str]:
+        """
+        Keep the candidates of this shard.
+
+        Args:
+            candidates: IP addresses and CIDR prefixes
+
+        Returns:
+            Addresses and prefixes owned by this shard; prefixes larger than a block
+            are replaced by their owned blocks. Entries that are not addresses or
+            prefixes go to the first shard.
+        """
+        selected = []
+        for candidate in candidates:
+            try:
+                network = ipaddress.ip_network(candidate.strip(), strict=False)
+            except ValueError:
+                if self.shard_index == 1:
+                    selected.append(candidate)
+                continue
+
+            version = network.version
+            prefixlen = self.block_prefix[version]
+            block_size = 1 << (_ADDRESS_BITS[version] - prefixlen)
+            first = int(network.network_address)
+
+            if network.prefixlen >= prefixlen:
+                if self.owns(version, first - first % block_size):
+                    selected.append(candidate)
+                continue
+
+            address_class = ipaddress.IPv4Address if version == 4 else ipaddress.IPv6Address
+            for block in range(first, first + network.num_addresses, block_size):
+                if self.owns(version, block):
+                    selected.append(f"{address_class(block)}/{prefixlen}")
+        return selected
+
+
+def _read_result_lines(path: str | Path) -> list[str]:
+    """Read a result file, trying the encodings cfst may have written it in."""
+    for encoding in _RESULT_ENCODINGS:
+        try:
+            with open(path, encoding=encoding) as f:
+                return f.read().splitlines()
+        except UnicodeDecodeError:
+            continue
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        return f.read().splitlines()
+
+
+def _parse_number(value: str, default: float) -> float:
+    """Parse a numeric result column ("N/A" and blanks give the default)."""
+    value = value.strip().replace(",", ".")
+    if not value or value == "N/A":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+def merge_result_files(paths: Iterable[str | Path], output_file: str | Path) -> int:
+    """
+    Merge per-shard cfst result files into one result file.
+
+    Rows are de-duplicated by IP (keeping the better row) and ordered by download
+    speed, then like cfst orders latency results: by packet loss, then by latency.
+    The header of the first file is kept and the output is written to a temporary
+    file and renamed.
+
+    Args:
+        paths: Result files of the shards
+        output_file: Merged result file
+
+    Returns:
+        Number of rows written
+
+    Raises:
+        SpeedTestError: If a file cannot be read or no results are found
+    """
+    header = None
+    best: dict[str, tuple[tuple[float, float, float], str]] = {}
+
+    for path in paths:
+        try:
+            lines = _read_result_lines(path)
+        except OSError as e:
+            raise SpeedTestError(f"Failed to read results file {path}: {e}") from e
+        if not lines:
+            continue
+
+        header = header or lines[0]
+        for line in lines[1:]:
+            row = line.strip()
+            parts = row.split(",")
+            if len(parts) < 7:
+                continue
+            ip = parts[0].strip()
+            key = (
+                -_parse_number(parts[5], 0.0),
+                _parse_number(parts[3], math.inf),
+                _parse_number(parts[4], math.inf),
+            )
+            if ip not in best or key < best[ip][0]:
+                best[ip] = (key, row)
+
+    if not best:
+        raise SpeedTestError("No valid results found in the shard result files")
+
+    rows = [row for _, row in sorted(best.values(), key=lambda item: item[0])]
+    output_path = Path(output_file)
+    temp_path = None
+    try:
+        fd, temp_path = tempfile.mkstemp(
+            dir=output_path.parent, prefix=f".{output_path.name}.", suffix=".tmp"
+        )
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write("\n".join([header, *rows]) + "\n")
+        os.replace(temp_path, output_path)
+    except OSError as e:
+        if temp_path:
+            Path(temp_path).unlink(missing_ok=True)
+        raise SpeedTestError(f"Failed to write merged results to {output_file}: {e}") from e
+
+    return len(rows)
@@ -0,0 +1,315 @@
+"""Registry of named IP data sources, extensible through plugins that load on first use."""
+
+import importlib.metadata
+import importlib.util
+import json
+import re
+import threading
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any
+
+from .exceptions import IPSourceError
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Entry point group third-party packages register providers under
+ENTRY_POINT_GROUP = "cdnbestip.sources"
+
+# Source types understood by the generic download path
+SOURCE_TYPES = ("text", "json")
+
+# Parser a provider can supply instead of the generic text/JSON path: it receives
+# the decoded response body chunks and returns the published addresses/prefixes
+SourceParser = Callable[[Iterable[bytes]], list[str]]
+
+# Start of a source that can follow a comma inside a URL: another URL or an explicit path
+_SOURCE_START = re.compile(r"^(?:[A-Za-z][A-Za-z0-9+.-]*://|/|~|\.{1,2}/)")
+
+# Built-in sources with their default test endpoints
+BUILTIN_SOURCES: dict[str, dict[str, Any]] = {
+    "cf": {
+        "name": "CloudFlare",
+        "url": "https://www.cloudflare.com/ips-v4",
+        "type": "text",
+        "description": "CloudFlare IPv4 ranges",
+        "cache_ttl_hours": 168,  # Published ranges change rarely
+        "default_test_url": "",  # CloudFlare default test endpoint
+    },
+    "gc": {
+        "name": "GCore",
+        "url": "https://api.gcore.com/cdn/public-ip-list",
+        "type": "json",
+        "json_path": "addresses",
+        "description": "GCore CDN IP addresses",
+        "cache_ttl_hours": 24,
+        "default_test_url": "https://hk2-speedtest.tools.gcore.com/speedtest-backend/garbage.php?ckSize=100",  # GCore default test endpoint
+    },
+    "ct": {
+        "name": "CloudFront",
+        "url": "https://d7uri8nf7uskq.cloudfront.net/tools/list-cloudfront-ips",
+        "type": "json",
+        "json_path": "CLOUDFRONT_GLOBAL_IP_LIST",
+        "description": "AWS CloudFront IP ranges",
+        "cache_ttl_hours": 24,
+        "requires_custom_url": True,  # Requires -u parameter
+    },
+    "aws": {
+        "name": "Amazon Web Services",
+        "url": "https://ip-ranges.amazonaws.com/ip-ranges.json",
+        "type": "json",
+        "json_path": "prefixes",
+        "json_field": "ip_prefix",
+        "description": "AWS IP ranges",
+        "cache_ttl_hours": 12,  # ip-ranges.json is republished several times a day
+        "requires_custom_url": True,  # Requires -u parameter
+    },
+    "cf6": {
+        "name": "CloudFlare IPv6",
+        "url": "https://www.cloudflare.com/ips-v6",
+        "type": "text",
+        "description": "CloudFlare IPv6 ranges",
+        "cache_ttl_hours": 168,
+        "default_test_url": "",  # CloudFlare default test endpoint
+    },
+    "gc6": {
+        "name": "GCore IPv6",
+        "url": "https://api.gcore.com/cdn/public-ip-list",
+        "type": "json",
+        "json_path": "addresses_v6",
+        "description": "GCore CDN IPv6 ranges",
+        "cache_ttl_hours": 24,
+        "default_test_url": "https://hk2-speedtest.tools.gcore.com/speedtest-backend/garbage.php?ckSize=100",
+    },
+    "aws6": {
+        "name": "Amazon Web Services IPv6",
+        "url": "https://ip-ranges.amazonaws.com/ip-ranges.json",
+        "type": "json",
+        "json_path": "ipv6_prefixes",
+        "json_field": "ipv6_prefix",
+        "description": "AWS IPv6 ranges",
+        "cache_ttl_hours": 12,
+        "requires_custom_url": True,  # Requires -u parameter
+    },
+}
+
+
+def get_plugin_dir() -> Path:
+    """Get the directory scanned for source definitions (<name>.json or <name>.py)."""
+    return Path.home() / ".cdnbestip" / "sources"
+
+
+def validate_source_definition(name: str, definition: Any) -> dict[str, Any]:
+    """
+    Check a provider's source definition.
+
+    Args:
+        name: Source name the definition was registered under
+        definition: Definition dict; "url" is required, and "type" (text or json,
+            with "json_path" for json) unless a "parser" callable is given
+
+    Returns:
+        Copy of the definition with its name filled in
+
+    Raises:
+        IPSourceError: If the definition is incomplete
+    """
+    if not isinstance(definition, dict):
+        raise IPSourceError(f"Source '{name}' must be defined by a dict", source=name)
+
+    definition = dict(definition)
+    definition.setdefault("name", name)
+    if not isinstance(definition.get("url"), str) or not definition["url"]:
+        raise IPSourceError(f"Source '{name}' has no URL", source=name)
+
+    parser = definition.get("parser")
+    if parser is not None:
+        if not callable(parser):
+            raise IPSourceError(f"Parser of source '{name}' is not callable", source=name)
+        definition.setdefault("type", "custom")
+    elif definition.get("type") not in SOURCE_TYPES:
+        raise IPSourceError(
+            f"Source '{name}' has invalid type {definition.get('type')!r}. "
+            f"Must be one of {list(SOURCE_TYPES)} or provide a parser",
+            source=name,
+        )
+    elif definition["type"] == "json" and not definition.get("json_path"):
+        raise IPSourceError(f"JSON source '{name}' has no json_path", source=name)
+
+    return definition
+
+
+class SourceRegistry:
+    """
+    Named IP data sources: built-ins plus providers found at runtime.
+
+    Providers are discovered by name only, from the ``cdnbestip.sources`` entry
+    point group and from ``<name>.json``/``<name>.py`` files in the plugin
+    directory. A provider's module is imported the first time its source is
+    requested, so unused plugins cost nothing. Built-in names cannot be shadowed.
+    """
+
+    def __init__(
+        self,
+        builtin: dict[str, dict[str, Any]] | None = None,
+        plugin_dir: str | Path | None = None,
+        use_entry_points: bool = True,
+    ):
+        """
+        Initialize registry.
+
+        Args:
+            builtin: Built-in source definitions (defaults to BUILTIN_SOURCES)
+            plugin_dir: Directory of source definition files (defaults to ~/.cdnbestip/sources)
+            use_entry_points: Discover providers registered by installed packages
+        """
+        self._builtin = BUILTIN_SOURCES if builtin is None else builtin
+        self.plugin_dir = Path(plugin_dir) if plugin_dir is not None else get_plugin_dir()
+        self.use_entry_points = use_entry_points
+        self._providers: dict[str, Callable[[], Any]] | None = None
+        self._loaded: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _discover(self) -> dict[str, Callable[[], Any]]:
+        """Find provider names and their loaders without importing anything."""
+        with self._lock:
+            if self._providers is not None:
+                return self._providers
+
+            providers: dict[str, Callable[[], Any]] = {}
+            if self.use_entry_points:
+                for entry_point in importlib.metadata.entry_points(group=ENTRY_POINT_GROUP):
+                    providers.setdefault(entry_point.name.lower(), entry_point.load)
+
+            if self.plugin_dir.is_dir():
+                for path in sorted(self.plugin_dir.iterdir()):
+                    if path.suffix in (".json", ".py") and not path.name.startswith(("_", ".")):
+                        providers.setdefault(path.stem.lower(), lambda path=path: _load_file(path))
+
+            for name in [name for name in providers if name in self._builtin]:
+                logger.warning(f"Ignoring IP source plugin '{name}': it shadows a built-in source")
+                del providers[name]
+
+            self._providers = providers
+            return providers
+
+    def __contains__(self, name: object) -> bool:
+        if not isinstance(name, str):
+            return False
+        return name in self._builtin or name in self._discover()
+
+    def names(self) -> list[str]:
+        """Get all source names, built-ins first."""
+        return list(self._builtin) + sorted(self._discover())
+
+    def is_builtin(self, name: str) -> bool:
+        """Check if a source name is one of the built-in sources."""
+        return name in self._builtin
+
+    def get(self, name: str) -> dict[str, Any]:
+        """
+        Get a source definition, loading its provider on first use.
+
+        Args:
+            name: Source name
+
+        Returns:
+            Source definition (shared; copy before modifying)
+
+        Raises:
+            IPSourceError: If the source is unknown or its provider cannot be loaded
+        """
+        if name in self._builtin:
+            return self._builtin[name]
+        if name in self._loaded:
+            return self._loaded[name]
+
+        loader = self._discover().get(name)
+        if loader is None:
+            raise IPSourceError(f"Unknown IP source: {name}")
+
+        try:
+            definition = loader()
+            # Providers may export a factory instead of the definition itself
+            if callable(definition):
+                definition = definition()
+        except IPSourceError:
+            raise
+        except Exception as e:
+            raise IPSourceError(
+                f"Failed to load IP source plugin '{name}': {e}", source=name
+            ) from e
+
+        definition = validate_source_definition(name, definition)
+        with self._lock:
+            self._loaded[name] = definition
+        logger.debug(f"Loaded IP source plugin '{name}'")
+        return definition
+
+
+def split_source_spec(spec: str, registry: SourceRegistry | None = None) -> list[str]:
+    """
+    Split a comma-separated source specification into its sources.
+
+    After a URL, a comma only separates sources when the text after it is a source
+    name, another URL or a path starting with /, ~, ./ or ../, so commas inside a URL
+    (e.g., in its query string) are kept. After names and file paths every comma
+    separates sources.
+
+    Args:
+        spec: Source names, URLs and/or file paths separated by commas
+        registry: Registry resolving source names (defaults to the shared registry)
+
+    Returns:
+        Sources in the given order, stripped, with empty entries dropped
+    """
+    registry = registry or get_source_registry()
+    sources: list[str] = []
+    for part in spec.split(","):
+        stripped = part.strip()
+        in_url = bool(sources) and "://" in sources[-1]
+        starts_source = stripped.lower() in registry or _SOURCE_START.match(stripped)
+        if in_url and stripped and not starts_source:
+            sources[-1] += f",{part}"
+        else:
+            sources.append(part)
+    return [source.strip() for source in sources if source.strip()]
+
+
+def _load_file(path: Path) -> dict[str, Any]:
+    """
+    Load a source definition file.
+
+    A ``.json`` file holds the definition itself. A ``.py`` file defines ``SOURCE``
+    (the definition) and may define ``parse(chunks)`` as its parser.
+    """
+    if path.suffix == ".json":
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    spec = importlib.util.spec_from_file_location(f"cdnbestip_source_{path.stem}", path)
+    if spec is None or spec.loader is None:
+        raise IPSourceError(f"Cannot import IP source plugin {path}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    definition = getattr(module, "SOURCE", None)
+    if not isinstance(definition, dict):
+        raise IPSourceError(f"IP source plugin {path} does not define a SOURCE dict")
+    definition = dict(definition)
+    if callable(getattr(module, "parse", None)):
+        definition.setdefault("parser", module.parse)
+    return definition
+
+
+_registry: SourceRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_source_registry() -> SourceRegistry:
+    """Get the process-wide source registry, creating it on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SourceRegistry()
+        return _registry
@@ -7,15 +7,32 @@ import shutil
 import subprocess
 import tarfile
 import tempfile
+import threading
+import time
 import zipfile
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import requests
 
+from .cfst_runner import CfstProgress, run_cfst
 from .config import Config, is_china_network
+from .download import DEFAULT_DOWNLOAD_URL, DownloadMeasurement, DownloadTester
 from .exceptions import BinaryError, SpeedTestError
+from .http_session import get_shared_session
 from .logging_config import get_logger, log_function_call, log_performance
+from .local_source import read_local_list
 from .models import SpeedTestResult
+from .probe import (
+    DEFAULT_PROBE_PORT,
+    LatencySample,
+    TCPProber,
+    expand_candidates,
+    write_results,
+)
+from .sampling import DEFAULT_BLOCK_PREFIX_V6
+from .sharding import CandidateSharder, merge_result_files, shard_file_name
 
 logger = get_logger(__name__)
 
@@ -26,13 +43,29 @@ class SpeedTestManager:
     BINARY_NAMES = ["CloudflareSpeedTest", "CloudflareST", "cfst"]
     GITHUB_REPO = "XIU2/CloudflareSpeedTest"
     BINARY_VERSION = "v2.3.4"  # Current stable version
+    PROGRESS_LOG_INTERVAL = 10.0  # Seconds between progress log lines
 
-    def __init__(self, config: Config):
-        """Initialize speed test manager with configuration."""
+    def __init__(self, config: Config, session: requests.Session | None = None):
+        """
+        Initialize speed test manager with configuration.
+
+        Args:
+            config: Configuration
+            session: HTTP session to use (defaults to the shared pooled session)
+        """
         self.config = config
+        self._session = session
         self.binary_path: str | None = None
         self.binary_dir = Path.home() / ".cdnbestip" / "bin"
         self.binary_dir.mkdir(parents=True, exist_ok=True)
+        # Called with each cfst progress event, e.g. to draw a status line
+        self.progress_callback: Callable[[CfstProgress], None] | None = None
+        self._progress_logged = 0.0
+
+    @property
+    def session(self) -> requests.Session:
+        """HTTP session used for downloads."""
+        return self._session or get_shared_session(self.config)
 
     @log_function_call
     @log_performance("Binary Availability Check")
@@ -124,15 +157,8 @@ class SpeedTestManager:
             if use_cdn:
                 api_url = self.config.cdn_url + api_url
 
-            # Prepare request parameters
-            request_kwargs = {"timeout": 30}
-
-            # Add proxy configuration if available
-            if hasattr(self.config, "proxy_url") and self.config.proxy_url:
-                proxies = self._get_proxy_config(self.config.proxy_url)
-                request_kwargs["proxies"] = proxies
-
-            response = requests.get(api_url, **request_kwargs)
+            # Proxy settings come from the session
+            response = self.session.get(api_url, timeout=30)
             response.raise_for_status()
 
             release_data = response.json()
@@ -167,16 +193,8 @@ class SpeedTestManager:
                     archive_path = temp_path / "binary.tar.gz"
                     is_zip = False
 
-                # Prepare request parameters
-                request_kwargs = {"timeout": 300, "stream": True}
-
-                # Add proxy configuration if available
-                if hasattr(self.config, "proxy_url") and self.config.proxy_url:
-                    proxies = self._get_proxy_config(self.config.proxy_url)
-                    request_kwargs["proxies"] = proxies
-
                 # Download archive
-                response = requests.get(download_url, **request_kwargs)
+                response = self.session.get(download_url, timeout=300, stream=True)
                 response.raise_for_status()
 
                 with open(archive_path, "wb") as f:
@@ -226,11 +244,6 @@ class SpeedTestManager:
         except (requests.RequestException, tarfile.TarError, zipfile.BadZipFile, OSError) as e:
             raise BinaryError(f"Failed to download binary: {e}") from e
 
-    def _get_proxy_config(self, proxy_url: str) -> dict[str, str]:
-        """Convert proxy URL to requests-compatible proxy configuration."""
-        # requests library expects proxies in format: {'http': 'proxy_url', 'https': 'proxy_url'}
-        return {"http": proxy_url, "https": proxy_url}
-
     def get_binary_version(self) -> str | None:
         """Get version of the currently available binary."""
         if not self.binary_path:
@@ -312,6 +325,9 @@ class SpeedTestManager:
         """Run speed test and return results file path."""
         logger.info(f"Starting speed test with IP file: {ip_file}")
 
+        if getattr(self.config, "engine", "cfst") == "tcp":
+            return self._run_tcp_probe(ip_file, output_file)
+
         if not self.binary_path:
             logger.debug("Binary path not set, ensuring binary availability")
             self.ensure_binary_available()
@@ -320,7 +336,31 @@ class SpeedTestManager:
             logger.error(f"IP file not found: {ip_file}")
             raise SpeedTestError(f"IP file not found: {ip_file}")
 
-        # Build command arguments
+        shortlist = getattr(self.config, "shortlist", 0)
+        if shortlist:
+            # Screen all candidates cheaply so cfst only sees the best few
+            samples = self.sweep_latency(ip_file)
+            if not samples:
+                raise SpeedTestError("No candidates responded to the latency sweep")
+            ip_file = self.write_shortlist(samples, shortlist, ip_file)
+
+        parallel_shards = getattr(self.config, "parallel_shards", 1)
+        if parallel_shards > 1:
+            return self._run_parallel_shards(ip_file, output_file, parallel_shards)
+
+        cmd_args = self._build_cfst_args(ip_file, output_file)
+        self._execute_cfst(cmd_args)
+
+        # Verify output file was created
+        if not os.path.exists(output_file):
+            logger.error(f"Speed test output file not created: {output_file}")
+            raise SpeedTestError(f"Speed test output file not created: {output_file}")
+
+        logger.info(f"Speed test completed successfully, results saved to: {output_file}")
+        return output_file
+
+    def _build_cfst_args(self, ip_file: str, output_file: str) -> list[str]:
+        """Build the cfst command line for testing an IP file."""
         cmd_args = [self.binary_path]
 
         # Add IP file
@@ -358,6 +398,13 @@ class SpeedTestManager:
             # Only add latency threshold when speed threshold is set
             cmd_args.extend(["-tl", "200"])
             logger.debug("Added latency threshold: 200ms")
+            # cfst stops download testing once -dn addresses meet the threshold,
+            # so stop as soon as enough good IPs are found
+            extend_string = getattr(self.config, "extend_string", None) or ""
+            quantity = getattr(self.config, "quantity", 0)
+            if quantity > 0 and "-dn" not in extend_string.split():
+                cmd_args.extend(["-dn", str(quantity)])
+                logger.debug(f"Stopping after {quantity} addresses meet the speed threshold")
         else:
             logger.debug(
                 "Speed threshold not specified or <= 0, -sl and -tl parameters not added"
@@ -380,45 +427,36 @@ class SpeedTestManager:
                 logger.debug(f"Added extended parameters (fallback): {extend_args}")
 
         logger.debug(f"Speed test command: {' '.join(cmd_args)}")
-
+        return cmd_args
+
+    def _execute_cfst(
+        self,
+        cmd_args: list[str],
+        timeout: float | None = None,
+        on_progress: Callable[[CfstProgress], None] | None = None,
+        download_lock: threading.Lock | None = None,
+    ) -> None:
+        """
+        Run cfst and check its exit status.
+
+        Args:
+            cmd_args: cfst command line
+            timeout: Seconds before cfst is killed (defaults to the configured timeout)
+            on_progress: Progress handler (defaults to logging and the progress callback)
+            download_lock: Lock serializing the download phases of concurrent runs
+
+        Raises:
+            SpeedTestError: If cfst cannot be run, fails or times out
+        """
+        timeout_seconds = getattr(self.config, "timeout", 600)  # Default to 10 minutes if not set
         try:
-            # Run the speed test
             logger.info("Executing CloudflareSpeedTest binary...")
-            timeout_seconds = getattr(
-                self.config, "timeout", 600
-            )  # Default to 10 minutes if not set
-            result = subprocess.run(
+            result = run_cfst(
                 cmd_args,
-                capture_output=True,
-                text=True,
-                timeout=timeout_seconds,
-                check=False,
-                input="\n",  # Simulate carriage return, no need for stdin=subprocess.PIPE
-                encoding="utf-8",
-                errors="ignore",
+                timeout=timeout or timeout_seconds,
+                on_progress=on_progress or self._report_progress,
+                download_lock=download_lock,
             )
-
-            logger.debug(f"Speed test completed with return code: {result.returncode}")
-            if result.stdout:
-                logger.debug(f"Speed test stdout: {result.stdout}")
-            if result.stderr:
-                logger.debug(f"Speed test stderr: {result.stderr}")
-
-            if result.returncode != 0:
-                error_msg = f"Speed test failed with return code {result.returncode}"
-                if result.stderr:
-                    error_msg += f": {result.stderr}"
-                logger.error(error_msg)
-                raise SpeedTestError(error_msg)
-
-            # Verify output file was created
-            if not os.path.exists(output_file):
-                logger.error(f"Speed test output file not created: {output_file}")
-                raise SpeedTestError(f"Speed test output file not created: {output_file}")
-
-            logger.info(f"Speed test completed successfully, results saved to: {output_file}")
-            return output_file
-
         except subprocess.TimeoutExpired:
             timeout_minutes = timeout_seconds // 60
             logger.error(f"Speed test timed out after {timeout_minutes} minutes")
@@ -430,6 +468,261 @@ class SpeedTestManager:
             logger.error(f"Speed test execution failed: {e}")
             raise SpeedTestError(f"Speed test execution failed: {e}") from e
 
+        logger.debug(f"Speed test completed with return code: {result.returncode}")
+        if result.returncode != 0:
+            error_msg = f"Speed test failed with return code {result.returncode}"
+            if result.output:
+                error_msg += f": {result.output}"
+            logger.error(error_msg)
+            raise SpeedTestError(error_msg)
+
+    def _run_parallel_shards(self, ip_file: str, output_file: str, shard_count: int) -> str:
+        """
+        Split the IP file across several cfst processes and merge their results.
+
+        Candidates are split per /24 (per IPv6 sampling block) so every shard
+        samples the same addresses cfst would. Up to parallel_jobs processes
+        run their latency phases at once, while download phases run one at a
+        time so they do not share bandwidth. Shard files are written next to the
+        IP and result files (ip_list_cf.txt -> ip_list_cf.shard-1-of-4.txt).
+        """
+        entries = read_local_list(ip_file)
+        block_prefix_v6 = getattr(self.config, "sample_block_v6", DEFAULT_BLOCK_PREFIX_V6)
+        shards = []
+        for index in range(1, shard_count + 1):
+            selected = CandidateSharder(
+                index, shard_count, block_prefix_v6=block_prefix_v6
+            ).select(entries)
+            if not selected:
+                continue
+            shard_ip_file = shard_file_name(ip_file, index, shard_count)
+            shard_output = shard_file_name(output_file, index, shard_count)
+            try:
+                with open(shard_ip_file, "w", encoding="utf-8") as f:
+                    f.write("".join(f"{entry}\n" for entry in selected))
+                # cfst writes no file when nothing qualifies; drop results of earlier runs
+                Path(shard_output).unlink(missing_ok=True)
+            except OSError as e:
+                raise SpeedTestError(f"Failed to prepare shard {shard_ip_file}: {e}") from e
+            shards.append((index, shard_ip_file, shard_output))
+
+        if not shards:
+            raise SpeedTestError(f"No candidates to test in {ip_file}")
+
+        jobs = min(getattr(self.config, "parallel_jobs", 0) or len(shards), len(shards))
+        logger.info(f"Running {len(shards)} cfst shards, {jobs} at once")
+
+        timeout_seconds = getattr(self.config, "timeout", 600)
+        deadline = time.monotonic() + timeout_seconds
+        download_lock = threading.Lock()
+        progress_lock = threading.Lock()
+        latency_progress: dict[int, CfstProgress] = {}
+
+        def report(index: int, progress: CfstProgress) -> None:
+            # Latency phases run side by side and are reported as one;
+            # download phases run one at a time and are reported as they are
+            with progress_lock:
+                if progress.phase == "latency":
+                    latency_progress[index] = progress
+                    etas = [p.eta for p in latency_progress.values() if p.eta is not None]
+                    progress = CfstProgress(
+                        "latency",
+                        sum(p.done for p in latency_progress.values()),
+                        sum(p.total for p in latency_progress.values()),
+                        sum(p.qualified for p in latency_progress.values()),
+                        max(etas) if etas else None,
+                    )
+                self._report_progress(progress)
+
+        def run_shard(index: int, shard_ip_file: str, shard_output: str) -> None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timeout_minutes = timeout_seconds // 60
+                raise SpeedTestError(f"Speed test timed out after {timeout_minutes} minutes")
+            self._execute_cfst(
+                self._build_cfst_args(shard_ip_file, shard_output),
+                timeout=remaining,
+                on_progress=lambda progress: report(index, progress),
+                download_lock=download_lock,
+            )
+            logger.info(f"Shard {index}/{shard_count} finished")
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(run_shard, *shard) for shard in shards]
+            try:
+                for future in futures:
+                    future.result()
+            except Exception:
+                # Shards that have not started yet are skipped; running ones finish
+                for future in futures:
+                    future.cancel()
+                raise
+
+        outputs = [shard_output for _, _, shard_output in shards if os.path.exists(shard_output)]
+        if not outputs:
+            logger.error(f"Speed test output file not created: {output_file}")
+            raise SpeedTestError(f"Speed test output file not created: {output_file}")
+
+        count = merge_result_files(outputs, output_file)
+        logger.info(
+            f"Speed test completed successfully, merged {count} results from "
+            f"{len(outputs)} shards into: {output_file}"
+        )
+        return output_file
+
+    def _report_progress(self, progress: CfstProgress) -> None:
+        """Log cfst progress now and then and pass it on to the progress callback."""
+        now = time.monotonic()
+        if now - self._progress_logged >= self.PROGRESS_LOG_INTERVAL:
+            self._progress_logged = now
+            eta = f", ETA {progress.eta:.0f}s" if progress.eta is not None else ""
+            logger.info(
+                f"Speed test {progress.phase} phase: {progress.done}/{progress.total}, "
+                f"{progress.qualified} qualified{eta}"
+            )
+        if self.progress_callback is not None:
+            self.progress_callback(progress)
+
+    def _run_tcp_probe(self, ip_file: str, output_file: str) -> str:
+        """
+        Measure TCP connect latency with the built-in prober.
+
+        Prefixes in the IP file are expanded like cfst does (one address per /24)
+        and the responding addresses are written as a cfst result file. With a
+        download count, the lowest-latency addresses are then download tested and,
+        as with cfst, only those are written, fastest first. Extended cfst
+        parameters do not apply and are ignored.
+        """
+        if not os.path.exists(ip_file):
+            logger.error(f"IP file not found: {ip_file}")
+            raise SpeedTestError(f"IP file not found: {ip_file}")
+
+        if getattr(self.config, "extend_string", None):
+            logger.warning("Extended parameters are cfst options and are ignored by the tcp engine")
+
+        samples = self.sweep_latency(ip_file)
+
+        download_count = getattr(self.config, "download_count", 0)
+        if download_count and samples:
+            samples = samples[:download_count]
+            self.write_shortlist(samples, download_count, ip_file)
+            measurements = self.run_download_test([sample.ip for sample in samples])
+            for sample, measurement in zip(samples, measurements, strict=True):
+                sample.speed = measurement.speed
+                sample.colo = measurement.colo or sample.colo
+            samples.sort(key=lambda sample: -sample.speed)
+
+        write_results(samples, output_file)
+        return output_file
+
+    def sweep_latency(self, ip_file: str) -> list[LatencySample]:
+        """
+        Measure the TCP connect latency of every candidate in an IP file.
+
+        Args:
+            ip_file: IP list file; prefixes contribute one address per /24
+
+        Returns:
+            Responding addresses, best first (by loss, then latency)
+        """
+        addresses = expand_candidates(
+            read_local_list(ip_file), seed=getattr(self.config, "sample_seed", None)
+        )
+        prober = TCPProber(
+            port=getattr(self.config, "speed_port", None) or DEFAULT_PROBE_PORT,
+            count=self.config.probe_count,
+            concurrency=self.config.probe_concurrency,
+        )
+        logger.info(
+            f"Probing {len(addresses)} addresses on port {prober.port} "
+            f"({prober.count} connects each, {prober.concurrency} at once)"
+        )
+
+        samples = prober.probe(addresses)
+        logger.info(f"TCP probe completed: {len(samples)} of {len(addresses)} addresses responded")
+        return samples
+
+    def write_shortlist(self, samples: list[LatencySample], count: int, ip_file: str) -> str:
+        """
+        Write the best addresses of a latency sweep for the download stage.
+
+        Args:
+            samples: Sweep results, best first
+            count: Number of addresses to keep
+            ip_file: IP file the sweep was run on; the shortlist is written next to it
+
+        Returns:
+            Path of the shortlist file (ip_list_cf.txt -> ip_list_cf.shortlist.txt)
+
+        Raises:
+            SpeedTestError: If the shortlist cannot be written
+        """
+        shortlist_file = f"{os.path.splitext(ip_file)[0]}.shortlist.txt"
+        addresses = [sample.ip for sample in samples[:count]]
+        try:
+            with open(shortlist_file, "w", encoding="utf-8") as f:
+                f.write("".join(f"{address}\n" for address in addresses))
+        except OSError as e:
+            raise SpeedTestError(f"Failed to write shortlist {shortlist_file}: {e}") from e
+        logger.info(f"Shortlisted {len(addresses)} addresses in {shortlist_file}")
+        return shortlist_file
+
+    def run_download_test(self, addresses: list[str]) -> list[DownloadMeasurement]:
+        """
+        Measure download speed from each address with the built-in tester.
+
+        The test URL's host is used for SNI and the Host header while connecting
+        to the address itself; up to download_concurrency downloads run at once.
+
+        Args:
+            addresses: IP addresses to download from
+
+        Returns:
+            One measurement per address, in input order
+
+        Raises:
+            SpeedTestError: If the test URL or download settings are invalid
+        """
+        tester = DownloadTester(
+            url=getattr(self.config, "speed_url", None) or DEFAULT_DOWNLOAD_URL,
+            port=getattr(self.config, "speed_port", None),
+            duration=self.config.download_seconds,
+            max_bytes=self.config.download_bytes,
+            concurrency=self.config.download_concurrency,
+            tolerance=self.config.download_tolerance,
+            min_duration=self.config.download_min_seconds,
+        )
+        logger.info(
+            f"Download testing {len(addresses)} addresses from {tester.host} "
+            f"({tester.concurrency} at once)"
+        )
+        measurements = tester.measure(addresses)
+        tested = sum(1 for measurement in measurements if not measurement.error)
+        logger.info(f"Download tests completed: {tested} of {len(addresses)} succeeded")
+        if tester.tolerance and tested:
+            seconds = [m.seconds for m in measurements if not m.error]
+            logger.info(
+                f"Downloads took {sum(seconds) / len(seconds):.1f}s on average "
+                f"(at most {tester.duration:g}s)"
+            )
+        return measurements
+
+    def lists_all_responders(self) -> bool:
+        """
+        Check if result files list every address that answered the latency test.
+
+        cfst only exports the full latency results when the download test is
+        disabled; otherwise it exports the addresses that were download tested.
+        The tcp engine lists every responding address unless it download tests,
+        and a shortlist hides every candidate that did not make it.
+        """
+        if getattr(self.config, "engine", "cfst") == "tcp":
+            return not getattr(self.config, "download_count", 0)
+        if getattr(self.config, "shortlist", 0):
+            return False
+        extend_string = getattr(self.config, "extend_string", None)
+        return bool(extend_string) and "-dd" in extend_string.split()
+
     def parse_results(self, results_file: str) -> list[SpeedTestResult]:
         """Parse speed test results from CSV."""
         if not os.path.exists(results_file):
@@ -523,7 +816,7 @@ class SpeedTestManager:
                 latency = 0.0
 
             # Validate IP address format (basic check)
-            if not ip or "." not in ip:
+            if not ip or ("." not in ip and ":" not in ip):
                 raise ValueError(f"Invalid IP address: {ip}")
 
             return SpeedTestResult(
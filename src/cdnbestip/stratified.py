@@ -0,0 +1,234 @@
+"""Stratified candidate sampling that spreads a probe budget across address strata."""
+
+import random
+from bisect import bisect_right
+from itertools import accumulate
+
+from .exceptions import IPSourceError
+from .ipset import IPIntervalSet
+from .sampling import SAMPLE_MODES, int_to_ip, pick_distinct
+
+# Supported budget allocations across strata
+STRATIFY_ALLOCATIONS = ("proportional", "equal")
+
+# Default stratum size (one stratum = one /16 for IPv4, one /32 for IPv6)
+DEFAULT_STRATUM_PREFIX_V4 = 16
+DEFAULT_STRATUM_PREFIX_V6 = 32
+
+_ADDRESS_BITS = {4: 32, 6: 128}
+
+
+class StratifiedSampler:
+    """
+    Picks a fixed number of test addresses spread over strata.
+
+    Address space with a known data center is grouped by colo; everything else is
+    grouped by its /16 (IPv4) or /32 (IPv6). The budget is split across strata
+    either in proportion to their size or equally, so small ranges and rare colos
+    are probed even when a few large ranges dominate the list.
+    """
+
+    def __init__(
+        self,
+        budget: int,
+        allocation: str = "proportional",
+        mode: str = "uniform",
+        seed: int | None = None,
+        stratum_prefix_v4: int = DEFAULT_STRATUM_PREFIX_V4,
+        stratum_prefix_v6: int = DEFAULT_STRATUM_PREFIX_V6,
+    ):
+        """
+        Initialize stratified sampler.
+
+        Args:
+            budget: Total number of addresses to pick
+            allocation: Budget split across strata: proportional or equal
+            mode: Sampling strategy within a stratum (random modes pick at random)
+            seed: Random seed for reproducible random sampling
+            stratum_prefix_v4: Prefix length defining one IPv4 stratum
+            stratum_prefix_v6: Prefix length defining one IPv6 stratum
+        """
+        if budget <= 0:
+            raise IPSourceError("Stratified sampling budget must be greater than 0")
+        if allocation not in STRATIFY_ALLOCATIONS:
+            raise IPSourceError(
+                f"Invalid allocation: {allocation}. Must be one of {list(STRATIFY_ALLOCATIONS)}"
+            )
+        if mode not in SAMPLE_MODES:
+            raise IPSourceError(
+                f"Invalid sample mode: {mode}. Must be one of {list(SAMPLE_MODES)}"
+            )
+
+        self.budget = budget
+        self.allocation = allocation
+        self.mode = mode
+        self.rng = random.Random(seed)
+        self.stratum_prefix = {4: stratum_prefix_v4, 6: stratum_prefix_v6}
+
+    def sample(
+        self, candidates: IPIntervalSet, prefix_colos: dict[str, str] | None = None
+    ) -> list[str]:
+        """
+        Pick test addresses from the candidate ranges.
+
+        Args:
+            candidates: Candidate address ranges
+            prefix_colos: Known data center code per prefix
+
+        Returns:
+            Sampled IP addresses, grouped by stratum
+        """
+        strata = self.stratify(candidates, prefix_colos)
+        sizes = {
+            key: sum(last - first + 1 for _, first, last in ranges)
+            for key, ranges in strata.items()
+        }
+        # Weigh strata in units of a full stratum so IPv6 space does not swamp IPv4
+        weights = {
+            key: sum(
+                (last - first + 1) / (1 << (_ADDRESS_BITS[version] - self.stratum_prefix[version]))
+                for version, first, last in ranges
+            )
+            for key, ranges in strata.items()
+        }
+        allocations = self.allocate(sizes, weights)
+
+        addresses = []
+        for key, ranges in strata.items():
+            count = allocations.get(key, 0)
+            if count:
+                addresses.extend(self._pick(ranges, sizes[key], count))
+        return addresses
+
+    def stratify(
+        self, candidates: IPIntervalSet, prefix_colos: dict[str, str] | None = None
+    ) -> dict[str, list[tuple[int, int, int]]]:
+        """
+        Split candidate ranges into strata.
+
+        Args:
+            candidates: Candidate address ranges
+            prefix_colos: Known data center code per prefix; more specific prefixes win
+
+        Returns:
+            Mapping of stratum key ("colo:HKG" or a CIDR block) to its
+            (ip_version, first, last) ranges, in address order
+        """
+        strata: dict[str, list[tuple[int, int, int]]] = {}
+        remaining = candidates
+
+        if prefix_colos:
+            # Group mapped prefixes by (prefix length, colo) so a handful of set
+            # operations resolve overlaps in favor of the most specific prefix
+            groups: dict[tuple[int, str], list[str]] = {}
+            for prefix, colo in prefix_colos.items():
+                prefixlen = int(prefix.partition("/")[2] or (128 if ":" in prefix else 32))
+                groups.setdefault((prefixlen, colo), []).append(prefix)
+
+            ordered = sorted(groups.items(), key=lambda item: (-item[0][0], item[0][1]))
+            for (_, colo), prefixes in ordered:
+                mapped = remaining & IPIntervalSet.from_prefixes(prefixes)
+                if not mapped:
+                    continue
+                remaining = remaining - mapped
+                strata.setdefault(f"colo:{colo}", []).extend(
+                    (version, first, last)
+                    for version in (4, 6)
+                    for first, last in mapped.intervals(version)
+                )
+
+        for version in (4, 6):
+            prefixlen = self.stratum_prefix[version]
+            step = 1 << (_ADDRESS_BITS[version] - prefixlen)
+            for first, last in remaining.intervals(version):
+                start = first
+                while start <= last:
+                    base = start - start % step
+                    end = min(last, base + step - 1)
+                    key = f"{int_to_ip(version, base)}/{prefixlen}"
+                    strata.setdefault(key, []).append((version, start, end))
+                    start = end + 1
+
+        return strata
+
+    def allocate(
+        self, sizes: dict[str, int], weights: dict[str, float] | None = None
+    ) -> dict[str, int]:
+        """
+        Split the budget across strata without exceeding their sizes.
+
+        Every stratum gets at least one probe when the budget allows it. With
+        fewer probes than strata, proportional allocation favors the heaviest
+        strata and equal allocation spreads the probes across the list.
+
+        Args:
+            sizes: Number of addresses per stratum key
+            weights: Proportional allocation weight per stratum key (defaults to sizes)
+
+        Returns:
+            Number of addresses to pick per stratum key
+        """
+        weights = weights or sizes
+        keys = [key for key, size in sizes.items() if size > 0]
+        allocations = dict.fromkeys(keys, 0)
+        if not keys:
+            return allocations
+
+        if self.budget < len(keys):
+            if self.allocation == "proportional":
+                chosen = sorted(keys, key=lambda key: -weights[key])[: self.budget]
+            else:
+                chosen = [keys[(index * len(keys)) // self.budget] for index in range(self.budget)]
+            for key in chosen:
+                allocations[key] = 1
+            return allocations
+
+        for key in keys:
+            allocations[key] = 1
+        remaining = self.budget - len(keys)
+
+        # Hand out the rest by weight, capping each stratum at its size
+        while remaining > 0:
+            open_keys = [key for key in keys if allocations[key] < sizes[key]]
+            if not open_keys:
+                break
+
+            open_weights = {
+                key: weights[key] if self.allocation == "proportional" else 1 for key in open_keys
+            }
+            total_weight = sum(open_weights.values())
+            shares = {key: remaining * open_weights[key] / total_weight for key in open_keys}
+
+            granted = 0
+            for key in open_keys:
+                grant = min(int(shares[key]), sizes[key] - allocations[key])
+                allocations[key] += grant
+                granted += grant
+
+            if granted == 0:
+                # Only fractional shares left: largest remainders get one more
+                for key in sorted(open_keys, key=lambda key: -shares[key])[:remaining]:
+                    allocations[key] += 1
+                    granted += 1
+
+            remaining -= granted
+
+        return allocations
+
+    def _pick(self, ranges: list[tuple[int, int, int]], size: int, count: int) -> list[str]:
+        """Pick addresses spread over the concatenated ranges of a stratum."""
+        if count >= size:
+            indexes = range(size)
+        elif self.mode == "uniform":
+            # Centered picks keep away from range edges
+            indexes = [((2 * index + 1) * size) // (2 * count) for index in range(count)]
+        else:
+            indexes = sorted(pick_distinct(self.rng, 0, size - 1, count))
+
+        starts = list(accumulate((last - first + 1 for _, first, last in ranges), initial=0))
+        addresses = []
+        for index in indexes:
+            position = bisect_right(starts, index) - 1
+            version, first, _ = ranges[position]
+            addresses.append(int_to_ip(version, first + index - starts[position]))
+        return addresses
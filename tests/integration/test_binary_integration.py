@@ -36,7 +36,7 @@ class TestBinaryDownloadIntegration:
 
         shutil.rmtree(self.temp_dir, ignore_errors=True)
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     @patch("tarfile.open")
     @patch("shutil.copy2")
     def test_complete_binary_download_workflow(self, mock_copy, mock_tarfile, mock_requests):
@@ -98,7 +98,7 @@ class TestBinaryDownloadIntegration:
             mock_copy.assert_called_once()
             mock_subprocess.assert_called_once()
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_github_api_rate_limiting(self, mock_requests):
         """Test handling of GitHub API rate limiting."""
         # Mock rate limit response
@@ -116,7 +116,7 @@ class TestBinaryDownloadIntegration:
             with pytest.raises(BinaryError, match="Failed to get download URL"):
                 self.manager.ensure_binary_available()
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_binary_download_with_cdn_acceleration(self, mock_requests):
         """Test binary download with CDN acceleration."""
         self.config.cdn_url = "https://cdn.example.com/"
@@ -140,7 +140,7 @@ class TestBinaryDownloadIntegration:
         # Should use CDN URL
         assert download_url.startswith("https://cdn.example.com/")
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_binary_download_network_interruption(self, mock_requests):
         """Test binary download with network interruption."""
         # Mock connection error during download
@@ -190,7 +190,7 @@ class TestBinaryExecutionIntegration:
 
         shutil.rmtree(self.temp_dir, ignore_errors=True)
 
-    @patch("subprocess.run")
+    @patch("cdnbestip.speedtest.run_cfst")
     def test_speed_test_execution_with_all_parameters(self, mock_subprocess):
         """Test speed test execution with all configuration parameters."""
         # Configure all parameters
@@ -203,8 +203,7 @@ class TestBinaryExecutionIntegration:
         # Mock successful execution
         mock_result = Mock()
         mock_result.returncode = 0
-        mock_result.stderr = ""
-        mock_result.stdout = "Speed test completed successfully"
+        mock_result.output = ""
         mock_subprocess.return_value = mock_result
 
         # Create expected results file
@@ -233,8 +232,10 @@ class TestBinaryExecutionIntegration:
         assert "10.0" in call_args
         assert "-tl" in call_args
         assert "200" in call_args
+        # cfst stops once the requested number of addresses meet the threshold
+        assert call_args[call_args.index("-dn") + 1] == "5"
 
-    @patch("subprocess.run")
+    @patch("cdnbestip.speedtest.run_cfst")
     def test_speed_test_timeout_handling(self, mock_subprocess):
         """Test speed test timeout handling."""
         # Mock timeout
@@ -244,26 +245,26 @@ class TestBinaryExecutionIntegration:
             with pytest.raises(SpeedTestError, match="timed out"):
                 self.manager.run_speed_test(self.ip_file, self.results_file)
 
-    @patch("subprocess.run")
+    @patch("cdnbestip.speedtest.run_cfst")
     def test_speed_test_binary_crash(self, mock_subprocess):
         """Test speed test binary crash handling."""
         # Mock binary crash
         mock_result = Mock()
         mock_result.returncode = -11  # SIGSEGV
-        mock_result.stderr = "Segmentation fault"
+        mock_result.output = "Segmentation fault"
         mock_subprocess.return_value = mock_result
 
         with patch("os.path.exists", return_value=True):
             with pytest.raises(SpeedTestError, match="failed with return code -11"):
                 self.manager.run_speed_test(self.ip_file, self.results_file)
 
-    @patch("subprocess.run")
+    @patch("cdnbestip.speedtest.run_cfst")
     def test_speed_test_output_file_not_created(self, mock_subprocess):
         """Test handling when speed test doesn't create output file."""
         # Mock successful execution but no output file
         mock_result = Mock()
         mock_result.returncode = 0
-        mock_result.stderr = ""
+        mock_result.output = ""
         mock_subprocess.return_value = mock_result
 
         with patch("os.path.exists", side_effect=lambda path: path == self.ip_file):
@@ -456,7 +457,7 @@ class TestBinaryPlatformCompatibility:
                 assert os_name == expected_os, f"Failed for {system}/{machine}"
                 assert arch == expected_arch, f"Failed for {system}/{machine}"
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_binary_availability_for_platforms(self, mock_requests):
         """Test binary availability check for different platforms."""
         # Mock GitHub API response with various platform binaries
@@ -56,14 +56,14 @@ class TestSpeedTestToDNSWorkflow:
 
         shutil.rmtree(self.temp_dir, ignore_errors=True)
 
-    @patch("cdnbestip.speedtest.subprocess.run")
+    @patch("cdnbestip.speedtest.run_cfst")
     @patch("cdnbestip.dns.Cloudflare")
     def test_complete_workflow_success(self, mock_cloudflare, mock_subprocess):
         """Test successful complete workflow from speed test to DNS update."""
         # Mock speed test execution
         mock_result = Mock()
         mock_result.returncode = 0
-        mock_result.stderr = ""
+        mock_result.output = ""
         mock_subprocess.return_value = mock_result
 
         # Create mock results file
@@ -155,13 +155,13 @@ class TestSpeedTestToDNSWorkflow:
         mock_client.zones.dns_records.create.assert_called()
         assert mock_client.zones.dns_records.create.call_count == 3
 
-    @patch("cdnbestip.speedtest.subprocess.run")
+    @patch("cdnbestip.speedtest.run_cfst")
     def test_workflow_speed_test_failure(self, mock_subprocess):
         """Test workflow when speed test fails."""
         # Mock speed test failure
         mock_result = Mock()
         mock_result.returncode = 1
-        mock_result.stderr = "Speed test failed"
+        mock_result.output = "Speed test failed"
         mock_subprocess.return_value = mock_result
 
         speed_manager = SpeedTestManager(self.config)
@@ -190,7 +190,7 @@ class TestSpeedTestToDNSWorkflow:
         with pytest.raises(AuthenticationError, match="Invalid credentials"):
             dns_manager.authenticate()
 
-    @patch("cdnbestip.speedtest.subprocess.run")
+    @patch("cdnbestip.speedtest.run_cfst")
     @patch("cdnbestip.dns.Cloudflare")
     def test_workflow_partial_dns_update_failure(self, mock_cloudflare, mock_subprocess):
         """Test workflow when some DNS updates fail."""
@@ -287,20 +287,20 @@ class TestIPSourceToSpeedTestWorkflow:
 
         shutil.rmtree(self.temp_dir, ignore_errors=True)
 
-    @patch("requests.get")
-    @patch("cdnbestip.speedtest.subprocess.run")
+    @patch("requests.Session.get")
+    @patch("cdnbestip.speedtest.run_cfst")
     def test_ip_download_to_speed_test_workflow(self, mock_subprocess, mock_requests):
         """Test complete workflow from IP download to speed test."""
         # Mock IP source download
         mock_response = Mock()
-        mock_response.text = "1.1.1.1\n1.0.0.1\n8.8.8.8\n8.8.4.4\n"
+        mock_response.iter_content.return_value = [b"1.1.1.1\n1.0.0.1\n8.8.8.8\n8.8.4.4\n"]
         mock_response.raise_for_status.return_value = None
         mock_requests.return_value = mock_response
 
         # Mock speed test execution
         mock_subprocess_result = Mock()
         mock_subprocess_result.returncode = 0
-        mock_subprocess_result.stderr = ""
+        mock_subprocess_result.output = ""
         mock_subprocess.return_value = mock_subprocess_result
 
         # Execute workflow
@@ -330,7 +330,7 @@ class TestIPSourceToSpeedTestWorkflow:
         call_args = mock_subprocess.call_args[0][0]
         assert self.ip_file in call_args
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_ip_download_network_failure(self, mock_requests):
         """Test IP download workflow with network failure."""
         # Mock network failure
@@ -341,18 +341,23 @@ class TestIPSourceToSpeedTestWorkflow:
         with pytest.raises(IPSourceError, match="Network error"):
             ip_manager.download_ip_list("cf", self.ip_file, force_refresh=True)
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_ip_download_invalid_response(self, mock_requests):
         """Test IP download workflow with invalid response."""
         # Mock invalid response
         mock_response = Mock()
-        mock_response.text = "invalid response format"
+        mock_response.iter_content.return_value = [b"invalid response format"]
         mock_response.raise_for_status.return_value = None
         mock_requests.return_value = mock_response
 
         ip_manager = IPSourceManager(self.config)
 
-        # Should still create file but with invalid content
+        # A raced mirror/origin download rejects bodies without any IP address
+        with pytest.raises(IPSourceError, match="unexpected response body"):
+            ip_manager.download_ip_list("cf", self.ip_file, force_refresh=True)
+
+        # A direct download still creates the file with the invalid content
+        self.config.mirror_race = False
         ip_manager.download_ip_list("cf", self.ip_file, force_refresh=True)
 
         assert os.path.exists(self.ip_file)
@@ -381,7 +386,7 @@ class TestBinaryDownloadToSpeedTestWorkflow:
 
         shutil.rmtree(self.temp_dir, ignore_errors=True)
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     @patch("tarfile.open")
     @patch("shutil.copy2")
     @patch("cdnbestip.speedtest.subprocess.run")
@@ -434,18 +439,7 @@ class TestBinaryDownloadToSpeedTestWorkflow:
             verify_result = Mock()
             verify_result.returncode = 0
 
-            # Mock speed test execution
-            speed_result = Mock()
-            speed_result.returncode = 0
-            speed_result.stderr = ""
-
-            def subprocess_side_effect(cmd, **kwargs):
-                if "-h" in cmd:
-                    return verify_result
-                else:
-                    return speed_result
-
-            mock_subprocess.side_effect = subprocess_side_effect
+            mock_subprocess.return_value = verify_result
 
             # Execute workflow
             speed_manager = SpeedTestManager(self.config)
@@ -459,15 +453,20 @@ class TestBinaryDownloadToSpeedTestWorkflow:
             # Step 2: Run speed test with downloaded binary
             results_file = os.path.join(self.temp_dir, "results.csv")
 
-            with patch("os.path.exists", return_value=True):
+            speed_result = Mock(returncode=0, output="")
+            with (
+                patch("os.path.exists", return_value=True),
+                patch("cdnbestip.speedtest.run_cfst", return_value=speed_result) as mock_run,
+            ):
                 result_file = speed_manager.run_speed_test(self.ip_file, results_file)
                 assert result_file == results_file
 
             # Verify binary was downloaded and used
             mock_copy.assert_called_once()
-            assert mock_subprocess.call_count >= 2  # Verification + speed test
+            mock_subprocess.assert_called()  # Verification
+            assert mock_run.call_args[0][0][0] == binary_path
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_binary_download_failure(self, mock_requests):
         """Test binary download failure handling."""
         # Mock GitHub API failure
@@ -479,7 +478,7 @@ class TestBinaryDownloadToSpeedTestWorkflow:
             with pytest.raises(BinaryError, match="Failed to get download URL"):
                 speed_manager.ensure_binary_available()
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_binary_no_matching_platform(self, mock_requests):
         """Test binary download when no matching platform is available."""
         # Mock GitHub API response with no matching assets
@@ -558,7 +557,7 @@ class TestErrorRecoveryWorkflows:
         assert record.content == "1.1.1.1"
         assert mock_client.zones.dns_records.create.call_count == 2
 
-    @patch("cdnbestip.speedtest.subprocess.run")
+    @patch("cdnbestip.speedtest.run_cfst")
     def test_speed_test_retry_on_timeout(self, mock_subprocess):
         """Test speed test retry on timeout."""
         import subprocess
@@ -567,7 +566,7 @@ class TestErrorRecoveryWorkflows:
         timeout_error = subprocess.TimeoutExpired(["cfst"], 300)
         success_result = Mock()
         success_result.returncode = 0
-        success_result.stderr = ""
+        success_result.output = ""
 
         mock_subprocess.side_effect = [timeout_error, success_result]
 
@@ -593,7 +592,7 @@ class TestErrorRecoveryWorkflows:
 
             shutil.rmtree(temp_dir, ignore_errors=True)
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_ip_source_fallback_on_failure(self, mock_requests):
         """Test IP source fallback when primary source fails."""
 
@@ -603,7 +602,7 @@ class TestErrorRecoveryWorkflows:
                 raise requests.ConnectionError("Primary source failed")
             else:
                 mock_response = Mock()
-                mock_response.text = "1.1.1.1\n1.0.0.1\n"
+                mock_response.iter_content.return_value = [b"1.1.1.1\n1.0.0.1\n"]
                 mock_response.raise_for_status.return_value = None
                 return mock_response
 
@@ -237,9 +237,9 @@ class TestIPSourceFileCaching:
         os.utime(ip_file, (old_time, old_time))
 
         # Mock download of updated IPs
-        with patch("requests.get") as mock_get:
+        with patch("requests.Session.get") as mock_get:
             mock_response = Mock()
-            mock_response.text = "1.1.1.1\n1.0.0.1\n9.9.9.9\n"  # Updated list
+            mock_response.iter_content.return_value = [b"1.1.1.1\n1.0.0.1\n9.9.9.9\n"]  # Updated list
             mock_response.raise_for_status.return_value = None
             mock_get.return_value = mock_response
 
@@ -285,7 +285,7 @@ class TestIPSourceFileCaching:
             f.write(fallback_ips)
 
         # Mock primary source failure
-        with patch("requests.get") as mock_get:
+        with patch("requests.Session.get") as mock_get:
             mock_get.side_effect = Exception("Primary source failed")
 
             # Should be able to use fallback
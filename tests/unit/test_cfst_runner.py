@@ -0,0 +1,136 @@
+"""Unit tests for the streaming cfst runner."""
+
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from cdnbestip.cfst_runner import CfstProgress, CfstProgressParser, run_cfst
+
+LATENCY_START = "开始延迟测速（模式：TCP, 端口：443, 范围：0 ~ 200 ms, 丢包：1.00)\n"
+DOWNLOAD_START = "开始下载测速（下限：5.00 MB/s, 数量：3, 队列：10）\n"
+
+
+class FakeClock:
+    """Clock advanced by hand."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCfstProgressParser:
+    """Test parsing cfst console output into progress events."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.clock = FakeClock()
+        self.parser = CfstProgressParser(clock=self.clock)
+
+    def test_latency_progress_with_eta(self):
+        """Test latency frames report tested and available counts with an ETA."""
+        self.parser.feed(LATENCY_START)
+        self.clock.now = 10.0
+        events = self.parser.feed("\r100 / 500 [---↗____] \x1b[32m可用:\x1b[0m 40\r")
+
+        assert events == [CfstProgress("latency", 100, 500, 40, eta=40.0)]
+
+    def test_frames_split_across_chunks(self):
+        """Test frames are only parsed once complete and repeats are dropped."""
+        self.parser.feed(LATENCY_START)
+        assert self.parser.feed("\r2 / 10 [--") == []
+        events = self.parser.feed("__] 可用: 1\r2 / 10 [--__] 可用: 1\r")
+        assert [(event.done, event.qualified) for event in events] == [(2, 1)]
+
+        events = self.parser.feed("3 / 10 [---_] 可用: 2")
+        assert events == []
+        assert [event.done for event in self.parser.finish()] == [3]
+
+    def test_download_progress(self):
+        """Test download frames count addresses above the threshold."""
+        self.parser.feed(LATENCY_START + "\r10 / 10 [----] 可用: 8\n")
+        events = self.parser.feed(DOWNLOAD_START + "\r2 / 3 [--_]     |\r")
+
+        assert events == [CfstProgress("download", 2, 3, 2)]
+
+    def test_output_tail_skips_progress_frames(self):
+        """Test only regular output lines are kept."""
+        self.parser.feed(LATENCY_START + "\r1 / 2 [-_] 可用: 1\r完整测速结果已写入 result.csv\n")
+
+        assert list(self.parser.tail) == [LATENCY_START.strip(), "完整测速结果已写入 result.csv"]
+
+
+class TestRunCfst:
+    """Test running a child process that prints cfst-like output."""
+
+    def _script(self, body: str) -> list[str]:
+        return [sys.executable, "-c", f"import sys, time\n{body}"]
+
+    def test_progress_is_streamed(self):
+        """Test progress events arrive and the output tail is returned."""
+        events = []
+        cmd = self._script(
+            f"sys.stdout.write({LATENCY_START!r})\n"
+            "for i in range(1, 4):\n"
+            "    sys.stdout.write(f'\\r{i} / 3 [---] 可用: {i}')\n"
+            "    sys.stdout.flush()\n"
+            "print()\n"
+            "print('done', file=sys.stderr)\n"
+            "sys.stdin.readline()\n"
+        )
+
+        run = run_cfst(cmd, timeout=30, on_progress=events.append)
+
+        assert run.returncode == 0
+        assert [(event.done, event.qualified) for event in events] == [(1, 1), (2, 2), (3, 3)]
+        assert run.output.endswith("done")
+
+    def test_exit_status(self):
+        """Test a failing child reports its return code."""
+        run = run_cfst(self._script("print('bad flag'); sys.exit(3)"), timeout=30)
+
+        assert run.returncode == 3
+        assert run.output == "bad flag"
+
+    def test_timeout_kills_child(self):
+        """Test a child running past the timeout is killed."""
+        with pytest.raises(subprocess.TimeoutExpired):
+            run_cfst(self._script("print('start', flush=True); time.sleep(30)"), timeout=0.5)
+
+    def test_download_phases_are_serialized(self, tmp_path: Path):
+        """Test runs sharing a download lock never download at the same time."""
+        lock = threading.Lock()
+        runs = []
+        for index in range(3):
+            record = tmp_path / f"download-{index}.txt"
+            cmd = self._script(
+                f"sys.stdout.write({LATENCY_START!r} + {DOWNLOAD_START!r})\n"
+                "sys.stdout.flush()\n"
+                "time.sleep(0.2)\n"
+                "start = time.time()\n"
+                "time.sleep(0.3)\n"
+                f"open({str(record)!r}, 'w').write(f'{{start}} {{time.time()}}')\n"
+            )
+            runs.append((cmd, record))
+
+        threads = [
+            threading.Thread(target=run_cfst, args=(cmd, 30), kwargs={"download_lock": lock})
+            for cmd, _ in runs
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        intervals = sorted(tuple(map(float, record.read_text().split())) for _, record in runs)
+        assert all(end <= start for (_, end), (start, _) in zip(intervals, intervals[1:]))
+        assert not lock.locked()
+
+    def test_missing_binary(self):
+        """Test a missing binary raises FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            run_cfst(["/nonexistent/cfst"], timeout=5)
@@ -136,7 +136,7 @@ class TestCDNURLUsageWithChinaDetection:
         self.config = Config(cdn_url="https://fastfile.asfd.cn/")
 
     @patch("cdnbestip.speedtest.is_china_network")
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_cdn_url_used_in_china_network(self, mock_requests, mock_china_detection):
         """Test CDN URL is used when in China network."""
         # Mock China network detection
@@ -168,7 +168,7 @@ class TestCDNURLUsageWithChinaDetection:
         mock_requests.assert_called_once_with(expected_api_url, timeout=30)
 
     @patch("cdnbestip.speedtest.is_china_network")
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_cdn_url_not_used_outside_china(self, mock_requests, mock_china_detection):
         """Test CDN URL is not used when outside China network."""
         # Mock non-China network
@@ -200,7 +200,7 @@ class TestCDNURLUsageWithChinaDetection:
         mock_requests.assert_called_once_with(expected_api_url, timeout=30)
 
     @patch("cdnbestip.speedtest.is_china_network")
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_cdn_url_not_used_when_not_configured(self, mock_requests, mock_china_detection):
         """Test CDN URL is not used when not configured, even in China."""
         # Mock China network detection
@@ -236,7 +236,7 @@ class TestCDNURLUsageWithChinaDetection:
         mock_requests.assert_called_once_with(expected_api_url, timeout=30)
 
     @patch("cdnbestip.speedtest.is_china_network")
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_cdn_url_environment_variable_override(self, mock_requests, mock_china_detection):
         """Test CDN URL can be overridden by environment variable."""
         # Mock China network detection
@@ -272,7 +272,7 @@ class TestCDNURLUsageWithChinaDetection:
 
         manager = SpeedTestManager(self.config)
 
-        with patch("requests.get") as mock_requests:
+        with patch("requests.Session.get") as mock_requests:
             # Mock GitHub API response
             mock_response = Mock()
             mock_response.json.return_value = {"assets": []}
@@ -157,6 +157,13 @@ class TestArgumentValidation:
         args = self.create_args(dns=True, domain="example.com", prefix="cf")
         validate_arguments(args)
 
+    def test_validate_shard(self):
+        """Test shard specifications are validated."""
+        validate_arguments(self.create_args(shard="2/4"))
+
+        with pytest.raises(ValidationError):
+            validate_arguments(self.create_args(shard="4/2"))
+
 
 class TestUrlValidation:
     """Test URL validation functions."""
@@ -326,6 +333,29 @@ class TestMainFunction:
         assert exc_info.value.code == 1
         assert "❌ Error: Test error" in mock_stderr.getvalue()
 
+    @patch("cdnbestip.cli.parse_arguments")
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_main_merge_command(self, mock_stdout, mock_parse, tmp_path):
+        """Test the merge command combines shard result files."""
+        from cdnbestip.cli import main
+
+        header = "IP 地址,已发送,已接收,丢包率,平均延迟,下载速度 (MB/s),地区码"
+        rows = ["1.1.1.1,4,4,0.00,100.00,5.00,HKG", "1.0.0.1,4,4,0.00,90.00,8.00,NRT"]
+        shard_files = []
+        for index, row in enumerate(rows, start=1):
+            path = tmp_path / f"result.shard-{index}-of-2.csv"
+            path.write_text(f"{header}\n{row}\n", encoding="utf-8")
+            shard_files.append(str(path))
+        output = tmp_path / "result.csv"
+
+        argv = ["cdnbestip", "merge", "-o", str(output), *shard_files]
+        with patch.object(sys, "argv", argv):
+            main()
+
+        mock_parse.assert_not_called()
+        assert output.read_text(encoding="utf-8").splitlines()[1].startswith("1.0.0.1,")
+        assert "(2 IPs)" in mock_stdout.getvalue()
+
 
 class TestCLIErrorHandling:
     """Test CLI error handling scenarios."""
@@ -642,6 +672,11 @@ class TestConfigurationSummaryEdgeCases:
 class TestCLIIntegrationScenarios:
     """Test CLI integration scenarios."""
 
+    @pytest.fixture(autouse=True)
+    def run_in_tmp_path(self, tmp_path, monkeypatch):
+        """Keep the IP and result files written by the workflow out of the working tree."""
+        monkeypatch.chdir(tmp_path)
+
     @patch("cdnbestip.cli.load_config")
     @patch("cdnbestip.cli.SpeedTestManager")
     @patch("cdnbestip.cli.DNSManager")
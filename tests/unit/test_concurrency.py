@@ -0,0 +1,66 @@
+"""Unit tests for the bounded-concurrency helpers."""
+
+import asyncio
+
+import pytest
+
+from cdnbestip.concurrency import gather_bounded
+
+
+class TestGatherBounded:
+    """Test running coroutines over items with a concurrency limit."""
+
+    def test_results_in_input_order(self):
+        """Test results keep the input order whatever order calls finish in."""
+
+        async def delayed(value):
+            await asyncio.sleep(0.01 * (5 - value))
+            return value * 2
+
+        assert asyncio.run(gather_bounded(delayed, range(5), 5)) == [0, 2, 4, 6, 8]
+
+    def test_concurrency_is_bounded(self):
+        """Test no more calls run at once than allowed and items are read lazily."""
+        running = 0
+        peak = 0
+        consumed = []
+
+        async def work(value):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return value
+
+        def items():
+            for value in range(20):
+                consumed.append(value)
+                yield value
+
+        assert asyncio.run(gather_bounded(work, items(), 3)) == list(range(20))
+        assert peak == 3
+        assert consumed == list(range(20))
+
+    def test_empty_input(self):
+        """Test no items give no results."""
+
+        async def work(value):
+            return value
+
+        assert asyncio.run(gather_bounded(work, [], 4)) == []
+
+    def test_error_is_raised_after_started_calls_finish(self):
+        """Test the first error is raised and no further items are started."""
+        started = []
+
+        async def work(value):
+            started.append(value)
+            await asyncio.sleep(0.01)
+            if value == 1:
+                raise ValueError("bad item")
+            return value
+
+        with pytest.raises(ValueError, match="bad item"):
+            asyncio.run(gather_bounded(work, range(100), 2))
+        assert len(started) < 100
@@ -10,6 +10,7 @@ sys.path.insert(0, "src")
 
 from cdnbestip.config import Config, load_config_from_env, merge_config
 from cdnbestip.exceptions import ConfigurationError
+from cdnbestip.source_registry import SourceRegistry
 
 
 class TestConfig:
@@ -119,6 +120,112 @@ class TestConfig:
             config = Config(ip_data_url=source)
             assert config.ip_data_url == source
 
+    def test_multiple_ip_sources_valid(self):
+        """Test comma-separated IP sources are validated individually."""
+        config = Config(ip_data_url="cf, https://mirror.example.com/extra.txt")
+        assert config.ip_data_url == "cf, https://mirror.example.com/extra.txt"
+
+        with pytest.raises(ConfigurationError, match="Invalid IP data URL: bogus"):
+            Config(ip_data_url="cf,bogus")
+
+    def test_plugin_ip_sources_valid(self):
+        """Test sources registered by plugins are accepted by name."""
+        registry = SourceRegistry(
+            builtin={"edge": {"url": "https://ranges.example.com/edge.txt", "type": "text"}},
+            use_entry_points=False,
+        )
+        with patch("cdnbestip.config.get_source_registry", return_value=registry):
+            config = Config(ip_data_url="EDGE")
+        assert config.ip_data_url == "EDGE"
+
+    def test_local_ip_sources_valid(self):
+        """Test file paths and file:// URLs are accepted as IP sources."""
+        config = Config(ip_data_url="cf,/data/curated.txt,file:///data/extra.txt")
+        assert config.ip_data_url == "cf,/data/curated.txt,file:///data/extra.txt"
+
+    def test_watch_requires_local_source(self):
+        """Test watch mode needs a local IP source file."""
+        config = Config(ip_data_url="/data/curated.txt", watch=True)
+        assert config.watch
+
+        with pytest.raises(ConfigurationError, match="Watch mode requires a local IP source"):
+            Config(ip_data_url="cf", watch=True)
+
+    def test_ip_filter_validation(self):
+        """Test IP filter expressions are validated."""
+        config = Config(ip_filter="service=CLOUDFRONT,region=ap-east-1")
+        assert config.ip_filter == "service=CLOUDFRONT,region=ap-east-1"
+
+        with pytest.raises(ConfigurationError, match="Invalid IP filter"):
+            Config(ip_filter="service")
+
+    def test_stratify_validation(self):
+        """Test stratified sampling settings are validated."""
+        config = Config(stratify_budget=500, stratify_allocation="equal")
+        assert config.stratify_budget == 500
+
+        with pytest.raises(ConfigurationError, match="Invalid stratified allocation"):
+            Config(stratify_budget=500, stratify_allocation="weighted")
+
+        with pytest.raises(ConfigurationError, match="cannot be combined"):
+            Config(stratify_budget=500, sample_count=1)
+
+    def test_engine_validation(self):
+        """Test probe engine settings are validated."""
+        config = Config(engine="tcp", probe_concurrency=5000, probe_count=2)
+        assert config.engine == "tcp"
+
+        with pytest.raises(ConfigurationError, match="Invalid engine"):
+            Config(engine="icmp")
+        with pytest.raises(ConfigurationError, match="Probe concurrency"):
+            Config(engine="tcp", probe_concurrency=0)
+        with pytest.raises(ConfigurationError, match="needs download tests"):
+            Config(engine="tcp", speed_threshold=2.0)
+        config = Config(engine="tcp", speed_threshold=2.0, download_count=10)
+        assert config.download_count == 10
+
+        with pytest.raises(ConfigurationError, match="--download-count"):
+            Config(engine="tcp", shortlist=20)
+        assert Config(shortlist=20).shortlist == 20
+
+        with pytest.raises(ConfigurationError, match="Download duration"):
+            Config(download_seconds=0)
+        with pytest.raises(ConfigurationError, match="Download byte budget"):
+            Config(download_bytes=-1)
+        with pytest.raises(ConfigurationError, match="Download tolerance"):
+            Config(download_tolerance=-0.05)
+        with pytest.raises(ConfigurationError, match="Download minimum duration"):
+            Config(download_min_seconds=0)
+
+    def test_parallel_validation(self):
+        """Test parallel cfst settings are validated."""
+        config = Config(parallel_shards=4, parallel_jobs=2)
+        assert (config.parallel_shards, config.parallel_jobs) == (4, 2)
+
+        with pytest.raises(ConfigurationError, match="Parallel shard count"):
+            Config(parallel_shards=0)
+        with pytest.raises(ConfigurationError, match="Parallel job limit"):
+            Config(parallel_jobs=-1)
+        with pytest.raises(ConfigurationError, match="--probe-concurrency"):
+            Config(engine="tcp", parallel_shards=2)
+
+    def test_shard_validation(self):
+        """Test shard specifications are validated and exclude DNS updates."""
+        config = Config(shard="2/4")
+        assert config.shard == "2/4"
+
+        with pytest.raises(ConfigurationError, match="Invalid shard"):
+            Config(shard="5/4")
+
+        with pytest.raises(ConfigurationError, match="cdnbestip merge"):
+            Config(
+                shard="1/2",
+                update_dns=True,
+                cloudflare_api_token="token",
+                domain="example.com",
+                prefix="cf",
+            )
+
     def test_valid_urls(self):
         """Test valid URL formats."""
         config = Config(
@@ -0,0 +1,91 @@
+"""Unit tests for the dead IP filter."""
+
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+from cdnbestip.dead_filter import DeadIPFilter
+from cdnbestip.exceptions import IPSourceError
+
+
+class TestDeadIPFilter:
+    """Test counting, aging and persistence of the dead IP filter."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.dead = DeadIPFilter(size_log2=16)
+
+    def test_dead_after_repeated_failures(self):
+        """Test a key is dead only once it reaches the threshold."""
+        self.dead.add("1.1.1.1")
+        assert "1.1.1.1" not in self.dead
+
+        self.dead.add("1.1.1.1")
+        assert "1.1.1.1" in self.dead
+        assert "1.1.1.2" not in self.dead
+
+    def test_counters_saturate(self):
+        """Test counters stop at their maximum."""
+        for _ in range(20):
+            self.dead.add("1.1.1.0/24")
+        assert self.dead.count("1.1.1.0/24") == 15
+
+    def test_aging_halves_counters(self):
+        """Test entries expire as their counters are halved."""
+        self.dead.update(["1.1.1.1"] * 3)
+        assert self.dead.count("1.1.1.1") == 3
+
+        self.dead.age(self.dead.last_aged + 24 * 3600)
+        assert self.dead.count("1.1.1.1") == 1
+        assert "1.1.1.1" not in self.dead
+
+    def test_aging_clears_after_many_periods(self):
+        """Test long idle periods empty the filter."""
+        self.dead.update(["1.1.1.1"] * 15)
+        self.dead.age(self.dead.last_aged + 10 * 24 * 3600)
+        assert self.dead.count("1.1.1.1") == 0
+
+    def test_save_and_load(self):
+        """Test the filter round-trips through its file."""
+        self.dead.update(["1.1.1.1", "1.1.1.1"])
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "dead.bin"
+            self.dead.save(path)
+            loaded = DeadIPFilter.load(path)
+
+        assert loaded.size_log2 == 16
+        assert "1.1.1.1" in loaded
+
+    def test_concurrent_saves(self):
+        """Test saves from several threads never share a temporary file."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "dead.bin"
+            threads = [threading.Thread(target=self.dead.save, args=(path,)) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            assert [entry.name for entry in Path(temp_dir).iterdir()] == ["dead.bin"]
+            assert DeadIPFilter.load(path).size_log2 == 16
+
+    def test_load_missing_or_invalid_file(self):
+        """Test unusable files give an empty filter."""
+        assert DeadIPFilter.load("/nonexistent/dead.bin").count("1.1.1.1") == 0
+
+        with tempfile.NamedTemporaryFile(suffix=".bin", delete=False) as f:
+            f.write(b"garbage")
+            path = f.name
+
+        try:
+            assert DeadIPFilter.load(path, threshold=1).count("1.1.1.1") == 0
+        finally:
+            Path(path).unlink(missing_ok=True)
+
+    def test_invalid_threshold(self):
+        """Test thresholds beyond the counter range are rejected."""
+        with pytest.raises(IPSourceError, match="threshold"):
+            DeadIPFilter(threshold=16)
@@ -0,0 +1,232 @@
+"""Unit tests for the built-in download speed tester."""
+
+import socket
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from cdnbestip.config import Config
+from cdnbestip.download import (
+    DownloadMeasurement,
+    DownloadTester,
+    colo_from_headers,
+    rate_converged,
+)
+from cdnbestip.exceptions import SpeedTestError
+from cdnbestip.probe import LatencySample
+from cdnbestip.speedtest import SpeedTestManager
+
+BODY_SIZE = 256 * 1024
+
+
+class SpeedFileHandler(BaseHTTPRequestHandler):
+    """Serves a test file and records the Host header of each request."""
+
+    protocol_version = "HTTP/1.1"
+    hosts: list[str] = []
+
+    def do_GET(self):
+        SpeedFileHandler.hosts.append(self.headers.get("Host"))
+        if self.path.startswith("/stream"):
+            self._stream()
+            return
+        if not self.path.startswith("/file"):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Length", str(BODY_SIZE))
+        self.send_header("CF-RAY", "8a1b2c3d4e5f6a7b-HKG")
+        self.end_headers()
+        self.wfile.write(b"\0" * BODY_SIZE)
+
+    def _stream(self):
+        """Send a body at a steady pace until the client goes away."""
+        self.send_response(200)
+        self.send_header("Connection", "close")
+        self.end_headers()
+        deadline = time.monotonic() + 10
+        try:
+            while time.monotonic() < deadline:
+                self.wfile.write(b"\0" * 16 * 1024)
+                time.sleep(0.01)
+        except OSError:
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestDownloadTester:
+    """Test downloads pinned to an address against a local HTTP server."""
+
+    def setup_method(self):
+        """Start a local HTTP server."""
+        SpeedFileHandler.hosts = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), SpeedFileHandler)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def teardown_method(self):
+        """Stop the local HTTP server."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_download_from_address(self):
+        """Test the body is streamed from the given IP with the URL's Host header."""
+        tester = DownloadTester(url="http://speed.example.com/file", port=self.port, duration=5)
+        measurement = tester.measure(["127.0.0.1"])[0]
+
+        assert measurement.error is None
+        assert measurement.bytes == BODY_SIZE
+        assert measurement.speed > 0
+        assert measurement.colo == "HKG"
+        assert SpeedFileHandler.hosts == [f"speed.example.com:{self.port}"]
+
+    def test_byte_budget(self):
+        """Test downloads stop once the byte budget is reached."""
+        tester = DownloadTester(
+            url=f"http://speed.example.com:{self.port}/file", max_bytes=64 * 1024
+        )
+        measurement = tester.measure(["127.0.0.1"])[0]
+
+        assert 64 * 1024 <= measurement.bytes < BODY_SIZE
+
+    def test_http_error_and_refused_connection(self):
+        """Test failed downloads report an error and no speed."""
+        tester = DownloadTester(url="http://speed.example.com/missing", port=self.port)
+        missing = tester.measure(["127.0.0.1"])[0]
+        assert missing.error == "HTTP 404"
+        assert missing.speed == 0.0
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            closed_port = sock.getsockname()[1]
+        refused = DownloadTester(url="http://speed.example.com/file", port=closed_port)
+        measurement = refused.measure(["127.0.0.1"])[0]
+        assert measurement.error
+        assert measurement.speed == 0.0
+
+    def test_several_addresses(self):
+        """Test measurements come back in input order."""
+        tester = DownloadTester(
+            url="http://speed.example.com/file", port=self.port, concurrency=2
+        )
+        measurements = tester.measure(["127.0.0.1", "127.0.0.1", "127.0.0.1"])
+
+        assert [measurement.bytes for measurement in measurements] == [BODY_SIZE] * 3
+
+    def test_tls_uses_url_host_for_sni(self):
+        """Test HTTPS connects to the address while presenting the URL host."""
+        tester = DownloadTester(url="https://speed.example.com/file?bytes=1")
+
+        with patch("asyncio.open_connection", side_effect=OSError("refused")) as mock_open:
+            measurement = tester.measure(["1.1.1.1"])[0]
+
+        assert measurement.error == "refused"
+        args, kwargs = mock_open.call_args
+        assert args == ("1.1.1.1", 443)
+        assert kwargs["server_hostname"] == "speed.example.com"
+        request = tester._request()
+        assert request.startswith(b"GET /file?bytes=1 HTTP/1.1\r\nHost: speed.example.com\r\n")
+
+    def test_download_stops_once_rate_converges(self):
+        """Test a steady download ends early with a tolerance and runs in full without."""
+        url = "http://speed.example.com/stream"
+        adaptive = DownloadTester(
+            url=url, port=self.port, duration=5, tolerance=0.2, min_duration=0.5, window=0.1
+        )
+        measurement = adaptive.measure(["127.0.0.1"])[0]
+        assert measurement.error is None
+        assert 0.5 <= measurement.seconds < 3
+        assert measurement.speed > 0
+
+        fixed = DownloadTester(url=url, port=self.port, duration=1)
+        assert fixed.measure(["127.0.0.1"])[0].seconds >= 0.9
+
+    def test_invalid_settings(self):
+        """Test invalid URLs and budgets are rejected."""
+        with pytest.raises(SpeedTestError, match="Invalid download test URL"):
+            DownloadTester(url="ftp://example.com/file")
+        with pytest.raises(SpeedTestError, match="duration"):
+            DownloadTester(duration=0)
+        with pytest.raises(SpeedTestError, match="concurrency"):
+            DownloadTester(concurrency=0)
+        with pytest.raises(SpeedTestError, match="tolerance"):
+            DownloadTester(tolerance=-0.1)
+        with pytest.raises(SpeedTestError, match="minimum duration"):
+            DownloadTester(min_duration=0)
+
+
+class TestDownloadHelpers:
+    """Test measurement helpers."""
+
+    def test_speed_in_megabytes(self):
+        """Test speed is reported in MB/s like cfst."""
+        assert DownloadMeasurement("1.1.1.1", 10 * 1024 * 1024, 2.0).speed == 5.0
+        assert DownloadMeasurement("1.1.1.1", 0, 0.0).speed == 0.0
+
+    def test_rate_converged(self):
+        """Test the confidence interval rule, ignoring the ramp-up window."""
+        steady = [1.0] + [100.0, 102.0, 98.0, 101.0, 99.0]
+        assert rate_converged(steady, 0.05)
+        assert not rate_converged(steady[:-1], 0.05)  # Too few windows
+
+        noisy = [100.0, 40.0, 160.0, 70.0, 130.0, 90.0]
+        assert not rate_converged(noisy, 0.05)
+        assert rate_converged(noisy, 0.5)
+        assert not rate_converged([0.0] * 6, 0.05)
+
+    def test_colo_from_headers(self):
+        """Test colos are read from Cloudflare and CloudFront headers."""
+        assert colo_from_headers({"cf-ray": "8a1b2c3d4e5f6a7b-sjc"}) == "SJC"
+        assert colo_from_headers({"x-amz-cf-pop": "HKG62-C1"}) == "HKG"
+        assert colo_from_headers({}) is None
+
+
+class TestTCPEngineDownloads:
+    """Test the tcp engine download tests the lowest-latency addresses."""
+
+    def test_download_phase_writes_tested_addresses(self):
+        """Test only download-tested addresses are written, fastest first."""
+        config = Config(engine="tcp", download_count=2, speed_threshold=1.0)
+        manager = SpeedTestManager(config)
+        samples = [
+            LatencySample("10.0.0.1", 4, 4, 10.0),
+            LatencySample("10.0.0.2", 4, 4, 20.0),
+            LatencySample("10.0.0.3", 4, 4, 30.0),
+        ]
+        measurements = [
+            DownloadMeasurement("10.0.0.1", 1024 * 1024, 1.0, colo="HKG"),
+            DownloadMeasurement("10.0.0.2", 4 * 1024 * 1024, 1.0, colo="NRT"),
+        ]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ip_file = Path(temp_dir) / "ips.txt"
+            ip_file.write_text("10.0.0.0/24\n")
+            output = Path(temp_dir) / "result.csv"
+
+            with (
+                patch("cdnbestip.speedtest.TCPProber.probe", return_value=samples),
+                patch.object(manager, "run_download_test", return_value=measurements) as mock_dl,
+            ):
+                manager.run_speed_test(str(ip_file), str(output))
+
+            mock_dl.assert_called_once_with(["10.0.0.1", "10.0.0.2"])
+            shortlist = (Path(temp_dir) / "ips.shortlist.txt").read_text().split()
+            assert shortlist == ["10.0.0.1", "10.0.0.2"]
+            results = manager.parse_results(str(output))
+
+        assert [(result.ip, result.speed, result.data_center) for result in results] == [
+            ("10.0.0.2", 4.0, "NRT"),
+            ("10.0.0.1", 1.0, "HKG"),
+        ]
+        assert not manager.lists_all_responders()
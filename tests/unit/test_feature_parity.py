@@ -74,7 +74,7 @@ class TestIPSourceParity:
         config = Config(ip_data_url="gc")
         ip_manager = IPSourceManager(config)
 
-        with patch("requests.get") as mock_get:
+        with patch("requests.Session.get") as mock_get:
             mock_get.return_value.json.return_value = gcore_json
             mock_get.return_value.status_code = 200
 
@@ -0,0 +1,93 @@
+"""Unit tests for the shared HTTP session."""
+
+from requests.adapters import HTTPAdapter
+
+from cdnbestip.config import Config
+from cdnbestip.http_session import (
+    RETRY_TOTAL,
+    close_shared_sessions,
+    create_session,
+    get_proxy_config,
+    get_shared_session,
+)
+from cdnbestip.ip_sources import IPSourceManager
+from cdnbestip.speedtest import SpeedTestManager
+
+
+class TestHTTPSession:
+    """Test session creation and sharing."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        close_shared_sessions()
+
+    def teardown_method(self):
+        """Clean up shared sessions."""
+        close_shared_sessions()
+
+    def test_get_proxy_config(self):
+        """Test proxy URL conversion for both schemes."""
+        assert get_proxy_config("http://proxy:8080") == {
+            "http": "http://proxy:8080",
+            "https": "http://proxy:8080",
+        }
+
+    def test_create_session_pool_and_retries(self):
+        """Test sessions mount a pooled adapter with a retry policy."""
+        session = create_session(Config())
+        adapter = session.get_adapter("https://api.github.com/")
+        assert isinstance(adapter, HTTPAdapter)
+        assert adapter.max_retries.total == RETRY_TOTAL
+        assert not session.proxies
+
+    def test_create_session_accepts_compression(self):
+        """Test sessions request compressed transfer."""
+        session = create_session(Config())
+        assert "gzip" in session.headers["Accept-Encoding"]
+
+    def test_create_session_with_proxy(self):
+        """Test proxy settings are applied to the session."""
+        config = Config(proxy_url="http://proxy.example.com:8080")
+        session = create_session(config)
+        assert session.proxies["https"] == "http://proxy.example.com:8080"
+
+    def test_configured_proxy_overrides_environment(self, monkeypatch):
+        """Test the configured proxy wins over proxy environment variables."""
+        monkeypatch.setenv("HTTPS_PROXY", "http://env-proxy:1")
+        monkeypatch.setenv("HTTP_PROXY", "http://env-proxy:1")
+        session = create_session(Config(proxy_url="http://proxy.example.com:8080"))
+
+        settings = session.merge_environment_settings(
+            "https://www.cloudflare.com/ips-v4", {}, None, None, None
+        )
+        assert settings["proxies"]["https"] == "http://proxy.example.com:8080"
+
+    def test_environment_proxy_used_without_configured_proxy(self, monkeypatch):
+        """Test proxy environment variables still apply when no proxy is configured."""
+        monkeypatch.setenv("HTTPS_PROXY", "http://env-proxy:1")
+        session = create_session(Config())
+
+        settings = session.merge_environment_settings(
+            "https://www.cloudflare.com/ips-v4", {}, None, None, None
+        )
+        assert settings["proxies"]["https"] == "http://env-proxy:1"
+
+    def test_managers_share_session(self):
+        """Test managers with the same proxy settings reuse one session."""
+        config = Config()
+        ip_manager = IPSourceManager(config)
+        speedtest_manager = SpeedTestManager(config)
+        assert ip_manager.session is speedtest_manager.session
+        assert ip_manager.session is get_shared_session(Config())
+
+    def test_separate_session_per_proxy(self):
+        """Test a different proxy gets its own session."""
+        direct = get_shared_session(Config())
+        proxied = get_shared_session(Config(proxy_url="http://proxy.example.com:8080"))
+        assert direct is not proxied
+
+    def test_injected_session(self):
+        """Test an explicitly injected session is used."""
+        session = create_session()
+        manager = IPSourceManager(Config(), session=session)
+        assert manager.session is session
@@ -1,14 +1,20 @@
 """Unit tests for IP data source management."""
 
+import os
 import tempfile
 from pathlib import Path
 from unittest.mock import Mock, patch
 
 import pytest
+import requests
 
 from cdnbestip.config import Config
 from cdnbestip.exceptions import IPSourceError
 from cdnbestip.ip_sources import IPSourceManager
+from cdnbestip.ipset import IPIntervalSet
+from cdnbestip.local_source import read_local_list
+from cdnbestip.models import SpeedTestResult
+from cdnbestip.source_registry import SourceRegistry
 
 
 class TestIPSourceManager:
@@ -44,25 +50,11 @@ class TestIPSourceManager:
         expected = ["192.168.1.0/24", "192.168.2.0/24", "10.0.0.0/8"]
         assert result == expected
 
-    def test_process_json_response_simple_array(self):
-        """Test processing JSON response with simple array."""
-        json_data = {"addresses": ["192.168.1.1", "192.168.1.2"]}
-        source_info = {"json_path": "addresses"}
-        result = self.manager._process_json_response(json_data, source_info)
-        assert result == ["192.168.1.1", "192.168.1.2"]
-
-    def test_process_json_response_object_array(self):
-        """Test processing JSON response with object array."""
-        json_data = {"prefixes": [{"ip_prefix": "192.168.1.0/24"}, {"ip_prefix": "192.168.2.0/24"}]}
-        source_info = {"json_path": "prefixes", "json_field": "ip_prefix"}
-        result = self.manager._process_json_response(json_data, source_info)
-        assert result == ["192.168.1.0/24", "192.168.2.0/24"]
-
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_download_ip_list_text_source(self, mock_get):
         """Test downloading from text source."""
         mock_response = Mock()
-        mock_response.text = "192.168.1.0/24\n192.168.2.0/24"
+        mock_response.iter_content.return_value = [b"192.168.1.0/24\n192.168.2.0/24"]
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
 
@@ -92,3 +84,658 @@ class TestIPSourceManager:
             assert lines == ip_list
         finally:
             Path(temp_path).unlink(missing_ok=True)
+
+    def test_prepare_candidates_without_sampling(self):
+        """Test prefixes are collapsed but not expanded when sampling is disabled."""
+        ip_list = ["104.16.0.0/22", "104.16.4.0/22", "104.16.1.0/24", "1.1.1.1"]
+        assert self.manager.prepare_candidates(ip_list) == ["1.1.1.1", "104.16.0.0/21"]
+
+    def test_prepare_candidates_with_exclusions(self):
+        """Test ranges from the exclusion file are removed before sampling."""
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
+            f.write("104.16.1.0/24\n")
+            exclude_path = f.name
+
+        try:
+            self.config.exclude_file = exclude_path
+            self.config.sample_count = 1
+            result = self.manager.prepare_candidates(["104.16.0.0/22"])
+            assert result == ["104.16.0.128", "104.16.2.128", "104.16.3.128"]
+        finally:
+            Path(exclude_path).unlink(missing_ok=True)
+
+    def test_prepare_candidates_with_sampling(self):
+        """Test prefixes are expanded into addresses when sampling is enabled."""
+        self.config.sample_count = 1
+        result = self.manager.prepare_candidates(["104.16.0.0/23"])
+        assert result == ["104.16.0.128", "104.16.1.128"]
+
+    def test_prepare_candidates_samples_ipv6_without_sample_count(self):
+        """Test IPv6 prefixes are always sampled while IPv4 prefixes are kept."""
+        self.config.sample_max_blocks_v6 = 2
+        result = self.manager.prepare_candidates(["104.16.0.0/22", "2606:4700::/32"])
+        assert result == ["104.16.0.0/22", "2606:4700:0:8000::", "2606:4700:8000:8000::"]
+
+    def test_record_and_load_good_prefixes(self):
+        """Test qualifying result addresses are remembered as sampling blocks."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            self.manager.record_good_results(["104.16.5.7", "2606:4700:10::1", "invalid"])
+            assert sorted(self.manager.load_good_prefixes()) == [
+                "104.16.5.0/24",
+                "2606:4700:10::/48",
+            ]
+
+    def test_good_prefixes_expire(self):
+        """Test good blocks older than the retention window are ignored."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            self.manager._get_good_prefixes_file().write_text('{"104.16.5.0/24": 0}')
+            assert self.manager.load_good_prefixes() == []
+
+    def test_select_delta(self):
+        """Test delta selection keeps added ranges and known-good blocks only."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            self.manager.record_good_results(["104.16.0.9"])
+
+            previous = IPIntervalSet.from_prefixes(["104.16.0.0/20"])
+            result = self.manager.select_delta(previous, ["104.16.0.0/20", "172.64.0.0/24"])
+            assert result == ["104.16.0.0/24", "172.64.0.0/24"]
+
+    def test_select_delta_falls_back_to_full_list(self):
+        """Test an unchanged list without good history is probed in full."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            previous = IPIntervalSet.from_prefixes(["104.16.0.0/20"])
+            assert self.manager.select_delta(previous, ["104.16.0.0/20"]) == ["104.16.0.0/20"]
+
+    @patch("requests.Session.get")
+    def test_download_with_delta(self, mock_get):
+        """Test a delta download compares against the cache from before the refresh."""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.iter_content.return_value = [b"104.16.0.0/20\n172.64.0.0/24"]
+        mock_response.headers = {}
+        mock_get.return_value = mock_response
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            self.manager._get_cache_file("cf").write_text("104.16.0.0/20\n")
+            self.config.delta = True
+            output_file = str(Path(temp_dir) / "ips.txt")
+
+            self.manager.download_ip_list("cf", output_file, force_refresh=True)
+
+            assert Path(output_file).read_text().split() == ["172.64.0.0/24"]
+            # The cache now holds the full refreshed list
+            assert self.manager._get_cache_file("cf").read_text().split() == [
+                "104.16.0.0/20",
+                "172.64.0.0/24",
+            ]
+
+    def test_record_and_skip_dead_candidates(self):
+        """Test unresponsive candidates are skipped after repeated failures."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            ip_file = Path(temp_dir) / "ips.txt"
+            ip_file.write_text("104.16.0.128\n104.16.1.128\n104.16.2.0/23\n")
+
+            for _ in range(2):
+                recorded = self.manager.record_dead_candidates(str(ip_file), ["104.16.0.128"])
+                # 104.16.1.128 plus the 104.16.1.0, 104.16.2.0 and 104.16.3.0 /24s
+                assert recorded == 4
+
+            self.config.skip_dead = True
+            candidates = self.manager.prepare_candidates(["104.16.0.0/22"])
+            assert candidates == ["104.16.0.0/24"]
+
+            self.config.sample_count = 1
+            candidates = self.manager.prepare_candidates(["104.16.0.0/22"])
+            assert candidates == ["104.16.0.128"]
+
+    def test_skip_dead_disabled_by_default(self):
+        """Test the dead filter is not consulted unless enabled."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            ip_file = Path(temp_dir) / "ips.txt"
+            ip_file.write_text("104.16.0.0/24\n")
+            self.manager.record_dead_candidates(str(ip_file), [])
+            self.manager.record_dead_candidates(str(ip_file), [])
+
+            assert self.manager.prepare_candidates(["104.16.0.0/24"]) == ["104.16.0.0/24"]
+
+    def test_prepare_candidates_sharded(self):
+        """Test each shard keeps a disjoint share of the candidate blocks."""
+        candidates = ["104.16.0.0/22", "172.64.0.1", "not-an-ip"]
+        shares = []
+        for shard in ("1/2", "2/2"):
+            self.config.shard = shard
+            shares.append(self.manager.prepare_candidates(candidates))
+
+        assert "not-an-ip" in shares[0]
+        assert "not-an-ip" not in shares[1]
+        assert sorted(shares[0] + shares[1]) == sorted(
+            [f"104.16.{i}.0/24" for i in range(4)] + ["172.64.0.1", "not-an-ip"]
+        )
+
+    def test_prepare_candidates_stratified_by_colo(self):
+        """Test a stratified budget uses the known colo of each prefix."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            self.manager._get_prefix_colos_file().write_text(
+                '{"104.16.0.0/15": "HKG", "104.18.0.0/15": "SJC", "bogus": "X"}'
+            )
+            self.config.stratify_budget = 4
+            self.config.stratify_allocation = "equal"
+
+            candidates = self.manager.prepare_candidates(["104.16.0.0/14"])
+
+            assert candidates == ["104.16.128.0", "104.17.128.0", "104.18.128.0", "104.19.128.0"]
+
+    def test_build_prefix_index_from_caches(self):
+        """Test the prefix index covers the cached lists of all sources."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            self.manager._get_cache_file("cf").write_text("104.16.0.0/13\n")
+            self.manager._get_cache_file("gc").write_text("104.16.0.0/13\n92.223.0.0/16\n")
+
+            index = self.manager.build_prefix_index("cf,gc,aws")
+
+            assert index.lookup("104.17.0.1") == "104.16.0.0/13"
+            assert index.sources("104.16.0.0/13") == ["cf", "gc"]
+            assert index.sources("92.223.0.0/16") == ["gc"]
+
+    def test_fetch_local_source(self):
+        """Test local files are read once and again only after they change."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            path = Path(temp_dir) / "curated.txt"
+            path.write_text("104.16.0.0/24\n")
+
+            with patch("cdnbestip.ip_sources.read_local_list", wraps=read_local_list) as read:
+                assert self.manager.fetch_ip_list(str(path)) == ["104.16.0.0/24"]
+                assert self.manager.fetch_ip_list(f"file://{path}") == ["104.16.0.0/24"]
+                assert read.call_count == 1
+
+                path.write_text("104.16.0.0/24\n104.17.0.0/24\n")
+                assert self.manager.fetch_ip_list(str(path)) == ["104.16.0.0/24", "104.17.0.0/24"]
+                assert read.call_count == 2
+
+            # The last version read is kept for delta refreshes and attribution
+            index = self.manager.build_prefix_index(str(path))
+            assert index.lookup("104.17.0.1") == "104.17.0.0/24"
+
+    def test_close_stops_local_source_watchers(self):
+        """Test closing the manager closes the watchers kept for local sources."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "curated.txt"
+            path.write_text("104.16.0.0/24\n")
+
+            with IPSourceManager(self.config) as manager:
+                manager.cache_dir = Path(temp_dir)
+                manager.fetch_ip_list(str(path))
+                watcher = manager._local_lists[path][0]
+                with patch.object(watcher, "close", wraps=watcher.close) as close:
+                    manager.close()
+                    close.assert_called_once()
+            assert manager._local_lists == {}
+
+            # The file is read again after closing
+            assert manager.fetch_ip_list(str(path)) == ["104.16.0.0/24"]
+            manager.close()
+
+    def test_fetch_missing_local_source(self):
+        """Test a missing local file raises IPSourceError."""
+        with pytest.raises(IPSourceError, match="IP list file not found"):
+            self.manager.fetch_ip_list("/nonexistent/curated.txt")
+
+    def test_local_sources_newer_than(self):
+        """Test local source modification times are compared with a written file."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "curated.txt"
+            ip_file = Path(temp_dir) / "ip_list.txt"
+            path.write_text("104.16.0.0/24\n")
+            ip_file.write_text("104.16.0.1\n")
+            os.utime(path, (1000, 1000))
+
+            spec = f"cf,{path}"
+            assert self.manager.get_local_paths(spec) == [path]
+            assert not self.manager.local_sources_newer_than(spec, str(ip_file))
+
+            os.utime(path, None)
+            os.utime(ip_file, (1000, 1000))
+            assert self.manager.local_sources_newer_than(spec, str(ip_file))
+            assert not self.manager.local_sources_newer_than("cf", str(ip_file))
+            assert self.manager.watch_local_sources("cf") is None
+
+    def test_record_prefix_stats(self):
+        """Test per-prefix aggregates are merged into the stored statistics."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            self.manager.record_prefix_stats({"104.16.0.0/13": {"count": 2, "best_speed": 5.0}})
+            self.manager.record_prefix_stats({"172.64.0.0/13": {"count": 1, "best_speed": 1.0}})
+
+            stats = self.manager.load_prefix_stats()
+            assert sorted(stats) == ["104.16.0.0/13", "172.64.0.0/13"]
+            assert stats["104.16.0.0/13"]["best_speed"] == 5.0
+            assert "updated" in stats["172.64.0.0/13"]
+
+    def test_learn_prefix_colos(self):
+        """Test colos are learned per block and per source prefix majority."""
+        results = [
+            SpeedTestResult("104.16.0.10", 443, "HKG", "HKG", "HKG", 5.0, 20.0, "104.16.0.0/13"),
+            SpeedTestResult("104.17.0.10", 443, "HKG", "HKG", "HKG", 5.0, 20.0, "104.16.0.0/13"),
+            SpeedTestResult("104.18.0.10", 443, "nrt", "NRT", "NRT", 5.0, 20.0, "104.16.0.0/13"),
+            SpeedTestResult("104.19.0.10", 443, "N/A", "", "", 0.0, 0.0, "104.16.0.0/13"),
+        ]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            assert self.manager.learn_prefix_colos(results) == 3
+
+            assert self.manager.load_prefix_colos() == {
+                "104.16.0.0/13": "HKG",
+                "104.16.0.0/24": "HKG",
+                "104.17.0.0/24": "HKG",
+                "104.18.0.0/24": "NRT",
+            }
+
+    @patch("requests.Session.get")
+    def test_fetch_plugin_source_with_parser(self, mock_get):
+        """Test plugin sources are parsed by their own parser and cached."""
+        registry = SourceRegistry(
+            builtin={
+                "edge": {
+                    "url": "https://ranges.example.com/edge.bin",
+                    "type": "custom",
+                    "parser": lambda chunks: b"".join(chunks).decode().split(";"),
+                }
+            },
+            use_entry_points=False,
+        )
+        manager = IPSourceManager(self.config, registry=registry)
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.headers = {}
+        mock_response.iter_content.return_value = [b"1.1.1.0/24;", b"1.0.0.0/24;"]
+        mock_get.return_value = mock_response
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manager.cache_dir = Path(temp_dir)
+            assert manager.fetch_ip_list("edge", force_refresh=True) == [
+                "1.1.1.0/24",
+                "1.0.0.0/24",
+            ]
+            assert manager._get_cache_file("edge").read_text() == "1.1.1.0/24\n1.0.0.0/24\n"
+
+        assert mock_get.call_args[0][0].endswith("ranges.example.com/edge.bin")
+        assert manager.parse_sources("EDGE,cf") == ["edge", "cf"]
+
+    def test_ipv6_sources_defined(self):
+        """Test IPv6 variants of the predefined sources."""
+        assert IPSourceManager.IP_SOURCES["cf6"]["url"] == "https://www.cloudflare.com/ips-v6"
+        assert IPSourceManager.IP_SOURCES["gc6"]["json_path"] == "addresses_v6"
+        assert IPSourceManager.IP_SOURCES["aws6"]["json_field"] == "ipv6_prefix"
+
+    @patch("requests.Session.get")
+    def test_download_saves_validators(self, mock_get):
+        """Test ETag and Last-Modified validators are stored next to the cache."""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.iter_content.return_value = [b"192.168.1.0/24"]
+        mock_response.headers = {"ETag": '"abc"', "Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"}
+        mock_get.return_value = mock_response
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            output_file = str(Path(temp_dir) / "ips.txt")
+
+            self.manager.download_ip_list("cf", output_file, force_refresh=True)
+
+            cache_file = self.manager._get_cache_file("cf")
+            meta = self.manager._load_cache_meta(cache_file)
+            assert meta == {"etag": '"abc"', "last_modified": "Wed, 01 Jan 2025 00:00:00 GMT"}
+
+    @patch("requests.Session.get")
+    def test_download_not_modified_uses_cache(self, mock_get):
+        """Test a 304 response refreshes the cache without reparsing."""
+        mock_response = Mock()
+        mock_response.status_code = 304
+        mock_get.return_value = mock_response
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            cache_file = self.manager._get_cache_file("cf")
+            cache_file.write_text("10.0.0.0/24\n")
+            self.manager._save_cache_meta(cache_file, {"etag": '"abc"'})
+            output_file = str(Path(temp_dir) / "ips.txt")
+
+            self.manager.download_ip_list("cf", output_file, force_refresh=True)
+
+            headers = mock_get.call_args.kwargs["headers"]
+            assert headers["If-None-Match"] == '"abc"'
+            assert Path(output_file).read_text() == "10.0.0.0/24\n"
+            mock_response.raise_for_status.assert_not_called()
+
+    def test_cache_ttl_per_source_and_override(self):
+        """Test per-source cache TTLs and the configured override."""
+        assert self.manager.get_cache_ttl("cf") == 168
+        assert self.manager.get_cache_ttl("aws") == 12
+        assert self.manager.get_cache_ttl("https://example.com/ips.txt") == 24
+
+        self.config.cache_ttl_hours = 2
+        assert self.manager.get_cache_ttl("cf") == 2
+
+    def test_process_text_stream_tees_cache(self):
+        """Test lines split across chunks are parsed and written to the cache in one pass."""
+        chunks = [b"# ranges\n104.16.", b"0.0/20\r\n\n172.64", b".0.0/24\nbogus"]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_file = Path(temp_dir) / "ip_list_cf.txt"
+            cache_file.write_text("10.0.0.0/8\n")
+
+            ip_list, cached = self.manager._process_text_stream(iter(chunks), cache_file)
+
+            assert ip_list == ["104.16.0.0/20", "172.64.0.0/24", "bogus"]
+            assert cached
+            assert cache_file.read_text() == "104.16.0.0/20\n172.64.0.0/24\nbogus\n"
+            assert os.listdir(temp_dir) == ["ip_list_cf.txt"]
+
+    def test_process_text_stream_keeps_cache_on_error(self):
+        """Test a failed stream leaves the previous cache entry in place."""
+
+        def chunks():
+            yield b"104.16.0.0/20\n"
+            raise requests.ConnectionError("reset")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_file = Path(temp_dir) / "ip_list_cf.txt"
+            cache_file.write_text("10.0.0.0/8\n")
+
+            with pytest.raises(requests.ConnectionError):
+                self.manager._process_text_stream(chunks(), cache_file)
+
+            assert cache_file.read_text() == "10.0.0.0/8\n"
+            assert os.listdir(temp_dir) == ["ip_list_cf.txt"]
+
+    def test_process_text_stream_packed_cache(self):
+        """Test packed caches are left to the caller."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_file = Path(temp_dir) / "ip_list_cf.bin"
+            ip_list, cached = self.manager._process_text_stream([b"1.1.1.0/24\n"], cache_file)
+
+            assert ip_list == ["1.1.1.0/24"]
+            assert not cached
+            assert not cache_file.exists()
+
+    @patch("requests.Session.get")
+    def test_expired_cache_downloaded_without_stale_mode(self, mock_get):
+        """Test an expired cache is downloaded again before use by default."""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.headers = {}
+        mock_response.iter_content.return_value = [b"10.0.1.0/24\n"]
+        mock_get.return_value = mock_response
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            cache_file = self.manager._get_cache_file("cf")
+            cache_file.write_text("10.0.0.0/24\n")
+            os.utime(cache_file, (0, 0))
+
+            assert self.manager.fetch_ip_list("cf") == ["10.0.1.0/24"]
+            mock_get.assert_called_once()
+
+    @patch("requests.Session.get")
+    def test_stale_while_revalidate(self, mock_get):
+        """Test an expired cache is served immediately and refreshed in background."""
+        self.config.stale_while_revalidate = True
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.headers = {}
+        mock_response.iter_content.return_value = [b"10.0.1.0/24\n"]
+        mock_get.return_value = mock_response
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            cache_file = self.manager._get_cache_file("cf")
+            cache_file.write_text("10.0.0.0/24\n")
+            os.utime(cache_file, (0, 0))
+
+            assert self.manager.fetch_ip_list("cf") == ["10.0.0.0/24"]
+
+            self.manager.wait_for_revalidation(timeout=5)
+            mock_get.assert_called_once()
+            assert cache_file.read_text() == "10.0.1.0/24\n"
+            assert self.manager._is_cache_valid(cache_file, self.manager.get_cache_ttl("cf"))
+
+    @patch("requests.Session.get")
+    def test_download_unchanged_sync_token_keeps_cache(self, mock_get):
+        """Test an unchanged AWS sync token skips rewriting the cache."""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.headers = {}
+        mock_response.iter_content.return_value = [
+            b'{"syncToken": "1700000000", "prefixes": [{"ip_prefix": "192.168.1.0/24"}]}'
+        ]
+        mock_get.return_value = mock_response
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            cache_file = self.manager._get_cache_file("aws")
+            cache_file.write_text("10.0.0.0/24\n")
+            self.manager._save_cache_meta(cache_file, {"sync_token": "1700000000"})
+            output_file = str(Path(temp_dir) / "ips.txt")
+
+            self.manager.download_ip_list("aws", output_file, force_refresh=True)
+
+            assert cache_file.read_text() == "10.0.0.0/24\n"
+            assert Path(output_file).read_text() == "10.0.0.0/24\n"
+
+    @patch("requests.Session.get")
+    def test_download_json_source_streams_body(self, mock_get):
+        """Test JSON sources are parsed from the streamed response body."""
+        body = b'{"syncToken": "1", "prefixes": [{"ip_prefix": "10.0.0.0/24"}, {"ip_prefix": "10.0.1.0/24"}]}'
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.headers = {}
+        mock_response.iter_content.return_value = [body[i : i + 7] for i in range(0, len(body), 7)]
+        mock_get.return_value = mock_response
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            output_file = str(Path(temp_dir) / "ips.txt")
+
+            self.manager.download_ip_list("aws", output_file, force_refresh=True)
+
+            assert Path(output_file).read_text() == "10.0.0.0/23\n"
+            assert mock_get.call_args.kwargs["stream"] is True
+            mock_response.json.assert_not_called()
+
+    def test_process_json_stream_with_filter(self):
+        """Test the configured IP filter applies to streamed JSON responses."""
+        self.config.ip_filter = "service=CLOUDFRONT"
+        body = (
+            b'{"prefixes": [{"ip_prefix": "10.0.0.0/24", "service": "AMAZON"}, '
+            b'{"ip_prefix": "10.0.1.0/24", "service": "CLOUDFRONT"}]}'
+        )
+        source_info = {"json_path": "prefixes", "json_field": "ip_prefix"}
+        chunks = [body[i : i + 9] for i in range(0, len(body), 9)]
+
+        ip_list, _ = self.manager._process_json_stream(chunks, source_info)
+        assert ip_list == ["10.0.1.0/24"]
+
+    def test_filtered_source_uses_separate_cache(self):
+        """Test filtered JSON sources do not share the unfiltered cache file."""
+        unfiltered = self.manager._get_cache_file("aws")
+        self.config.ip_filter = "region=ap-east-1"
+        filtered = self.manager._get_cache_file("aws")
+
+        assert unfiltered.name == "ip_list_aws.txt"
+        assert filtered != unfiltered
+        # Text sources are not affected by the filter
+        assert self.manager._get_cache_file("cf").name == "ip_list_cf.txt"
+
+    def test_packed_cache_format(self):
+        """Test the packed cache format is written and read back through the manager."""
+        self.config.cache_format = "packed"
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            cache_file = self.manager._get_cache_file("cf")
+            assert cache_file.name == "ip_list_cf.bin"
+
+            self.manager._save_to_cache(["10.0.0.0/24", "10.0.1.0/24"], cache_file)
+            assert self.manager._load_from_cache(cache_file) == ["10.0.0.0/24", "10.0.1.0/24"]
+
+            output_file = str(Path(temp_dir) / "ips.txt")
+            self.manager._copy_from_cache(cache_file, output_file)
+            assert Path(output_file).read_text() == "10.0.0.0/23\n"
+
+    @patch("requests.Session.get")
+    def test_download_uses_fresh_packed_cache_directly(self, mock_get):
+        """Test a fresh packed cache is prepared from the mapping without decoding it."""
+        self.config.cache_format = "packed"
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            cache_file = self.manager._get_cache_file("cf")
+            self.manager._save_to_cache(["10.0.0.0/24", "10.0.1.0/24"], cache_file)
+
+            output_file = str(Path(temp_dir) / "ips.txt")
+            with patch.object(self.manager, "_load_from_cache") as mock_load:
+                self.manager.download_ip_list("cf", output_file)
+
+            mock_get.assert_not_called()
+            mock_load.assert_not_called()
+            assert Path(output_file).read_text() == "10.0.0.0/23\n"
+
+    @patch("requests.Session.get")
+    def test_mirror_race_remembers_origin_winner(self, mock_get):
+        """Test the origin is raced against the CDN mirror and its win is remembered."""
+        self.config.cdn_url = "https://mirror.example.com/"
+        self.config.race_delay = 0.05
+        origin_url = self.manager.IP_SOURCES["cf"]["url"]
+
+        def get(url, **kwargs):
+            if url != origin_url:
+                raise requests.ConnectionError("mirror down")
+            response = Mock()
+            response.status_code = 200
+            response.headers = {}
+            response.iter_content.return_value = [b"10.0.0.0/24\n"]
+            return response
+
+        mock_get.side_effect = get
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            assert self.manager.fetch_ip_list("cf", force_refresh=True) == ["10.0.0.0/24"]
+            assert self.manager._load_race_winners() == {"www.cloudflare.com": "origin"}
+
+            # The remembered winner is tried first on the next run
+            mock_get.reset_mock()
+            self.manager.fetch_ip_list("cf", force_refresh=True)
+            assert mock_get.call_args_list[0].args[0] == origin_url
+
+    @patch("requests.Session.get")
+    def test_mirror_race_skips_portal_page(self, mock_get):
+        """Test a mirror answering 200 with a page instead of a list loses the race."""
+        self.config.cdn_url = "https://mirror.example.com/"
+        self.config.race_delay = 5
+        origin_url = self.manager.IP_SOURCES["cf"]["url"]
+
+        def get(url, **kwargs):
+            response = Mock()
+            response.status_code = 200
+            response.headers = {}
+            body = b"10.0.0.0/24\n" if url == origin_url else b"<html>Log in</html>\n"
+            response.iter_content.return_value = iter([body])
+            return response
+
+        mock_get.side_effect = get
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.manager.cache_dir = Path(temp_dir)
+            assert self.manager.fetch_ip_list("cf", force_refresh=True) == ["10.0.0.0/24"]
+            assert self.manager._load_race_winners() == {"www.cloudflare.com": "origin"}
+
+    def test_body_has_prefixes(self):
+        """Test the race body check for text and structured sources."""
+        text = {"type": "text"}
+        json_source = {"type": "json"}
+
+        assert self.manager._body_has_prefixes(text, b"# ranges\n10.0.0.0/24\n10.0.")
+        assert not self.manager._body_has_prefixes(text, b"<html><body>Log in</body></html>")
+        assert self.manager._body_has_prefixes(json_source, b'{"prefixes": [{"ip": "2001:db8::/32"')
+        assert not self.manager._body_has_prefixes(json_source, b"<html>1.5</html>")
+
+    def test_no_race_uses_mirror_only(self):
+        """Test disabling the race keeps the mirror-only behavior."""
+        self.config.cdn_url = "https://mirror.example.com/"
+        self.config.mirror_race = False
+
+        with patch.object(self.manager, "_fetch_from_source", return_value=[]) as mock_fetch:
+            self.manager.fetch_ip_list("cf")
+
+        url = mock_fetch.call_args.args[1]
+        assert url.startswith("https://mirror.example.com/")
+        assert mock_fetch.call_args.args[4] is None
+
+    def test_parse_sources(self):
+        """Test splitting a comma-separated source specification."""
+        sources = self.manager.parse_sources("CF, https://mirror.example.com/Extra.txt,cf,")
+        assert sources == ["cf", "https://mirror.example.com/Extra.txt"]
+
+    def test_parse_sources_url_with_comma(self):
+        """Test a custom URL containing a comma stays one source."""
+        url = "https://ranges.example.com/list?regions=eu,us"
+        assert self.manager.parse_sources(f"{url},cf") == [url, "cf"]
+
+        with patch.object(self.manager, "_fetch_from_source", return_value=[]) as mock_fetch:
+            self.manager.fetch_ip_list(self.manager.parse_sources(url)[0])
+        assert mock_fetch.call_args.args[3] == url
+
+    def test_fetch_ip_lists_merges_and_records_sources(self):
+        """Test several sources are merged, de-duplicated and attributed."""
+        lists = {
+            "cf": ["10.0.0.0/24", "10.0.1.0/24"],
+            "https://mirror.example.com/extra.txt": ["10.0.1.0/24", "10.0.2.0/24"],
+        }
+        with patch.object(self.manager, "fetch_ip_list", side_effect=lambda s, f: lists[s]):
+            merged, prefix_sources = self.manager.fetch_ip_lists(list(lists))
+
+        assert merged == ["10.0.0.0/24", "10.0.1.0/24", "10.0.2.0/24"]
+        assert prefix_sources["10.0.1.0/24"] == ["cf", "https://mirror.example.com/extra.txt"]
+        assert prefix_sources["10.0.2.0/24"] == ["https://mirror.example.com/extra.txt"]
+
+    def test_fetch_ip_lists_skips_failed_source(self):
+        """Test a failing source does not abort the merged download."""
+
+        def fetch(source, force_refresh):
+            if source == "gc":
+                raise IPSourceError("Failed to download from gc: timeout")
+            return ["10.0.0.0/24"]
+
+        with patch.object(self.manager, "fetch_ip_list", side_effect=fetch):
+            merged, _ = self.manager.fetch_ip_lists(["cf", "gc"])
+            assert merged == ["10.0.0.0/24"]
+
+        with patch.object(
+            self.manager, "fetch_ip_list", side_effect=IPSourceError("Failed: timeout")
+        ):
+            with pytest.raises(IPSourceError, match="all sources"):
+                self.manager.fetch_ip_lists(["cf", "gc"])
+
+    def test_download_multiple_sources_writes_provenance(self):
+        """Test a merged download writes the candidate file and its provenance."""
+        lists = {"cf": ["10.0.0.0/24"], "gc": ["10.0.0.0/24", "10.0.9.0/24"]}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_file = str(Path(temp_dir) / "ips.txt")
+            with patch.object(self.manager, "fetch_ip_list", side_effect=lambda s, f: lists[s]):
+                self.manager.download_ip_list("cf,gc", output_file)
+
+            assert Path(output_file).read_text() == "10.0.0.0/24\n10.0.9.0/24\n"
+            assert self.manager.load_prefix_sources(output_file) == {
+                "10.0.0.0/24": ["cf", "gc"],
+                "10.0.9.0/24": ["gc"],
+            }
@@ -0,0 +1,86 @@
+"""Unit tests for IP interval sets."""
+
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from cdnbestip.exceptions import IPSourceError
+from cdnbestip.ipset import IPIntervalSet
+
+
+class TestIPIntervalSet:
+    """Test interval set construction and operations."""
+
+    def test_collapse_overlapping_and_adjacent(self):
+        """Test overlapping and adjacent prefixes collapse into a minimal cover."""
+        ip_set = IPIntervalSet.from_prefixes(
+            ["10.0.0.0/24", "10.0.1.0/24", "10.0.0.128/25", "10.0.0.5"]
+        )
+        assert ip_set.to_prefixes() == ["10.0.0.0/23"]
+
+    def test_single_addresses_written_bare(self):
+        """Test single addresses are written without a prefix length."""
+        ip_set = IPIntervalSet.from_prefixes(["1.1.1.1", "2606:4700::1/128"])
+        assert ip_set.to_prefixes() == ["1.1.1.1", "2606:4700::1"]
+
+    def test_invalid_entries_ignored(self):
+        """Test invalid entries are skipped."""
+        ip_set = IPIntervalSet.from_prefixes(["not-an-ip", "10.0.0.0/30"])
+        assert ip_set.to_prefixes() == ["10.0.0.0/30"]
+
+    def test_ipv4_and_ipv6_kept_apart(self):
+        """Test IPv4 and IPv6 ranges never merge."""
+        ip_set = IPIntervalSet.from_prefixes(["2606:4700::/32", "0.0.0.0/0"])
+        assert ip_set.to_prefixes() == ["0.0.0.0/0", "2606:4700::/32"]
+
+    def test_union(self):
+        """Test union of two sets."""
+        left = IPIntervalSet.from_prefixes(["10.0.0.0/25"])
+        right = IPIntervalSet.from_prefixes(["10.0.0.128/25", "10.0.2.0/24"])
+        assert (left | right).to_prefixes() == ["10.0.0.0/24", "10.0.2.0/24"]
+
+    def test_intersection(self):
+        """Test intersection of two sets."""
+        left = IPIntervalSet.from_prefixes(["10.0.0.0/23"])
+        right = IPIntervalSet.from_prefixes(["10.0.1.0/24", "10.0.5.0/24"])
+        assert (left & right).to_prefixes() == ["10.0.1.0/24"]
+
+    def test_subtract_splits_prefix(self):
+        """Test subtracting a range from the middle of a prefix."""
+        base = IPIntervalSet.from_prefixes(["10.0.0.0/22"])
+        excluded = IPIntervalSet.from_prefixes(["10.0.1.0/24"])
+        result = base - excluded
+        assert result.to_prefixes() == ["10.0.0.0/24", "10.0.2.0/23"]
+        assert result.num_addresses() == 768
+
+    def test_subtract_everything(self):
+        """Test subtracting a superset leaves an empty set."""
+        base = IPIntervalSet.from_prefixes(["10.0.0.0/24"])
+        result = base - IPIntervalSet.from_prefixes(["10.0.0.0/8"])
+        assert not result
+        assert result.to_prefixes() == []
+
+    def test_contains(self):
+        """Test address membership."""
+        ip_set = IPIntervalSet.from_prefixes(["10.0.0.0/24", "10.0.2.0/24"])
+        assert "10.0.0.7" in ip_set
+        assert "10.0.1.7" not in ip_set
+        assert "2606:4700::1" not in ip_set
+        assert "invalid" not in ip_set
+
+    def test_from_file(self):
+        """Test loading a set from a file with comments."""
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
+            f.write("# blocked ranges\n10.0.0.0/24\n\n10.0.1.0/24  # upstream\n")
+            path = f.name
+
+        try:
+            assert IPIntervalSet.from_file(path).to_prefixes() == ["10.0.0.0/23"]
+        finally:
+            Path(path).unlink(missing_ok=True)
+
+    def test_from_missing_file(self):
+        """Test a missing file raises IPSourceError."""
+        with pytest.raises(IPSourceError, match="Failed to read IP list file"):
+            IPIntervalSet.from_file("/nonexistent/exclude.txt")
@@ -0,0 +1,48 @@
+"""Unit tests for JSON source item filters."""
+
+import pytest
+
+from cdnbestip.exceptions import IPSourceError
+from cdnbestip.item_filter import ItemFilter
+
+
+class TestItemFilter:
+    """Test filter expression parsing and matching."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.item = {"ip_prefix": "13.34.37.64/27", "region": "ap-east-1", "service": "CLOUDFRONT"}
+
+    def test_all_terms_must_match(self):
+        """Test comma-separated terms are combined with AND."""
+        assert ItemFilter.parse("service=CLOUDFRONT,region=ap-east-1").matches(self.item)
+        assert not ItemFilter.parse("service=CLOUDFRONT,region=us-east-1").matches(self.item)
+
+    def test_alternatives(self):
+        """Test '|' separates accepted values."""
+        assert ItemFilter.parse("region=us-east-1|ap-east-1").matches(self.item)
+
+    def test_case_insensitive(self):
+        """Test values are compared case-insensitively."""
+        assert ItemFilter.parse("service=cloudfront").matches(self.item)
+
+    def test_negation(self):
+        """Test '!=' excludes matching values and accepts missing fields."""
+        assert not ItemFilter.parse("service!=CLOUDFRONT").matches(self.item)
+        assert ItemFilter.parse("network_border_group!=us-east-1-wl1").matches(self.item)
+
+    def test_missing_field_does_not_match(self):
+        """Test an equality term fails when the field is absent."""
+        assert not ItemFilter.parse("network_border_group=ap-east-1").matches(self.item)
+
+    def test_canonical_expression(self):
+        """Test equivalent expressions share a canonical form."""
+        first = ItemFilter.parse("service=CLOUDFRONT, region=b|a")
+        second = ItemFilter.parse("region=A|B,service=cloudfront")
+        assert first.expression == second.expression
+
+    @pytest.mark.parametrize("expression", ["", "service", "=CLOUDFRONT", "region=|"])
+    def test_invalid_expressions(self, expression):
+        """Test malformed expressions are rejected."""
+        with pytest.raises(IPSourceError):
+            ItemFilter.parse(expression)
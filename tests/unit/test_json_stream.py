@@ -0,0 +1,80 @@
+"""Unit tests for streaming JSON extraction."""
+
+import json
+
+import pytest
+
+from cdnbestip.exceptions import IPSourceError
+from cdnbestip.item_filter import ItemFilter
+from cdnbestip.json_stream import JSONStreamExtractor, iter_json_stream
+
+AWS_DOCUMENT = {
+    "syncToken": "1700000000",
+    "createDate": "2025-01-01-00-00-00",
+    "prefixes": [
+        {"ip_prefix": "3.5.140.0/22", "region": "ap-northeast-2", "service": "AMAZON"},
+        {"ip_prefix": "13.34.37.64/27", "region": "ap-southeast-4", "service": "CLOUDFRONT"},
+    ],
+    "ipv6_prefixes": [{"ipv6_prefix": "2600:1f14::/35", "nested": [{"x": "]}"}]}],
+}
+
+
+def _chunks(data: bytes, size: int) -> list[bytes]:
+    """Split data into fixed-size chunks."""
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+class TestJSONStreamExtractor:
+    """Test incremental JSON extraction."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 16, 4096])
+    def test_extract_field_across_chunk_boundaries(self, chunk_size):
+        """Test extraction is independent of how the body is chunked."""
+        body = json.dumps(AWS_DOCUMENT, indent=2).encode()
+        result = list(iter_json_stream(_chunks(body, chunk_size), "prefixes", "ip_prefix"))
+        assert result == ["3.5.140.0/22", "13.34.37.64/27"]
+
+    def test_item_filter(self):
+        """Test object items are filtered on their fields during extraction."""
+        body = json.dumps(AWS_DOCUMENT).encode()
+        item_filter = ItemFilter.parse("service=CLOUDFRONT")
+        result = list(iter_json_stream(_chunks(body, 5), "prefixes", "ip_prefix", item_filter))
+        assert result == ["13.34.37.64/27"]
+
+    def test_extract_plain_list(self):
+        """Test extracting a list of strings."""
+        body = b'{"addresses": ["1.1.1.1", "2.2.2.2"], "addresses_v6": []}'
+        assert list(iter_json_stream([body], "addresses")) == ["1.1.1.1", "2.2.2.2"]
+
+    def test_nested_path(self):
+        """Test extracting a list at a dotted path."""
+        body = b'{"data": {"other": [1, 2], "ips": ["10.0.0.0/8"]}}'
+        assert list(iter_json_stream([body], "data.ips")) == ["10.0.0.0/8"]
+
+    def test_metadata_collects_top_level_scalars(self):
+        """Test top-level scalars such as syncToken are recorded."""
+        extractor = JSONStreamExtractor("prefixes", "ip_prefix")
+        extractor.feed(json.dumps(AWS_DOCUMENT))
+        extractor.close()
+        assert extractor.metadata["syncToken"] == "1700000000"
+        assert "prefixes" not in extractor.metadata
+
+    def test_multibyte_characters_split_across_chunks(self):
+        """Test UTF-8 sequences split between chunks are decoded correctly."""
+        body = json.dumps({"note": "测试", "ips": ["1.1.1.1"]}, ensure_ascii=False).encode()
+        assert list(iter_json_stream(_chunks(body, 1), "ips")) == ["1.1.1.1"]
+
+    def test_missing_path(self):
+        """Test a missing path raises an error."""
+        with pytest.raises(IPSourceError, match="not found"):
+            list(iter_json_stream([b'{"other": []}'], "prefixes"))
+
+    def test_non_list_path(self):
+        """Test a non-list value at the path raises an error."""
+        with pytest.raises(IPSourceError, match="Expected list"):
+            list(iter_json_stream([b'{"prefixes": {"a": 1}}'], "prefixes"))
+
+    def test_truncated_document(self):
+        """Test a truncated document raises an error."""
+        with pytest.raises(IPSourceError, match="truncated"):
+            list(iter_json_stream([b'{"prefixes": ["1.1.1.1", '], "prefixes"))
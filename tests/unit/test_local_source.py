@@ -0,0 +1,122 @@
+"""Unit tests for local file IP sources."""
+
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from cdnbestip.exceptions import IPSourceError
+from cdnbestip.local_source import (
+    FileWatcher,
+    is_local_source,
+    local_source_path,
+    read_local_list,
+)
+from cdnbestip.packed_cache import write_packed
+
+
+class TestLocalSourcePaths:
+    """Test recognizing and resolving local sources."""
+
+    def test_is_local_source(self):
+        """Test file URLs and path-like strings are local, URLs and names are not."""
+        assert is_local_source("file:///data/ips.txt")
+        assert is_local_source("/data/ips.txt")
+        assert is_local_source("./ips.txt")
+        assert is_local_source("~/ips.txt")
+        assert not is_local_source("https://example.com/ips.txt")
+        assert not is_local_source("ftp://example.com/ips.txt")
+        assert not is_local_source("not-a-url")
+
+    def test_existing_bare_file_name_is_local(self):
+        """Test a bare name is local when the file exists."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cwd = os.getcwd()
+            os.chdir(temp_dir)
+            try:
+                Path("ips.txt").write_text("1.1.1.0/24\n")
+                assert is_local_source("ips.txt")
+            finally:
+                os.chdir(cwd)
+
+    def test_local_source_path(self):
+        """Test file URLs are decoded and paths made absolute."""
+        assert local_source_path("file:///data/my%20ips.txt") == Path("/data/my ips.txt")
+        assert local_source_path("file://localhost/data/ips.txt") == Path("/data/ips.txt")
+        assert local_source_path("ips.txt").is_absolute()
+
+        with pytest.raises(IPSourceError, match="Remote file URLs"):
+            local_source_path("file://server/share/ips.txt")
+
+
+class TestReadLocalList:
+    """Test memory-mapped reading of text and packed lists."""
+
+    def test_read_text_list(self):
+        """Test blank lines and comments are skipped."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "ips.txt"
+            path.write_text("# curated\n104.16.0.0/13\n\n  1.1.1.1  \r\n2606:4700::/32")
+            assert read_local_list(path) == ["104.16.0.0/13", "1.1.1.1", "2606:4700::/32"]
+
+    def test_read_empty_list(self):
+        """Test an empty file gives an empty list."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "ips.txt"
+            path.write_text("")
+            assert read_local_list(path) == []
+
+    def test_read_packed_list(self):
+        """Test packed cache files are recognized by their magic."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "ips.bin"
+            write_packed(path, ["104.16.0.0/13", "2606:4700::/32"])
+            assert read_local_list(path) == ["104.16.0.0/13", "2606:4700::/32"]
+
+    def test_read_missing_file(self):
+        """Test a missing file raises IPSourceError."""
+        with pytest.raises(IPSourceError, match="Failed to read IP list file"):
+            read_local_list("/nonexistent/ips.txt")
+
+
+class TestFileWatcher:
+    """Test change detection with inotify and with stat polling."""
+
+    @pytest.mark.parametrize("use_inotify", [True, False])
+    def test_detects_rewrite(self, use_inotify):
+        """Test rewriting a file in place is reported once."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "ips.txt"
+            path.write_text("1.1.1.0/24\n")
+
+            with FileWatcher([path], use_inotify=use_inotify, poll_interval=0.01) as watcher:
+                assert not watcher.changed()
+                path.write_text("1.1.1.0/24\n1.0.0.0/24\n")
+                assert watcher.wait(timeout=2)
+                assert not watcher.changed()
+
+    @pytest.mark.parametrize("use_inotify", [True, False])
+    def test_detects_rename_into_place(self, use_inotify):
+        """Test a file replaced by rename is reported and other files are ignored."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "ips.txt"
+            path.write_text("1.1.1.0/24\n")
+
+            with FileWatcher([path], use_inotify=use_inotify, poll_interval=0.01) as watcher:
+                (Path(temp_dir) / "other.txt").write_text("unrelated\n")
+                assert not watcher.changed()
+
+                temp_path = Path(temp_dir) / "ips.txt.tmp"
+                temp_path.write_text("1.0.0.0/24\n")
+                os.replace(temp_path, path)
+                assert watcher.wait(timeout=2)
+
+    def test_wait_times_out(self):
+        """Test waiting without changes returns False after the timeout."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "ips.txt"
+            path.write_text("1.1.1.0/24\n")
+
+            with FileWatcher([path], poll_interval=0.01) as watcher:
+                assert not watcher.wait(timeout=0.05)
@@ -0,0 +1,124 @@
+"""Unit tests for mirror/origin download racing."""
+
+import time
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from cdnbestip.mirror_race import race_get
+
+
+def _response(status_code=200, body=b""):
+    """Create a mock response with the given status and streamed body."""
+    response = Mock()
+    response.status_code = status_code
+    response.ok = status_code < 400
+    response.iter_content.return_value = iter([body[:4], body[4:]])
+    return response
+
+
+def _has_prefix(chunk):
+    """Accept bodies starting with an IPv4 prefix."""
+    return chunk[:1].isdigit()
+
+
+class TestRaceGet:
+    """Test staggered URL racing."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.session = Mock()
+        self.delays = {}
+        self.responses = {}
+
+        def get(url, **kwargs):
+            time.sleep(self.delays.get(url, 0))
+            result = self.responses[url]
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        self.session.get.side_effect = get
+
+    def test_fast_first_candidate_wins_alone(self):
+        """Test the second URL is never requested when the first answers within the delay."""
+        self.responses = {"https://mirror/a": _response(), "https://origin/a": _response()}
+        url, response = race_get(self.session, ["https://mirror/a", "https://origin/a"], 0.5)
+        assert url == "https://mirror/a"
+        assert self.session.get.call_count == 1
+
+    def test_slow_first_candidate_loses(self):
+        """Test a slow first URL is overtaken by the staggered second one."""
+        self.delays = {"https://mirror/a": 1.0}
+        slow = _response()
+        self.responses = {"https://mirror/a": slow, "https://origin/a": _response()}
+
+        url, _ = race_get(self.session, ["https://mirror/a", "https://origin/a"], 0.05)
+        assert url == "https://origin/a"
+
+        # The losing response is closed once it arrives
+        time.sleep(1.2)
+        slow.close.assert_called_once()
+
+    def test_failure_starts_next_immediately(self):
+        """Test a failing candidate does not wait for the delay."""
+        self.responses = {
+            "https://mirror/a": requests.ConnectionError("refused"),
+            "https://origin/a": _response(),
+        }
+        start = time.monotonic()
+        url, _ = race_get(self.session, ["https://mirror/a", "https://origin/a"], 5)
+        assert url == "https://origin/a"
+        assert time.monotonic() - start < 1
+
+    def test_error_status_is_not_usable(self):
+        """Test HTTP error responses are skipped."""
+        bad = _response(502)
+        self.responses = {"https://mirror/a": bad, "https://origin/a": _response(304)}
+        url, response = race_get(self.session, ["https://mirror/a", "https://origin/a"], 5)
+        assert url == "https://origin/a"
+        assert response.status_code == 304
+        bad.close.assert_called_once()
+
+    def test_all_fail(self):
+        """Test an error is raised when every candidate fails."""
+        self.responses = {
+            "https://mirror/a": _response(404),
+            "https://origin/a": requests.Timeout("timed out"),
+        }
+        with pytest.raises(requests.RequestException, match="All download URLs failed"):
+            race_get(self.session, ["https://mirror/a", "https://origin/a"], 0.05)
+
+    def test_invalid_body_moves_to_next_candidate(self):
+        """Test a 200 response with an unexpected body does not win the race."""
+        portal = _response(body=b"<html>Sign in to Wi-Fi</html>")
+        self.responses = {
+            "https://mirror/a": portal,
+            "https://origin/a": _response(body=b"10.0.0.0/24\n10.0.1.0/24\n"),
+        }
+        start = time.monotonic()
+        url, response = race_get(
+            self.session, ["https://mirror/a", "https://origin/a"], 5, validate=_has_prefix
+        )
+
+        assert url == "https://origin/a"
+        assert time.monotonic() - start < 1
+        portal.close.assert_called_once()
+        # The peeked chunk is replayed before the rest of the body
+        assert b"".join(response.iter_content(chunk_size=1024)) == b"10.0.0.0/24\n10.0.1.0/24\n"
+
+    def test_not_modified_is_not_validated(self):
+        """Test 304 responses win without a body to check."""
+        self.responses = {"https://mirror/a": _response(304)}
+        validate = Mock(return_value=False)
+
+        url, response = race_get(self.session, ["https://mirror/a"], 5, validate=validate)
+        assert response.status_code == 304
+        validate.assert_not_called()
+
+    def test_all_bodies_invalid(self):
+        """Test an error is raised when no candidate has a valid body."""
+        self.responses = {"https://mirror/a": _response(body=b"<html>")}
+        with pytest.raises(requests.RequestException, match="unexpected response body"):
+            race_get(self.session, ["https://mirror/a"], 0.05, validate=_has_prefix)
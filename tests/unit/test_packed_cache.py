@@ -0,0 +1,79 @@
+"""Unit tests for the packed binary IP list cache."""
+
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from cdnbestip.exceptions import IPSourceError
+from cdnbestip.packed_cache import PackedPrefixList, is_packed, write_packed
+
+
+class TestPackedCache:
+    """Test writing and memory-mapped reading of packed prefix lists."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "ip_list_cf.bin"
+
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.temp_dir.cleanup()
+
+    def test_round_trip(self):
+        """Test prefixes survive a write/read round trip."""
+        prefixes = ["104.16.0.0/13", "1.1.1.1", "2606:4700::/32"]
+        assert write_packed(self.path, prefixes) == 3
+        assert is_packed(self.path)
+
+        with PackedPrefixList(self.path) as packed:
+            assert len(packed) == 3
+            assert packed.to_list() == prefixes
+
+    def test_write_leaves_no_temp_files(self):
+        """Test rewriting a cache replaces it without leaving temporary files behind."""
+        write_packed(self.path, ["10.0.0.0/24"])
+        write_packed(self.path, ["10.0.1.0/24"])
+
+        assert [path.name for path in self.path.parent.iterdir()] == [self.path.name]
+        with PackedPrefixList(self.path) as packed:
+            assert packed.to_list() == ["10.0.1.0/24"]
+
+    def test_invalid_entries_skipped(self):
+        """Test entries that are not networks are not stored."""
+        assert write_packed(self.path, ["10.0.0.0/24", "garbage"]) == 1
+
+    def test_zero_copy_views(self):
+        """Test networks and prefix lengths are exposed as typed views."""
+        write_packed(self.path, ["10.0.0.0/24", "10.0.1.0/25"])
+        with PackedPrefixList(self.path) as packed:
+            assert isinstance(packed.v4_networks, memoryview)
+            assert list(packed.v4_networks) == [0x0A000000, 0x0A000100]
+            assert list(packed.v4_prefix_lengths) == [24, 25]
+
+    def test_num_addresses(self):
+        """Test address counting from the prefix length histogram."""
+        write_packed(self.path, ["10.0.0.0/24", "10.0.1.0/25", "2606:4700::/120"])
+        with PackedPrefixList(self.path) as packed:
+            assert packed.num_addresses() == 256 + 128 + 256
+
+    def test_to_interval_set(self):
+        """Test conversion to an interval set collapses adjacent prefixes."""
+        write_packed(self.path, ["10.0.0.0/24", "10.0.1.0/24"])
+        with PackedPrefixList(self.path) as packed:
+            assert packed.to_interval_set().to_prefixes() == ["10.0.0.0/23"]
+
+    def test_rejects_text_file(self):
+        """Test a text cache is not accepted as packed."""
+        self.path.write_text("10.0.0.0/24\n" * 4)
+        assert not is_packed(self.path)
+        with pytest.raises(IPSourceError, match="bad magic"):
+            PackedPrefixList(self.path)
+
+    def test_rejects_truncated_file(self):
+        """Test a truncated file is rejected."""
+        write_packed(self.path, ["10.0.0.0/24", "10.0.1.0/24"])
+        self.path.write_bytes(self.path.read_bytes()[:-1])
+        with pytest.raises(IPSourceError, match="truncated"):
+            PackedPrefixList(self.path)
@@ -0,0 +1,54 @@
+"""Unit tests for the prefix index."""
+
+from cdnbestip.prefix_index import PrefixIndex
+
+
+class TestPrefixIndex:
+    """Test longest-prefix matching of single and bulk lookups."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.index = PrefixIndex(
+            {
+                "104.16.0.0/13": ["cf"],
+                "104.16.5.0/24": ["aws"],
+                "104.24.0.0/14": ["cf"],
+                "2606:4700::/32": ["cf6"],
+            }
+        )
+
+    def test_lookup_most_specific_prefix(self):
+        """Test nested prefixes resolve to the most specific match."""
+        assert self.index.lookup("104.16.5.9") == "104.16.5.0/24"
+        assert self.index.lookup("104.16.4.255") == "104.16.0.0/13"
+        assert self.index.lookup("104.16.6.0") == "104.16.0.0/13"
+        assert self.index.lookup("104.24.0.0") == "104.24.0.0/14"
+
+    def test_lookup_misses(self):
+        """Test addresses outside the index and invalid input."""
+        assert self.index.lookup("1.1.1.1") is None
+        assert self.index.lookup("104.28.0.0") is None
+        assert self.index.lookup("invalid") is None
+
+    def test_lookup_ipv6(self):
+        """Test IPv6 addresses are matched separately."""
+        assert self.index.lookup("2606:4700::1") == "2606:4700::/32"
+        assert self.index.lookup("2400:cb00::1") is None
+
+    def test_lookup_many_matches_single_lookups(self):
+        """Test bulk lookups return results in input order."""
+        ips = ["104.24.1.1", "bad", "104.16.5.1", "1.1.1.1", "2606:4700::1", "104.16.0.1"]
+        assert self.index.lookup_many(ips) == [self.index.lookup(ip) for ip in ips]
+
+    def test_sources(self):
+        """Test sources are tracked per prefix."""
+        index = PrefixIndex({"104.16.0.0/13": ["cf"], "104.16.0.0/13 ": ["gc"]})
+        assert len(index) == 1
+        assert index.sources("104.16.0.0/13") == ["cf", "gc"]
+        assert index.sources("1.1.1.0/24") == []
+
+    def test_plain_prefix_list(self):
+        """Test building from plain prefixes without sources."""
+        index = PrefixIndex(["10.0.0.0/8", "10.1.0.0/16", "invalid"])
+        assert index.lookup("10.1.2.3") == "10.1.0.0/16"
+        assert index.lookup("10.2.0.0") == "10.0.0.0/8"
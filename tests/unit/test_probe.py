@@ -0,0 +1,179 @@
+"""Unit tests for the built-in TCP latency prober."""
+
+import asyncio
+import math
+import socket
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from cdnbestip.config import Config
+from cdnbestip.exceptions import SpeedTestError
+from cdnbestip.probe import (
+    LatencySample,
+    TCPProber,
+    expand_candidates,
+    write_results,
+)
+from cdnbestip.speedtest import SpeedTestManager
+
+
+def closed_port() -> int:
+    """Get a local port nothing listens on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestTCPProber:
+    """Test concurrent connect probing against local sockets."""
+
+    def setup_method(self):
+        """Start a listening socket; the kernel completes connects without accept()."""
+        self.server = socket.socket()
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(128)
+        self.port = self.server.getsockname()[1]
+
+    def teardown_method(self):
+        """Close the listening socket."""
+        self.server.close()
+
+    def test_probe_responding_address(self):
+        """Test every connect to a listening port is counted."""
+        prober = TCPProber(port=self.port, count=3, timeout=1.0)
+        samples = prober.probe(["127.0.0.1"])
+
+        assert len(samples) == 1
+        assert samples[0].sent == 3
+        assert samples[0].received == 3
+        assert 0 <= samples[0].latency < 1000
+
+    def test_unreachable_addresses_are_dropped(self):
+        """Test refused connects are lost and such addresses are not reported."""
+        prober = TCPProber(port=closed_port(), count=2, timeout=0.5)
+        samples = asyncio.run(prober.probe_all(["127.0.0.1"]))
+        assert samples[0].received == 0
+        assert math.isinf(samples[0].latency)
+        assert prober.probe(["127.0.0.1"]) == []
+
+    def test_concurrency_is_bounded(self):
+        """Test no more addresses are in flight than the concurrency allows."""
+        prober = TCPProber(port=self.port, count=1, concurrency=3)
+        in_flight = 0
+        peak = 0
+
+        async def fake_probe(ip):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return LatencySample(ip=ip, sent=1, received=1, latency=1.0)
+
+        with patch.object(prober, "_probe_address", side_effect=fake_probe):
+            samples = prober.probe([f"10.0.0.{i}" for i in range(20)])
+
+        assert len(samples) == 20
+        assert peak == 3
+
+    def test_concurrency_capped_by_file_limit(self):
+        """Test concurrency stays below the open file limit."""
+        with patch("cdnbestip.probe._fd_limit", return_value=256):
+            prober = TCPProber(concurrency=5000)
+        assert prober.concurrency == 192
+
+    def test_results_ordered_by_loss_then_latency(self):
+        """Test responding addresses are ordered like cfst orders them."""
+        samples = {
+            "10.0.0.1": LatencySample("10.0.0.1", 4, 4, 80.0),
+            "10.0.0.2": LatencySample("10.0.0.2", 4, 3, 20.0),
+            "10.0.0.3": LatencySample("10.0.0.3", 4, 4, 40.0),
+            "10.0.0.4": LatencySample("10.0.0.4", 4, 0, math.inf),
+        }
+
+        async def fake_probe(ip):
+            return samples[ip]
+
+        prober = TCPProber()
+        with patch.object(prober, "_probe_address", side_effect=fake_probe):
+            ordered = prober.probe(list(samples))
+
+        assert [sample.ip for sample in ordered] == ["10.0.0.3", "10.0.0.1", "10.0.0.2"]
+
+    def test_invalid_settings(self):
+        """Test non-positive counts are rejected."""
+        with pytest.raises(SpeedTestError, match="Probe count"):
+            TCPProber(count=0)
+        with pytest.raises(SpeedTestError, match="Probe concurrency"):
+            TCPProber(concurrency=0)
+
+
+class TestProbeResults:
+    """Test candidate expansion and result files."""
+
+    def test_expand_candidates(self):
+        """Test addresses are kept and prefixes give one address per /24."""
+        addresses = expand_candidates(["1.1.1.1", "104.16.0.0/23", "not-an-ip"], seed=1)
+
+        assert addresses[0] == "1.1.1.1"
+        assert len(addresses) == 3
+        assert addresses[1].startswith("104.16.0.")
+        assert addresses[2].startswith("104.16.1.")
+
+    def test_results_parse_as_cfst_results(self):
+        """Test written result files are read like cfst output."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output = Path(temp_dir) / "result.csv"
+            samples = [LatencySample("1.1.1.1", 4, 3, 12.345)]
+
+            assert write_results(samples, output) == 1
+            assert output.read_text(encoding="utf-8").splitlines()[1] == (
+                "1.1.1.1,4,3,0.25,12.35,0.00,N/A"
+            )
+
+            results = SpeedTestManager(Config()).parse_results(str(output))
+            assert results[0].ip == "1.1.1.1"
+            assert results[0].latency == 12.35
+            assert results[0].speed == 0.0
+
+    def test_sample_to_result(self):
+        """Test samples convert to speed test results."""
+        result = LatencySample("1.1.1.1", 4, 4, 10.0).to_result(443)
+        assert (result.ip, result.port, result.latency, result.speed) == ("1.1.1.1", 443, 10.0, 0.0)
+
+
+class TestTCPEngine:
+    """Test the tcp engine of SpeedTestManager."""
+
+    def test_run_speed_test_with_tcp_engine(self):
+        """Test the tcp engine probes the IP file without the cfst binary."""
+        server = socket.socket()
+        server.bind(("127.0.0.1", 0))
+        server.listen(16)
+        try:
+            config = Config(engine="tcp", speed_port=server.getsockname()[1], probe_count=2)
+            manager = SpeedTestManager(config)
+
+            with tempfile.TemporaryDirectory() as temp_dir:
+                ip_file = Path(temp_dir) / "ips.txt"
+                ip_file.write_text("127.0.0.1\n")
+                output = Path(temp_dir) / "result.csv"
+
+                with patch.object(manager, "ensure_binary_available") as mock_binary:
+                    assert manager.run_speed_test(str(ip_file), str(output)) == str(output)
+                mock_binary.assert_not_called()
+
+                results = manager.parse_results(str(output))
+                assert [result.ip for result in results] == ["127.0.0.1"]
+                assert manager.lists_all_responders()
+        finally:
+            server.close()
+
+    def test_tcp_engine_missing_ip_file(self):
+        """Test a missing IP file raises SpeedTestError."""
+        manager = SpeedTestManager(Config(engine="tcp"))
+        with pytest.raises(SpeedTestError, match="IP file not found"):
+            manager.run_speed_test("/nonexistent/ips.txt", "result.csv")
@@ -64,7 +64,7 @@ class TestProxyConfiguration:
 class TestIPSourceManagerProxy:
     """Test proxy support in IPSourceManager."""
 
-    @patch("src.cdnbestip.ip_sources.requests.get")
+    @patch("src.cdnbestip.ip_sources.requests.Session.get")
     def test_download_with_proxy(self, mock_get):
         """Test that proxy is used when downloading IP lists."""
         # Setup
@@ -77,7 +77,7 @@ class TestIPSourceManagerProxy:
 
         # Mock response
         mock_response = Mock()
-        mock_response.text = "1.1.1.1\n2.2.2.2\n"
+        mock_response.iter_content.return_value = [b"1.1.1.1\n2.2.2.2\n"]
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
 
@@ -90,14 +90,12 @@ class TestIPSourceManagerProxy:
 
         # Verify proxy was used
         mock_get.assert_called_once()
-        call_args = mock_get.call_args
-        assert "proxies" in call_args[1]
-        assert call_args[1]["proxies"] == {
+        assert manager.session.proxies == {
             "http": "http://proxy.example.com:8080",
             "https": "http://proxy.example.com:8080",
         }
 
-    @patch("src.cdnbestip.ip_sources.requests.get")
+    @patch("src.cdnbestip.ip_sources.requests.Session.get")
     def test_download_without_proxy(self, mock_get):
         """Test that no proxy is used when not configured."""
         # Setup
@@ -110,7 +108,7 @@ class TestIPSourceManagerProxy:
 
         # Mock response
         mock_response = Mock()
-        mock_response.text = "1.1.1.1\n2.2.2.2\n"
+        mock_response.iter_content.return_value = [b"1.1.1.1\n2.2.2.2\n"]
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
 
@@ -123,8 +121,8 @@ class TestIPSourceManagerProxy:
 
         # Verify no proxy was used
         mock_get.assert_called_once()
-        call_args = mock_get.call_args
-        assert "proxies" not in call_args[1]
+        assert "proxies" not in mock_get.call_args[1]
+        assert not manager.session.proxies
 
 
 class TestDNSManagerProxy:
@@ -101,6 +101,21 @@ class TestResultsHandler:
         filtered = handler.filter_by_speed([], 2.0)
         assert len(filtered) == 0
 
+    def test_aggregate_by_prefix(self, config, sample_results):
+        """Test per-prefix aggregation of attributed results."""
+        handler = ResultsHandler(config)
+        sample_results[0].prefix = "1.0.0.0/8"
+        sample_results[1].prefix = "1.0.0.0/8"
+        sample_results[2].prefix = "8.8.8.0/24"
+
+        aggregates = handler.aggregate_by_prefix(sample_results)
+
+        assert set(aggregates) == {"1.0.0.0/8", "8.8.8.0/24"}
+        assert aggregates["1.0.0.0/8"]["count"] == 2
+        assert aggregates["1.0.0.0/8"]["best_speed"] == 5.2
+        assert aggregates["1.0.0.0/8"]["avg_latency"] == pytest.approx(13.9)
+        assert aggregates["8.8.8.0/24"]["colos"] == ["NYC"]
+
     def test_filter_by_latency(self, config, sample_results):
         """Test latency-based filtering."""
         handler = ResultsHandler(config)
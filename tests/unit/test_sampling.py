@@ -0,0 +1,115 @@
+"""Unit tests for candidate sampling."""
+
+import ipaddress
+
+import pytest
+
+from cdnbestip.exceptions import IPSourceError
+from cdnbestip.sampling import CandidateSampler, int_to_ip, parse_prefix, prefixes_to_ranges
+
+
+class TestPrefixParsing:
+    """Test prefix to integer range conversion."""
+
+    def test_parse_prefix(self):
+        """Test parsing a CIDR prefix into an integer range."""
+        version, first, last = parse_prefix("104.16.0.0/23")
+        assert version == 4
+        assert int_to_ip(4, first) == "104.16.0.0"
+        assert int_to_ip(4, last) == "104.16.1.255"
+
+    def test_parse_single_address(self):
+        """Test parsing a bare address."""
+        version, first, last = parse_prefix("1.1.1.1")
+        assert version == 4
+        assert first == last
+
+    def test_prefixes_to_ranges_skips_invalid(self):
+        """Test invalid entries are skipped."""
+        ranges = prefixes_to_ranges(["10.0.0.0/24", "not-an-ip", "2606:4700::/32"])
+        assert len(ranges) == 2
+        assert ranges[1][0] == 6
+
+
+class TestCandidateSampler:
+    """Test address sampling strategies."""
+
+    def test_uniform_one_per_block(self):
+        """Test one address is emitted per /24 block."""
+        sampler = CandidateSampler(1)
+        result = sampler.sample(["104.16.0.0/22"])
+        assert result == ["104.16.0.128", "104.16.1.128", "104.16.2.128", "104.16.3.128"]
+
+    def test_uniform_spacing(self):
+        """Test uniform samples are spread across the block."""
+        sampler = CandidateSampler(4)
+        result = sampler.sample(["10.0.0.0/24"])
+        assert result == ["10.0.0.32", "10.0.0.96", "10.0.0.159", "10.0.0.223"]
+
+    def test_every_host_when_count_exceeds_block(self):
+        """Test a count above the block size yields every usable host."""
+        sampler = CandidateSampler(1000)
+        result = sampler.sample(["10.0.0.0/24"])
+        assert len(result) == 254
+        assert result[0] == "10.0.0.1"
+        assert result[-1] == "10.0.0.254"
+
+    def test_small_prefix_sampled_as_single_block(self):
+        """Test prefixes smaller than a block are sampled within their own bounds."""
+        sampler = CandidateSampler(2, mode="random", seed=1)
+        result = sampler.sample(["10.0.0.64/29"])
+        assert len(result) == 2
+        assert all(62 < int(ip.rsplit(".", 1)[1]) < 71 for ip in result)
+
+    def test_random_mode_is_reproducible_with_seed(self):
+        """Test random sampling is deterministic for a given seed."""
+        first = CandidateSampler(3, mode="random", seed=42).sample(["10.0.0.0/23"])
+        second = CandidateSampler(3, mode="random", seed=42).sample(["10.0.0.0/23"])
+        assert first == second
+        assert len(first) == 6
+
+    def test_first_random_mode_includes_first_host(self):
+        """Test first+random always includes the first usable host of each block."""
+        sampler = CandidateSampler(3, mode="first+random", seed=7)
+        result = sampler.sample(["10.0.0.0/23"])
+        assert "10.0.0.1" in result
+        assert "10.0.1.1" in result
+        assert len(result) == 6
+
+    def test_ipv6_sampled_per_block(self):
+        """Test IPv6 prefixes are sampled once per /48 block."""
+        sampler = CandidateSampler(1)
+        assert sampler.sample(["2606:4700::/47"]) == ["2606:4700:0:8000::", "2606:4700:1:8000::"]
+
+    def test_ipv6_block_limit_strides_across_prefix(self):
+        """Test large IPv6 prefixes are capped to evenly spread blocks."""
+        sampler = CandidateSampler(1, max_blocks_v6=4)
+        assert sampler.sample(["2606:4700::/32"]) == [
+            "2606:4700:0:8000::",
+            "2606:4700:4000:8000::",
+            "2606:4700:8000:8000::",
+            "2606:4700:c000:8000::",
+        ]
+
+    def test_ipv6_random_sampling_within_block(self):
+        """Test random IPv6 picks are distinct and stay inside their blocks."""
+        sampler = CandidateSampler(3, mode="random", seed=7, max_blocks_v6=2)
+        addresses = sampler.sample(["2606:4700::/32"])
+
+        assert len(addresses) == len(set(addresses)) == 6
+        network = ipaddress.ip_network("2606:4700::/32")
+        assert all(ipaddress.ip_address(address) in network for address in addresses)
+
+    def test_ipv6_custom_block_size(self):
+        """Test a configurable IPv6 block boundary."""
+        sampler = CandidateSampler(1, block_prefix_v6=64, max_blocks_v6=None)
+        assert len(sampler.sample(["2606:4700::/60"])) == 16
+
+    def test_invalid_arguments(self):
+        """Test invalid sampler arguments are rejected."""
+        with pytest.raises(IPSourceError, match="Sample count"):
+            CandidateSampler(0)
+        with pytest.raises(IPSourceError, match="Invalid sample mode"):
+            CandidateSampler(1, mode="weighted")
+        with pytest.raises(IPSourceError, match="IPv6 block limit"):
+            CandidateSampler(1, max_blocks_v6=0)
@@ -0,0 +1,160 @@
+"""Unit tests for multi-node candidate sharding."""
+
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+from cdnbestip.exceptions import SpeedTestError
+from cdnbestip.sharding import (
+    CandidateSharder,
+    ShardRing,
+    merge_result_files,
+    parse_shard,
+    shard_file_name,
+)
+
+RESULT_HEADER = "IP 地址,已发送,已接收,丢包率,平均延迟,下载速度 (MB/s),地区码"
+
+
+class TestShardSpec:
+    """Test parsing shard specifications and naming shard files."""
+
+    def test_parse_shard(self):
+        """Test valid and invalid specifications."""
+        assert parse_shard("2/4") == (2, 4)
+        assert parse_shard(" 1/1 ") == (1, 1)
+
+        for spec in ("2", "0/4", "5/4", "a/b", "1/0"):
+            with pytest.raises(ValueError, match="Invalid shard"):
+                parse_shard(spec)
+
+    def test_shard_file_name(self):
+        """Test the shard is inserted before the extension."""
+        assert shard_file_name("result.csv", 2, 4) == "result.shard-2-of-4.csv"
+        assert shard_file_name("ip_list_cf.txt", 1, 3) == "ip_list_cf.shard-1-of-3.txt"
+
+
+class TestCandidateSharder:
+    """Test consistent assignment of candidates to shards."""
+
+    def test_shards_are_disjoint_and_complete(self):
+        """Test every /24 lands on exactly one shard."""
+        candidates = [f"104.16.{i}.0/24" for i in range(256)]
+        selections = [CandidateSharder(i, 4).select(candidates) for i in range(1, 5)]
+
+        merged = [candidate for selection in selections for candidate in selection]
+        assert sorted(merged) == sorted(candidates)
+        # Each shard gets a fair share of the blocks
+        assert all(30 <= len(selection) <= 100 for selection in selections)
+
+    def test_addresses_follow_their_block(self):
+        """Test addresses sampled from one /24 go to the shard owning the /24."""
+        sharders = [CandidateSharder(i, 3) for i in range(1, 4)]
+        owners = {
+            sharder.shard_index
+            for sharder in sharders
+            for address in ("172.64.9.1", "172.64.9.128", "172.64.9.0/25")
+            if sharder.select([address])
+        }
+        assert len(owners) == 1
+
+    def test_large_prefixes_are_split(self):
+        """Test prefixes larger than a block are split into owned blocks."""
+        shard_one = CandidateSharder(1, 2).select(["104.16.0.0/22"])
+        shard_two = CandidateSharder(2, 2).select(["104.16.0.0/22"])
+
+        assert sorted(shard_one + shard_two) == [f"104.16.{i}.0/24" for i in range(4)]
+
+    def test_ipv6_blocks(self):
+        """Test IPv6 prefixes are split at the configured block size."""
+        selections = [
+            CandidateSharder(i, 2, block_prefix_v6=34).select(["2606:4700::/32"]) for i in (1, 2)
+        ]
+        assert len(selections[0] + selections[1]) == 4
+        assert set(selections[0] + selections[1]) == {
+            "2606:4700::/34",
+            "2606:4700:4000::/34",
+            "2606:4700:8000::/34",
+            "2606:4700:c000::/34",
+        }
+
+    def test_unparsed_entries_go_to_first_shard(self):
+        """Test entries that are not addresses are kept by shard 1 only."""
+        assert CandidateSharder(1, 2).select(["not-an-ip"]) == ["not-an-ip"]
+        assert CandidateSharder(2, 2).select(["not-an-ip"]) == []
+
+    def test_growing_ring_moves_few_keys(self):
+        """Test adding a shard only moves keys to the new shard."""
+        keys = [f"block-{i}".encode() for i in range(2000)]
+        before = ShardRing(4)
+        after = ShardRing(5)
+
+        moved = [key for key in keys if before.shard_of(key) != after.shard_of(key)]
+        assert all(after.shard_of(key) == 5 for key in moved)
+        assert len(moved) < len(keys) / 3
+
+    def test_ring_balance(self):
+        """Test shares stay close to even."""
+        ring = ShardRing(8)
+        counts = Counter(ring.shard_of(f"key-{i}".encode()) for i in range(8000))
+        assert set(counts) == set(range(1, 9))
+        assert max(counts.values()) < 1.5 * min(counts.values())
+
+
+class TestMergeResultFiles:
+    """Test merging shard result files."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name)
+
+    def teardown_method(self):
+        """Clean up temporary files."""
+        self.temp_dir.cleanup()
+
+    def _write(self, name, rows):
+        path = self.path / name
+        path.write_text("\n".join([RESULT_HEADER, *rows]) + "\n", encoding="utf-8")
+        return path
+
+    def test_merge_sorts_and_dedupes(self):
+        """Test rows are ordered by speed then latency and duplicates keep the best row."""
+        first = self._write(
+            "result.shard-1-of-2.csv",
+            ["1.1.1.1,4,4,0.00,120.00,5.00,HKG", "1.0.0.1,4,4,0.00,90.00,8.00,NRT"],
+        )
+        second = self._write(
+            "result.shard-2-of-2.csv",
+            ["1.1.1.1,4,4,0.00,100.00,6.00,HKG", "1.0.0.2,4,4,0.00,80.00,8.00,SJC"],
+        )
+        output = self.path / "result.csv"
+
+        assert merge_result_files([first, second], output) == 3
+        lines = output.read_text(encoding="utf-8").splitlines()
+        assert lines[0] == RESULT_HEADER
+        assert [line.split(",")[0] for line in lines[1:]] == ["1.0.0.2", "1.0.0.1", "1.1.1.1"]
+        assert lines[3].split(",")[5] == "6.00"
+
+    def test_merge_orders_latency_only_rows_by_loss(self):
+        """Test rows without download speeds are ordered by loss before latency."""
+        first = self._write("result.shard-1-of-2.csv", ["1.1.1.1,4,2,0.50,60.00,0.00,HKG"])
+        second = self._write("result.shard-2-of-2.csv", ["1.0.0.1,4,4,0.00,90.00,0.00,NRT"])
+        output = self.path / "result.csv"
+
+        merge_result_files([first, second], output)
+        lines = output.read_text(encoding="utf-8").splitlines()
+        assert [line.split(",")[0] for line in lines[1:]] == ["1.0.0.1", "1.1.1.1"]
+
+    def test_merge_without_results(self):
+        """Test merging only empty files raises SpeedTestError."""
+        empty = self._write("result.shard-1-of-1.csv", [])
+        with pytest.raises(SpeedTestError, match="No valid results"):
+            merge_result_files([empty], self.path / "result.csv")
+
+    def test_merge_missing_file(self):
+        """Test a missing shard file raises SpeedTestError."""
+        with pytest.raises(SpeedTestError, match="Failed to read results file"):
+            merge_result_files([self.path / "missing.csv"], self.path / "result.csv")
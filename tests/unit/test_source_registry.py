@@ -0,0 +1,153 @@
+"""Unit tests for the IP source registry."""
+
+import json
+import sys
+import tempfile
+from importlib.metadata import EntryPoint
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from cdnbestip.exceptions import IPSourceError
+from cdnbestip.source_registry import (
+    BUILTIN_SOURCES,
+    SourceRegistry,
+    split_source_spec,
+    validate_source_definition,
+)
+
+PLUGIN_MODULE = '''
+SOURCE = {
+    "url": "https://ranges.example.com/edge.bin",
+    "default_test_url": "https://speed.example.com/100mb",
+    "cache_ttl_hours": 6,
+}
+
+
+def parse(chunks):
+    return b"".join(chunks).decode().split(";")
+'''
+
+
+def make_provider():
+    """Entry point target returning a source definition."""
+    return {"url": "https://ranges.example.com/private.txt", "type": "text"}
+
+
+class TestSourceRegistry:
+    """Test discovery, lazy loading and validation of IP sources."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.plugin_dir = Path(self.temp_dir.name)
+
+    def teardown_method(self):
+        """Clean up temporary plugin directory."""
+        self.temp_dir.cleanup()
+
+    def test_builtin_sources(self):
+        """Test built-in sources are available without plugins."""
+        registry = SourceRegistry(plugin_dir=self.plugin_dir, use_entry_points=False)
+        assert registry.names() == list(BUILTIN_SOURCES)
+        assert "cf" in registry
+        assert registry.get("gc")["json_path"] == "addresses"
+        assert "https://example.com/ips.txt" not in registry
+
+        with pytest.raises(IPSourceError, match="Unknown IP source"):
+            registry.get("invalid")
+
+    def test_json_definition_file(self):
+        """Test a JSON file in the plugin directory defines a source."""
+        definition = {"url": "https://example.com/v4.json", "type": "json", "json_path": "v4"}
+        (self.plugin_dir / "corp.json").write_text(json.dumps(definition))
+        registry = SourceRegistry(plugin_dir=self.plugin_dir, use_entry_points=False)
+
+        assert "corp" in registry
+        assert registry.names()[-1] == "corp"
+        definition = registry.get("corp")
+        assert definition["name"] == "corp"
+        assert definition["json_path"] == "v4"
+
+    def test_python_plugin_loaded_lazily(self):
+        """Test a Python plugin is imported only when its source is requested."""
+        (self.plugin_dir / "edge.py").write_text(PLUGIN_MODULE)
+        registry = SourceRegistry(plugin_dir=self.plugin_dir, use_entry_points=False)
+
+        assert "edge" in registry
+        assert "cdnbestip_source_edge" not in sys.modules
+        assert not registry._loaded
+
+        definition = registry.get("edge")
+        assert definition["type"] == "custom"
+        parsed = definition["parser"]([b"1.1.1.0/24;", b"1.0.0.0/24"])
+        assert parsed == ["1.1.1.0/24", "1.0.0.0/24"]
+        assert registry.get("edge") is definition
+
+    def test_entry_point_provider(self):
+        """Test providers registered as entry points are discovered by name."""
+        entry_point = EntryPoint(
+            name="Private",
+            value=f"{__name__}:make_provider",
+            group="cdnbestip.sources",
+        )
+        with patch("importlib.metadata.entry_points", return_value=[entry_point]):
+            registry = SourceRegistry(plugin_dir=self.plugin_dir)
+            assert "private" in registry
+            assert registry.get("private")["url"] == "https://ranges.example.com/private.txt"
+
+    def test_plugins_cannot_shadow_builtins(self):
+        """Test a plugin named like a built-in source is ignored."""
+        (self.plugin_dir / "cf.json").write_text(json.dumps({"url": "https://evil.example.com"}))
+        registry = SourceRegistry(plugin_dir=self.plugin_dir, use_entry_points=False)
+        assert registry.get("cf")["url"] == BUILTIN_SOURCES["cf"]["url"]
+
+    def test_broken_plugin(self):
+        """Test plugins that fail to load raise IPSourceError on use only."""
+        (self.plugin_dir / "broken.py").write_text("raise RuntimeError('boom')\n")
+        registry = SourceRegistry(plugin_dir=self.plugin_dir, use_entry_points=False)
+
+        assert "broken" in registry
+        with pytest.raises(IPSourceError, match="Failed to load IP source plugin 'broken'"):
+            registry.get("broken")
+
+    def test_validate_source_definition(self):
+        """Test incomplete definitions are rejected."""
+        with pytest.raises(IPSourceError, match="has no URL"):
+            validate_source_definition("x", {"type": "text"})
+        with pytest.raises(IPSourceError, match="invalid type"):
+            validate_source_definition("x", {"url": "https://example.com", "type": "xml"})
+        with pytest.raises(IPSourceError, match="no json_path"):
+            validate_source_definition("x", {"url": "https://example.com", "type": "json"})
+        with pytest.raises(IPSourceError, match="not callable"):
+            validate_source_definition("x", {"url": "https://example.com", "parser": "fast"})
+
+
+class TestSplitSourceSpec:
+    """Test splitting comma-separated source specifications."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.registry = SourceRegistry(use_entry_points=False)
+
+    def test_names_urls_and_paths(self):
+        """Test every comma after a name or file path separates sources."""
+        spec = "CF,data/list.txt, https://mirror.example.com/extra.txt,./extra.txt,gc,"
+        assert split_source_spec(spec, self.registry) == [
+            "CF",
+            "data/list.txt",
+            "https://mirror.example.com/extra.txt",
+            "./extra.txt",
+            "gc",
+        ]
+
+    def test_comma_inside_url(self):
+        """Test commas in a URL are kept unless a new source follows them."""
+        spec = "https://api.example.com/ips?fields=ipv4,ipv6&format=text,gc,/data/extra.txt"
+        assert split_source_spec(spec, self.registry) == [
+            "https://api.example.com/ips?fields=ipv4,ipv6&format=text",
+            "gc",
+            "/data/extra.txt",
+        ]
+
@@ -101,7 +101,7 @@ class TestSpeedTestBinaryManagement:
             cached_path = self.manager._get_cached_binary_path()
             assert cached_path is None
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_get_download_url_success(self, mock_get):
         """Test successful download URL retrieval."""
         mock_response = Mock()
@@ -119,7 +119,7 @@ class TestSpeedTestBinaryManagement:
             url = self.manager._get_download_url("linux", "amd64")
             assert "CloudflareSpeedTest_linux_amd64.tar.gz" in url
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_get_download_url_no_matching_asset(self, mock_get):
         """Test download URL retrieval when no matching asset is found."""
         mock_response = Mock()
@@ -136,7 +136,7 @@ class TestSpeedTestBinaryManagement:
         url = self.manager._get_download_url("linux", "amd64")
         assert url is None
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_get_download_url_request_error(self, mock_get):
         """Test download URL retrieval when request fails."""
         mock_get.side_effect = requests.RequestException("Network error")
@@ -173,7 +173,7 @@ class TestSpeedTestBinaryManagement:
             assert binary_path == "/new/cfst"
 
     @patch("tempfile.TemporaryDirectory")
-    @patch("requests.get")
+    @patch("requests.Session.get")
     @patch("tarfile.open")
     @patch("shutil.copy2")
     def test_download_binary_success(self, mock_copy, mock_tarfile, mock_get, mock_tempdir):
@@ -3,6 +3,8 @@
 import os
 import subprocess
 import tempfile
+import threading
+import time
 from pathlib import Path
 from unittest.mock import Mock, patch
 
@@ -11,6 +13,7 @@ import pytest
 from cdnbestip.config import Config
 from cdnbestip.exceptions import SpeedTestError
 from cdnbestip.models import SpeedTestResult
+from cdnbestip.probe import RESULT_HEADER, LatencySample
 from cdnbestip.speedtest import SpeedTestManager
 
 
@@ -23,7 +26,7 @@ class TestSpeedTestExecution:
         self.manager = SpeedTestManager(self.config)
         self.manager.binary_path = "/usr/bin/cfst"  # Mock binary path
 
-    @patch("subprocess.run")
+    @patch("cdnbestip.speedtest.run_cfst")
     @patch("os.path.exists")
     def test_run_speed_test_success(self, mock_exists, mock_run):
         """Test successful speed test execution."""
@@ -33,7 +36,7 @@ class TestSpeedTestExecution:
         # Mock successful subprocess run
         mock_result = Mock()
         mock_result.returncode = 0
-        mock_result.stderr = ""
+        mock_result.output = ""
         mock_run.return_value = mock_result
 
         result_file = self.manager.run_speed_test("/tmp/ip.txt")
@@ -49,7 +52,7 @@ class TestSpeedTestExecution:
         assert "-o" in call_args
         assert "result.csv" in call_args
 
-    @patch("subprocess.run")
+    @patch("cdnbestip.speedtest.run_cfst")
     @patch("os.path.exists")
     def test_run_speed_test_with_config_params(self, mock_exists, mock_run):
         """Test speed test execution with configuration parameters."""
@@ -81,7 +84,7 @@ class TestSpeedTestExecution:
         assert "-tl" in call_args
         assert "200" in call_args
 
-    @patch("subprocess.run")
+    @patch("cdnbestip.speedtest.run_cfst")
     @patch("os.path.exists")
     def test_run_speed_test_without_speed_threshold(self, mock_exists, mock_run):
         """Test speed test execution without speed threshold (should not add -sl/-tl)."""
@@ -103,7 +106,7 @@ class TestSpeedTestExecution:
         assert "-sl" not in call_args
         assert "-tl" not in call_args
 
-    @patch("subprocess.run")
+    @patch("cdnbestip.speedtest.run_cfst")
     @patch("os.path.exists")
     def test_run_speed_test_with_zero_speed_threshold(self, mock_exists, mock_run):
         """Test speed test execution with zero speed threshold (should not add -sl/-tl)."""
@@ -133,7 +136,7 @@ class TestSpeedTestExecution:
         with pytest.raises(SpeedTestError, match="IP file not found"):
             self.manager.run_speed_test("/nonexistent/ip.txt")
 
-    @patch("subprocess.run")
+    @patch("cdnbestip.speedtest.run_cfst")
     @patch("os.path.exists")
     def test_run_speed_test_binary_fails(self, mock_exists, mock_run):
         """Test speed test execution when binary fails."""
@@ -142,13 +145,13 @@ class TestSpeedTestExecution:
         # Mock failed subprocess run
         mock_result = Mock()
         mock_result.returncode = 1
-        mock_result.stderr = "Error: Invalid parameters"
+        mock_result.output = "Error: Invalid parameters"
         mock_run.return_value = mock_result
 
         with pytest.raises(SpeedTestError, match="Speed test failed with return code 1"):
             self.manager.run_speed_test("/tmp/ip.txt")
 
-    @patch("subprocess.run")
+    @patch("cdnbestip.speedtest.run_cfst")
     @patch("os.path.exists")
     def test_run_speed_test_timeout(self, mock_exists, mock_run):
         """Test speed test execution timeout."""
@@ -158,7 +161,7 @@ class TestSpeedTestExecution:
         with pytest.raises(SpeedTestError, match="Speed test timed out"):
             self.manager.run_speed_test("/tmp/ip.txt")
 
-    @patch("subprocess.run")
+    @patch("cdnbestip.speedtest.run_cfst")
     @patch("os.path.exists")
     def test_run_speed_test_binary_not_found(self, mock_exists, mock_run):
         """Test speed test execution when binary is not found."""
@@ -269,6 +272,129 @@ class TestSpeedTestExecution:
         with pytest.raises(ValueError, match="Invalid IP address"):
             self.manager._parse_csv_line(line, 2)
 
+    def test_parse_csv_line_ipv6(self):
+        """Test parsing CSV line with an IPv6 address."""
+        line = "2606:4700::6810:80,4,4,0.00,25.3,15.5,SJC"
+
+        result = self.manager._parse_csv_line(line, 2)
+        assert result.ip == "2606:4700::6810:80"
+
+    def test_lists_all_responders(self):
+        """Test full latency results are only expected with the download test disabled."""
+        assert not self.manager.lists_all_responders()
+
+        self.config.extend_string = "-dd -t 4"
+        assert self.manager.lists_all_responders()
+
+        self.config.shortlist = 50
+        assert not self.manager.lists_all_responders()
+
+    @patch("cdnbestip.speedtest.run_cfst")
+    def test_run_speed_test_with_shortlist(self, mock_run):
+        """Test only the best addresses of the latency sweep are passed to cfst."""
+        self.config.shortlist = 2
+        samples = [
+            LatencySample("104.16.0.1", 4, 4, 10.0),
+            LatencySample("104.16.1.1", 4, 4, 20.0),
+            LatencySample("104.16.2.1", 4, 3, 5.0),
+        ]
+        mock_run.return_value = Mock(returncode=0, output="")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ip_file = Path(temp_dir) / "ip_list_cf.txt"
+            ip_file.write_text("104.16.0.0/22\n")
+            output = Path(temp_dir) / "result.csv"
+            output.write_text("")
+
+            with patch.object(self.manager, "sweep_latency", return_value=samples) as mock_sweep:
+                self.manager.run_speed_test(str(ip_file), str(output))
+
+            mock_sweep.assert_called_once_with(str(ip_file))
+            shortlist_file = Path(temp_dir) / "ip_list_cf.shortlist.txt"
+            assert shortlist_file.read_text().split() == ["104.16.0.1", "104.16.1.1"]
+            call_args = mock_run.call_args[0][0]
+            assert call_args[call_args.index("-f") + 1] == str(shortlist_file)
+
+    def test_shortlist_without_responders(self):
+        """Test an empty latency sweep stops before running cfst."""
+        self.config.shortlist = 10
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ip_file = Path(temp_dir) / "ips.txt"
+            ip_file.write_text("104.16.0.0/24\n")
+
+            with (
+                patch.object(self.manager, "sweep_latency", return_value=[]),
+                patch("cdnbestip.speedtest.run_cfst") as mock_run,
+            ):
+                with pytest.raises(SpeedTestError, match="No candidates responded"):
+                    self.manager.run_speed_test(str(ip_file))
+            mock_run.assert_not_called()
+
+    def test_run_speed_test_parallel_shards(self):
+        """Test the IP file is split across cfst processes and their results merged."""
+        self.config.parallel_shards = 4
+        self.config.parallel_jobs = 2
+        lock = threading.Lock()
+        running = 0
+        peak = 0
+        tested = []
+        locks = []
+
+        def fake_cfst(cmd_args, timeout, on_progress=None, download_lock=None):
+            nonlocal running, peak
+            ip_file = cmd_args[cmd_args.index("-f") + 1]
+            output = cmd_args[cmd_args.index("-o") + 1]
+            blocks = Path(ip_file).read_text().split()
+            with lock:
+                running += 1
+                peak = max(peak, running)
+                tested.extend(blocks)
+                locks.append(download_lock)
+            time.sleep(0.05)
+            # One address per /24, faster for smaller shards
+            rows = [
+                f"{block.replace('.0/24', '.1')},4,4,0.00,50.00,{len(blocks)}.00,HKG"
+                for block in blocks
+            ]
+            Path(output).write_text("\n".join([RESULT_HEADER, *rows]) + "\n")
+            with lock:
+                running -= 1
+            return Mock(returncode=0, output="")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ip_file = Path(temp_dir) / "ip_list_cf.txt"
+            ip_file.write_text("104.16.0.0/20\n")
+            output = Path(temp_dir) / "result.csv"
+
+            with patch("cdnbestip.speedtest.run_cfst", side_effect=fake_cfst) as mock_run:
+                assert self.manager.run_speed_test(str(ip_file), str(output)) == str(output)
+
+            assert mock_run.call_count == 4
+            assert sorted(tested) == sorted(f"104.16.{i}.0/24" for i in range(16))
+            assert (Path(temp_dir) / "ip_list_cf.shard-1-of-4.txt").exists()
+            results = self.manager.parse_results(str(output))
+
+        assert peak <= 2
+        assert locks[0] is not None
+        assert all(download_lock is locks[0] for download_lock in locks)
+        assert len(results) == 16
+        assert [result.speed for result in results] == sorted(
+            (result.speed for result in results), reverse=True
+        )
+
+    @patch("cdnbestip.speedtest.run_cfst")
+    def test_parallel_shards_failure(self, mock_run):
+        """Test a failing shard fails the speed test."""
+        self.config.parallel_shards = 2
+        mock_run.return_value = Mock(returncode=1, output="bad flag")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ip_file = Path(temp_dir) / "ips.txt"
+            ip_file.write_text("104.16.0.0/22\n")
+
+            with pytest.raises(SpeedTestError, match="return code 1"):
+                self.manager.run_speed_test(str(ip_file), str(Path(temp_dir) / "result.csv"))
+
     def test_validate_results(self):
         """Test result validation."""
         results = [
@@ -0,0 +1,90 @@
+"""Unit tests for stratified candidate sampling."""
+
+import ipaddress
+from collections import Counter
+
+import pytest
+
+from cdnbestip.exceptions import IPSourceError
+from cdnbestip.ipset import IPIntervalSet
+from cdnbestip.stratified import StratifiedSampler
+
+
+class TestStratifiedSampler:
+    """Test strata construction, budget allocation and address picks."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.candidates = IPIntervalSet.from_prefixes(["104.16.0.0/14", "131.0.72.0/22"])
+
+    def test_stratify_by_slash16(self):
+        """Test ranges are split at /16 boundaries."""
+        strata = StratifiedSampler(10).stratify(self.candidates)
+        assert list(strata) == [
+            "104.16.0.0/16",
+            "104.17.0.0/16",
+            "104.18.0.0/16",
+            "104.19.0.0/16",
+            "131.0.0.0/16",
+        ]
+
+    def test_stratify_by_colo(self):
+        """Test mapped space forms colo strata, with more specific prefixes winning."""
+        prefix_colos = {"104.16.0.0/15": "HKG", "104.16.5.0/24": "NRT"}
+        strata = StratifiedSampler(10).stratify(self.candidates, prefix_colos)
+
+        assert list(strata)[:2] == ["colo:NRT", "colo:HKG"]
+        hkg_size = sum(last - first + 1 for _, first, last in strata["colo:HKG"])
+        assert hkg_size == 2 * 65536 - 256
+        assert "104.16.0.0/16" not in strata
+
+    def test_proportional_allocation(self):
+        """Test proportional allocation follows stratum size with one probe minimum."""
+        sampler = StratifiedSampler(42)
+        addresses = sampler.sample(self.candidates)
+        per_slash16 = Counter(".".join(address.split(".")[:2]) for address in addresses)
+
+        assert len(addresses) == 42
+        assert per_slash16["131.0"] == 1
+        assert all(per_slash16[f"104.{octet}"] in (10, 11) for octet in range(16, 20))
+
+    def test_equal_allocation(self):
+        """Test equal allocation gives every stratum the same share when it fits."""
+        sampler = StratifiedSampler(10, allocation="equal")
+        addresses = sampler.sample(self.candidates)
+        per_slash16 = Counter(".".join(address.split(".")[:2]) for address in addresses)
+
+        assert set(per_slash16.values()) == {2}
+
+    def test_allocation_capped_by_stratum_size(self):
+        """Test small strata never get more probes than addresses."""
+        sampler = StratifiedSampler(20, allocation="equal")
+        allocations = sampler.allocate({"a": 2, "b": 1000})
+        assert allocations == {"a": 2, "b": 18}
+
+    def test_budget_smaller_than_strata(self):
+        """Test a tiny proportional budget goes to the largest strata."""
+        allocations = StratifiedSampler(2).allocate({"a": 10, "b": 1000, "c": 500})
+        assert allocations == {"a": 0, "b": 1, "c": 1}
+
+    def test_ipv6_weighted_per_stratum(self):
+        """Test IPv6 space does not swamp IPv4 strata."""
+        candidates = IPIntervalSet.from_prefixes(["104.16.0.0/16", "2606:4700::/32"])
+        addresses = StratifiedSampler(10).sample(candidates)
+        assert sum(":" in address for address in addresses) == 5
+
+    def test_random_picks_stay_in_candidates(self):
+        """Test random picks are distinct and inside the candidate ranges."""
+        sampler = StratifiedSampler(50, mode="random", seed=3)
+        addresses = sampler.sample(self.candidates)
+
+        assert len(set(addresses)) == 50
+        assert all(address in self.candidates for address in addresses)
+        assert all(ipaddress.ip_address(address).version == 4 for address in addresses)
+
+    def test_invalid_arguments(self):
+        """Test invalid sampler arguments are rejected."""
+        with pytest.raises(IPSourceError, match="budget"):
+            StratifiedSampler(0)
+        with pytest.raises(IPSourceError, match="Invalid allocation"):
+            StratifiedSampler(10, allocation="weighted")
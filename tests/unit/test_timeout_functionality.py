@@ -135,7 +135,7 @@ class TestTimeoutInSpeedTest:
         self.manager = SpeedTestManager(self.config)
         self.manager.binary_path = "/usr/bin/cfst"
 
-    @patch("subprocess.run")
+    @patch("cdnbestip.speedtest.run_cfst")
     @patch("os.path.exists")
     def test_speed_test_uses_config_timeout(self, mock_exists, mock_run):
         """Test speed test uses timeout from config."""
@@ -154,7 +154,7 @@ class TestTimeoutInSpeedTest:
         call_kwargs = mock_run.call_args[1]
         assert call_kwargs["timeout"] == 300
 
-    @patch("subprocess.run")
+    @patch("cdnbestip.speedtest.run_cfst")
     @patch("os.path.exists")
     def test_speed_test_timeout_default_when_not_set(self, mock_exists, mock_run):
         """Test speed test uses default timeout when config doesn't have it."""
@@ -178,7 +178,7 @@ class TestTimeoutInSpeedTest:
         call_kwargs = mock_run.call_args[1]
         assert call_kwargs["timeout"] == 600
 
-    @patch("subprocess.run")
+    @patch("cdnbestip.speedtest.run_cfst")
     @patch("os.path.exists")
     def test_speed_test_timeout_error_message(self, mock_exists, mock_run):
         """Test speed test timeout error message uses correct timeout value."""
@@ -194,7 +194,7 @@ class TestTimeoutInSpeedTest:
         # Check error message contains correct timeout in minutes
         assert "5 minutes" in str(exc_info.value)
 
-    @patch("subprocess.run")
+    @patch("cdnbestip.speedtest.run_cfst")
     @patch("os.path.exists")
     def test_speed_test_custom_timeout_error_message(self, mock_exists, mock_run):
         """Test speed test timeout error message with custom timeout."""
@@ -48,7 +48,7 @@ class TestWindowsCompressionHandling:
 
         return tar_path
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_download_binary_zip_file_detection(self, mock_requests):
         """Test zip file detection from URL extension."""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -74,7 +74,7 @@ class TestWindowsCompressionHandling:
             assert binary_path.endswith("cfst.exe")
             assert Path(binary_path).exists()
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_download_binary_tar_gz_file_detection(self, mock_requests):
         """Test tar.gz file detection from URL extension."""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -100,7 +100,7 @@ class TestWindowsCompressionHandling:
             assert binary_path.endswith("cfst")
             assert Path(binary_path).exists()
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_download_binary_zip_extraction(self, mock_requests):
         """Test successful zip file extraction."""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -125,7 +125,7 @@ class TestWindowsCompressionHandling:
             assert Path(binary_path).exists()
             assert binary_path.endswith("cfst.exe")
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_download_binary_tar_gz_extraction(self, mock_requests):
         """Test successful tar.gz file extraction."""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -150,7 +150,7 @@ class TestWindowsCompressionHandling:
             assert Path(binary_path).exists()
             assert binary_path.endswith("cfst")
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_download_binary_bad_zip_file(self, mock_requests):
         """Test handling of corrupted zip file."""
         # Mock HTTP response with invalid zip content
@@ -164,7 +164,7 @@ class TestWindowsCompressionHandling:
         with pytest.raises(BinaryError, match="Failed to download binary"):
             self.manager._download_binary(download_url, "windows", "amd64")
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_download_binary_bad_tar_file(self, mock_requests):
         """Test handling of corrupted tar.gz file."""
         # Mock HTTP response with invalid tar content
@@ -178,7 +178,7 @@ class TestWindowsCompressionHandling:
         with pytest.raises(BinaryError, match="Failed to download binary"):
             self.manager._download_binary(download_url, "linux", "amd64")
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_download_binary_no_binary_found_in_archive(self, mock_requests):
         """Test handling when no binary is found in archive."""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -223,7 +223,7 @@ class TestWindowsCompressionHandling:
             # Should find Unix executable
             assert "cfst" in extracted_files
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_download_binary_chmod_called_for_unix(self, mock_requests):
         """Test that chmod is called for Unix platforms but not Windows."""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -7,7 +7,9 @@ import pytest
 
 from cdnbestip.cli import WorkflowOrchestrator
 from cdnbestip.config import Config
+from cdnbestip.exceptions import IPSourceError
 from cdnbestip.models import SpeedTestResult
+from cdnbestip.prefix_index import PrefixIndex
 
 
 class TestWorkflowOrchestrator:
@@ -206,6 +208,120 @@ class TestWorkflowOrchestrator:
         mock_st_manager.parse_results.assert_called_once_with("result.csv")
         mock_rh.filter_by_speed.assert_called_once_with(sample_results, 3.0)
         mock_rh.get_top_results.assert_called_once_with(sample_results[:2], 2)
+        mock_ip_source_manager.return_value.record_good_results.assert_called_once()
+
+    @patch("cdnbestip.cli.IPSourceManager")
+    @patch("cdnbestip.cli.SpeedTestManager")
+    @patch("cdnbestip.cli.ResultsHandler")
+    def test_process_results_records_good_results_without_delta(
+        self, mock_results_handler, mock_speedtest_manager, mock_ip_source_manager
+    ):
+        """Test qualifying results of full runs are remembered for later delta refreshes."""
+        workflow = WorkflowOrchestrator(Config())
+
+        sample_results = self.create_sample_results()
+        mock_st_manager = mock_speedtest_manager.return_value
+        mock_st_manager.parse_results.return_value = sample_results
+        mock_st_manager.validate_results.return_value = sample_results
+
+        workflow._process_results("result.csv")
+
+        record = mock_ip_source_manager.return_value.record_good_results
+        record.assert_called_once()
+        assert list(record.call_args.args[0]) == [result.ip for result in sample_results]
+
+    @patch("cdnbestip.cli.IPSourceManager")
+    @patch("cdnbestip.cli.SpeedTestManager")
+    def test_attribute_results(self, mock_speedtest_manager, mock_ip_source_manager):
+        """Test results are attributed to source prefixes and colos are learned."""
+        workflow = WorkflowOrchestrator(Config(ip_data_url="cf,gc"))
+        mock_ip_manager = mock_ip_source_manager.return_value
+        mock_ip_manager.build_prefix_index.return_value = PrefixIndex(
+            {"1.0.0.0/8": ["cf", "gc"], "8.8.8.0/24": ["gc"]}
+        )
+
+        results = self.create_sample_results()
+        workflow._attribute_results(results)
+
+        mock_ip_manager.build_prefix_index.assert_called_once_with("cf,gc")
+        assert results[0].prefix == "1.0.0.0/8"
+        assert results[0].source == "cf,gc"
+        mock_ip_manager.learn_prefix_colos.assert_called_once_with(results)
+        recorded = mock_ip_manager.record_prefix_stats.call_args.args[0]
+        assert recorded["1.0.0.0/8"]["count"] >= 1
+
+    @patch("cdnbestip.cli.IPSourceManager")
+    @patch("cdnbestip.cli.SpeedTestManager")
+    def test_close_releases_ip_source_manager(
+        self, mock_speedtest_manager, mock_ip_source_manager
+    ):
+        """Test closing the workflow closes the IP source manager."""
+        WorkflowOrchestrator(Config()).close()
+        mock_ip_source_manager.return_value.close.assert_called_once()
+
+    @patch("cdnbestip.cli.IPSourceManager")
+    @patch("cdnbestip.cli.SpeedTestManager")
+    def test_attribute_results_survives_errors(
+        self, mock_speedtest_manager, mock_ip_source_manager
+    ):
+        """Test a failing attribution only logs a warning."""
+        workflow = WorkflowOrchestrator(Config(ip_data_url="cf"))
+        mock_ip_manager = mock_ip_source_manager.return_value
+        mock_ip_manager.build_prefix_index.side_effect = OSError("disk gone")
+
+        workflow._attribute_results(self.create_sample_results())
+        mock_ip_manager.learn_prefix_colos.assert_not_called()
+
+    @patch("cdnbestip.cli.IPSourceManager")
+    @patch("cdnbestip.cli.SpeedTestManager")
+    def test_attribute_results_raises_unexpected_errors(
+        self, mock_speedtest_manager, mock_ip_source_manager
+    ):
+        """Test only expected attribution failures are downgraded to a warning."""
+        workflow = WorkflowOrchestrator(Config(ip_data_url="cf"))
+        mock_ip_source_manager.return_value.build_prefix_index.side_effect = TypeError("bug")
+
+        with pytest.raises(TypeError):
+            workflow._attribute_results(self.create_sample_results())
+
+    @patch("cdnbestip.cli.IPSourceManager")
+    @patch("cdnbestip.cli.SpeedTestManager")
+    def test_process_results_attributes_every_run(
+        self, mock_speedtest_manager, mock_ip_source_manager
+    ):
+        """Test attribution and colo learning run without stratified sampling."""
+        mock_st_manager = mock_speedtest_manager.return_value
+        mock_st_manager.parse_results.return_value = self.create_sample_results()
+        mock_st_manager.validate_results.side_effect = lambda results: results
+        mock_ip_manager = mock_ip_source_manager.return_value
+        mock_ip_manager.build_prefix_index.return_value = PrefixIndex({})
+
+        WorkflowOrchestrator(Config())._process_results("result.csv")
+        mock_ip_manager.build_prefix_index.assert_called_once()
+        mock_ip_manager.learn_prefix_colos.assert_called_once()
+
+    @patch("cdnbestip.cli.IPSourceManager")
+    @patch("cdnbestip.cli.SpeedTestManager")
+    def test_watch_reruns_on_change(self, mock_speedtest_manager, mock_ip_source_manager):
+        """Test watch mode reruns with refreshed results and survives failed runs."""
+        workflow = WorkflowOrchestrator(Config(ip_data_url="/data/curated.txt", watch=True))
+        watcher = mock_ip_source_manager.return_value.watch_local_sources.return_value
+        watcher.__enter__ = MagicMock(return_value=watcher)
+        watcher.__exit__ = MagicMock(return_value=False)
+        watcher.paths = ["/data/curated.txt"]
+
+        with patch.object(
+            workflow,
+            "execute",
+            side_effect=[IPSourceError("bad list"), None, KeyboardInterrupt],
+        ) as mock_execute:
+            with pytest.raises(KeyboardInterrupt):
+                workflow.watch()
+
+        assert mock_execute.call_count == 3
+        assert watcher.wait.call_count == 3
+        assert workflow.config.refresh
+        watcher.__exit__.assert_called_once()
 
     @patch("cdnbestip.cli.IPSourceManager")
     @patch("cdnbestip.cli.SpeedTestManager")